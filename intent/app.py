@@ -1,10 +1,13 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import time
-import plotly.graph_objects as go
+import os
+import sys
 from datetime import datetime
 
+# Scenario playbooks live alongside the Flask app (intent/playbooks.py, intent/data/playbooks/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent'))
+import playbooks
+import stages
+
 # =========================
 # 1. PAGE CONFIGURATION & CSS (THE "TRILLION DOLLAR" LOOK)
 # =========================
@@ -87,78 +90,56 @@ st.markdown("""
 # =========================
 def get_strategic_response(query):
     """
-    This simulates a high-end LLM/RAG pipeline using keyword heuristics 
-    to ensure the answer ALWAYS matches the user's specific context.
+    This simulates a high-end LLM/RAG pipeline, routing the query to the
+    playbook that matches the user's specific context. Playbooks are data
+    files (intent/data/playbooks/) loaded once per process and hot-reloaded
+    when edited, so reruns only pay for the routing.
     """
-    q = query.lower()
-    
-    # SCENARIO A: CYBERSECURITY (Matches your screenshot)
-    if any(x in q for x in ['cyber', 'security', 'breach', 'vulnerability', 'attack']):
-        return {
-            "status": "CRITICAL EXPOSURE",
-            "color": "#FF4B4B",
-            "confidence": "98.4%",
-            "analysis": "Vulnerability identified in Legacy ERP Node 4. Estimated data exposure: 1.2M records.",
-            "strategy": "IMMEDIATE CONTAINMENT PROTOCOL",
-            "actions": [
-                "1. Isolate ERP Sector 7 immediately (Stop API traffic).",
-                "2. Deploy 'Dark-Comms' strategy to minimize stock volatility.",
-                "3. Prepare GDPR/CCPA compliance brief for Legal."
-            ],
-            "impact_data": [100, 80, 45, 30, 25, 60, 85], # Dip and recovery
-            "impact_label": "Brand Equity Projection (6 Months)"
-        }
-
-    # SCENARIO B: REVENUE/SALES
-    elif any(x in q for x in ['revenue', 'sales', 'growth', 'q3', 'profit']):
-        return {
-            "status": "OPPORTUNITY VECTOR",
-            "color": "#00FFC2",
-            "confidence": "92.1%",
-            "analysis": "Market signals indicate under-penetration in APAC region. Competitor X is weak there.",
-            "strategy": "AGGRESSIVE EXPANSION",
-            "actions": [
-                "1. Reallocate 15% of EU marketing budget to APAC.",
-                "2. Activate channel partners in Singapore/Tokyo.",
-                "3. Launch flash-incentive for enterprise tier."
-            ],
-            "impact_data": [50, 52, 55, 65, 80, 95, 110], # Growth curve
-            "impact_label": "Revenue Uplift Projection ($M)"
-        }
-
-    # SCENARIO C: SUPPLY CHAIN
-    elif any(x in q for x in ['supply', 'logistics', 'shipping', 'delay', 'inventory']):
-        return {
-            "status": "LOGISTICAL RISK",
-            "color": "#FFD700",
-            "confidence": "89.5%",
-            "analysis": "Route congestion detected in Panama Canal. 14 Days added to lead time.",
-            "strategy": "ROUTE DIVERSIFICATION",
-            "actions": [
-                "1. Trigger air-freight for Class A inventory.",
-                "2. Notify distributors of +2 week lead time adjustment.",
-                "3. Source temporary local suppliers for raw materials."
-            ],
-            "impact_data": [90, 85, 80, 82, 88, 92, 95], # Dip then stabilize
-            "impact_label": "Inventory Health Index"
-        }
-
-    # FALLBACK (GENERIC)
-    else:
-        return {
-            "status": "ANALYZING PATTERNS",
-            "color": "#00CCFF",
-            "confidence": "75.0%",
-            "analysis": "Input received. Cross-referencing internal historical data with external market signals.",
-            "strategy": "DATA ENRICHMENT REQUIRED",
-            "actions": [
-                "1. Clarify specific metric target (Revenue vs Risk).",
-                "2. Run deeper diagnostic on current operational parameters.",
-                "3. Monitor for signal noise reduction."
-            ],
-            "impact_data": [50, 55, 53, 58, 60, 62, 65],
-            "impact_label": "Operational Efficiency"
-        }
+    return playbooks.default_store().route(query).response
+
+
+def impact_chart(response):
+    """Plotly Dark Mode Chart of the playbook's projected impact."""
+    # Imported on the first analysis, not at startup: plotly alone takes longer
+    # to import than the rest of the app
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    dates = pd.date_range(start=datetime.now(), periods=len(response['impact_data']))
+    fig = go.Figure()
+
+    # Area chart
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=response['impact_data'],
+        fill='tozeroy',
+        mode='lines+markers',
+        line=dict(color=response['color'], width=3),
+        marker=dict(size=8, color='#FFF'),
+        name='Projection'
+    ))
+
+    # Styling the chart to blend with the app
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#E0E0E0'),
+        margin=dict(l=0, r=0, t=10, b=0),
+        height=250,
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='#333')
+    )
+    return fig
+
+
+# Pipeline stages and the label shown while each one runs
+STAGE_LABELS = {
+    "parse": "Ingesting Live ERP Data...",
+    "analyze": "Running Risk Simulation Models (Monte Carlo)...",
+    "render": "Finalizing Directive...",
+}
+# Demo mode holds each stage on screen briefly; production shows only real work
+DEMO_STAGE_PAUSE_SECONDS = 0.3
 
 # =========================
 # 3. UI LAYOUT
@@ -180,29 +161,29 @@ query = st.text_area("Enter Context / Data Signal:", value=default_text, height=
 
 if st.button("GENERATE STRATEGIC DIRECTIVE"):
     
-    # --- FAKE PROCESSING ANIMATION (Immersion) ---
+    # --- PROCESSING: the progress bar follows the real pipeline stages ---
     progress_bar = st.progress(0)
     status_text = st.empty()
-    
-    stages = [
-        "Connecting to Neural Lattice...",
-        "Ingesting Live ERP Data...",
-        "Running Risk Simulation Models (Monte Carlo)...",
-        "Synthesizing Strategic Options...",
-        "Finalizing Directive..."
-    ]
-    
-    for i, stage in enumerate(stages):
-        status_text.markdown(f"<p class='mono' style='color:#00FFC2'> > {stage}</p>", unsafe_allow_html=True)
-        progress_bar.progress((i + 1) * 20)
-        time.sleep(0.3) # Fast but noticeable
-    
+
+    def show_stage(timer, name, done):
+        if not done:
+            status_text.markdown(f"<p class='mono' style='color:#00FFC2'> > {STAGE_LABELS[name]}</p>", unsafe_allow_html=True)
+        progress_bar.progress(timer.progress())
+
+    timer = stages.StageTimer(STAGE_LABELS, on_stage=show_stage)
+    with timer.stage("parse"):
+        signal = " ".join(query.split())
+    stages.demo_pause(DEMO_STAGE_PAUSE_SECONDS)
+    with timer.stage("analyze"):
+        response = get_strategic_response(signal)
+    stages.demo_pause(DEMO_STAGE_PAUSE_SECONDS)
+    with timer.stage("render"):
+        fig = impact_chart(response)
+    stages.demo_pause(DEMO_STAGE_PAUSE_SECONDS)
+
     status_text.empty()
     progress_bar.empty()
 
-    # --- GET LOGIC ---
-    response = get_strategic_response(query)
-
     # --- RESULTS DASHBOARD ---
     st.markdown("### 2. INTELLIGENCE REPORT")
     
@@ -255,34 +236,11 @@ if st.button("GENERATE STRATEGIC DIRECTIVE"):
     with c2:
         st.markdown(f"<div class='metric-card'><div class='subtext'>SIMULATION: {response['impact_label']}</div>", unsafe_allow_html=True)
         
-        # Plotly Dark Mode Chart
-        dates = pd.date_range(start=datetime.now(), periods=7)
-        fig = go.Figure()
-        
-        # Area chart
-        fig.add_trace(go.Scatter(
-            x=dates, 
-            y=response['impact_data'], 
-            fill='tozeroy',
-            mode='lines+markers',
-            line=dict(color=response['color'], width=3),
-            marker=dict(size=8, color='#FFF'),
-            name='Projection'
-        ))
-        
-        # Styling the chart to blend with the app
-        fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(color='#E0E0E0'),
-            margin=dict(l=0, r=0, t=10, b=0),
-            height=250,
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#333')
-        )
         st.plotly_chart(fig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+    st.caption(f"Pipeline: {timer.summary()} ({stages.mode()} mode)")
+
 else:
     # Idle State visuals
     st.info("System Ready. Awaiting Executive Input...")
@@ -0,0 +1,284 @@
+"""Business-context analysis shared by the WSGI and ASGI entry points.
+
+``analyze`` is the blocking path used by the Flask view; ``analyze_async``
+does the same work without holding a thread while the model (or the
+simulated demo latency) is pending. ``analyze_many`` runs a batch of
+inputs on a bounded thread pool for ``/analyze/batch``.
+``analyze_stream`` / ``analyze_stream_async`` yield :mod:`streaming`
+events while the model is still generating, for the SSE mode of
+``/analyze``.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cache
+import llm
+import metrics
+import router
+import stages
+import streaming
+
+logger = logging.getLogger(__name__)
+
+# FOR HACKATHON DEMO: simulated "AI Thinking" time before every analysis.
+# Zero when INTENT_MODE=production (see stages.py).
+DEMO_LATENCY_SECONDS = stages.demo_latency()
+
+# Bump whenever SYSTEM_PROMPT or build_messages changes so cached answers
+# from the old prompt are not served.
+PROMPT_VERSION = '1'
+
+# Inputs mentioning any of these keywords get a Critical mock analysis
+RISK_ROUTER = router.Router([("Critical", ['churn', 'loss'])])
+
+SYSTEM_PROMPT = (
+    "You are an analyst that outputs a single JSON object describing risk_level, summary, "
+    "predictions (list of {metric,trend,status}), and recommendations (list of strings). "
+    "Respond with JSON only."
+)
+
+
+def build_messages(user_input):
+    user_msg = f"Analyze the following business context and return JSON:\n```{user_input}```"
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user_msg}]
+
+
+def parse_completion(text):
+    """Parse model output into a response dict, or None if it is not valid JSON."""
+    try:
+        parsed = json.loads(text)
+    except Exception:
+        logger.warning("OpenAI response could not be parsed as JSON")
+        return None
+    if not isinstance(parsed, dict):
+        logger.warning("OpenAI response was not a JSON object")
+        return None
+    parsed['status'] = parsed.get('status', 'success')
+    logger.info("OpenAI returned valid JSON")
+    return parsed
+
+
+def mock_analysis(user_input):
+    """Deterministic response used when no API key is set or the live call fails."""
+    risk_level = RISK_ROUTER.match(user_input) or "Medium"
+
+    return {
+        "status": "success",
+        "risk_level": risk_level,
+        "summary": "Analysis indicates volatility in operational metrics. Primary concern is linked to retention and stability.",
+        "predictions": [
+            {"metric": "Employee Attrition", "trend": "+12%", "status": "High Risk"},
+            {"metric": "Customer Churn", "trend": "+5%", "status": "Warning"},
+            {"metric": "Skill Gap", "trend": "Widening", "status": "Critical"}
+        ],
+        "recommendations": [
+            "Initiate immediate retention program for top 10% talent.",
+            "Automate support workflows to reduce customer friction.",
+            "Diversify supply chain to mitigate geopolitical instability."
+        ]
+    }
+
+
+def cache_key(user_input):
+    model = llm.model_name() if llm.is_configured() else 'mock'
+    return cache.make_key(user_input, model, PROMPT_VERSION)
+
+
+def _cached(key):
+    response_cache = cache.default_cache()
+    return response_cache.get(key) if response_cache else None
+
+
+def _store(key, result):
+    response_cache = cache.default_cache()
+    if response_cache:
+        response_cache.set(key, result)
+    return result
+
+
+def _fallback(user_input, reason):
+    # reason: 'error', 'circuit_open' or 'unparseable' (the model's reply wasn't the JSON we asked for)
+    metrics.LLM_FALLBACKS.inc(reason=reason)
+    return mock_analysis(user_input)
+
+
+def _stage(timer, name):
+    return timer.stage(name) if timer is not None else contextlib.nullcontext()
+
+
+def analyze(user_input, timer=None):
+    """Analysis for ``user_input``: cached, live or the local mock.
+
+    With a :class:`stages.StageTimer`, the cache lookup is timed as its
+    ``cache`` stage and the analysis proper as ``analyze``; the demo latency
+    falls between the two and is in neither.
+    """
+    with _stage(timer, 'cache'):
+        key = cache_key(user_input)
+        cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    time.sleep(DEMO_LATENCY_SECONDS)
+
+    with _stage(timer, 'analyze'):
+        return _analyze_uncached(user_input, key)
+
+
+def _analyze_uncached(user_input, key):
+    # If an OpenAI API key is present, attempt a live call (returns JSON).
+    if llm.is_configured():
+        reason = 'unparseable'
+        try:
+            logger.info("Attempting OpenAI API call")
+            parsed = parse_completion(llm.complete(build_messages(user_input)))
+            if parsed is not None:
+                return _store(key, parsed)
+        except llm.CircuitOpen:
+            reason = 'circuit_open'
+            logger.warning("OpenAI circuit breaker open; using the local analysis")
+        except Exception as e:
+            reason = 'error'
+            # Log error server-side and fall back to mock response below
+            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
+        # Don't cache a fallback, or one upstream blip pins the mock answer
+        return _fallback(user_input, reason)
+
+    return _store(key, mock_analysis(user_input))
+
+
+async def analyze_async(user_input, timer=None):
+    with _stage(timer, 'cache'):
+        key = cache_key(user_input)
+        cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    await asyncio.sleep(DEMO_LATENCY_SECONDS)
+
+    with _stage(timer, 'analyze'):
+        return await _analyze_uncached_async(user_input, key)
+
+
+async def _analyze_uncached_async(user_input, key):
+    if llm.is_configured():
+        reason = 'unparseable'
+        try:
+            logger.info("Attempting async OpenAI API call")
+            parsed = parse_completion(await llm.acomplete(build_messages(user_input)))
+            if parsed is not None:
+                return _store(key, parsed)
+        except llm.CircuitOpen:
+            reason = 'circuit_open'
+            logger.warning("OpenAI circuit breaker open; using the local analysis")
+        except Exception as e:
+            reason = 'error'
+            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
+        return _fallback(user_input, reason)
+
+    return _store(key, mock_analysis(user_input))
+
+
+def analyze_stream(user_input):
+    """Like :func:`analyze`, but yields ``(event, data)`` pairs as the answer is
+    generated; the last one is ``('done', result)``."""
+    key = cache_key(user_input)
+    cached = _cached(key)
+    if cached is not None:
+        yield from streaming.result_events(cached)
+        return
+
+    time.sleep(DEMO_LATENCY_SECONDS)
+
+    if llm.is_configured():
+        parser = streaming.FragmentParser()
+        reason = 'unparseable'
+        try:
+            logger.info("Attempting streamed OpenAI API call")
+            for piece in llm.stream(build_messages(user_input)):
+                yield from parser.feed(piece)
+            parsed = parse_completion(parser.text)
+            if parsed is not None:
+                yield 'done', _store(key, parsed)
+                return
+        except llm.CircuitOpen:
+            reason = 'circuit_open'
+            logger.warning("OpenAI circuit breaker open; using the local analysis")
+        except Exception as e:
+            reason = 'error'
+            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
+        # The fallback replaces whatever was streamed so far
+        yield 'done', _fallback(user_input, reason)
+        return
+
+    yield from streaming.result_events(_store(key, mock_analysis(user_input)))
+
+
+async def analyze_stream_async(user_input):
+    """Async variant of :func:`analyze_stream`."""
+    key = cache_key(user_input)
+    cached = _cached(key)
+    if cached is not None:
+        for event in streaming.result_events(cached):
+            yield event
+        return
+
+    await asyncio.sleep(DEMO_LATENCY_SECONDS)
+
+    if llm.is_configured():
+        parser = streaming.FragmentParser()
+        reason = 'unparseable'
+        try:
+            logger.info("Attempting streamed async OpenAI API call")
+            async for piece in llm.astream(build_messages(user_input)):
+                for event in parser.feed(piece):
+                    yield event
+            parsed = parse_completion(parser.text)
+            if parsed is not None:
+                yield 'done', _store(key, parsed)
+                return
+        except llm.CircuitOpen:
+            reason = 'circuit_open'
+            logger.warning("OpenAI circuit breaker open; using the local analysis")
+        except Exception as e:
+            reason = 'error'
+            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
+        yield 'done', _fallback(user_input, reason)
+        return
+
+    for event in streaming.result_events(_store(key, mock_analysis(user_input))):
+        yield event
+
+
+def analyze_many(inputs, parallelism=8):
+    """Analyze a batch, yielding ``(positions, result)`` as each input completes.
+
+    Inputs that normalize to the same cache key are analyzed once and
+    reported for every position they appear at. At most ``parallelism``
+    analyses run at a time, so a batch takes about
+    ``ceil(unique / parallelism)`` analysis latencies. A failing input
+    yields an error result instead of stopping the batch.
+    """
+    groups = {}
+    for position, user_input in enumerate(inputs):
+        groups.setdefault(cache_key(user_input), []).append(position)
+    if not groups:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(parallelism, len(groups)), thread_name_prefix='intent-batch')
+    try:
+        futures = {executor.submit(analyze, inputs[positions[0]]): positions for positions in groups.values()}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Batch analysis failed: {str(e)}", exc_info=True)
+                result = {"status": "error", "message": "Analysis failed"}
+            yield futures[future], result
+    finally:
+        # Client went away or the batch finished: drop work not yet started
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,24 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 import time
-import random
-import csv
-import io
 import os
 import json
 import logging
-import openai
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
-import base64
-import textwrap
+
+import analysis
+import assets
+import cache
+import csv_engine
+import datasets
+import exports
+import jobs
+import llm
+import metrics
+import profiling
+import report
+import stages
+import streaming
+import uploads
+import wire
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +28,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, template_folder='templates')
+# Refuse request bodies well past the CSV limit before they are spooled
+app.config['MAX_CONTENT_LENGTH'] = csv_engine.MAX_UPLOAD_BYTES + 64 * 1024
+
+# Bounded pool for `POST /analyze?async=1`; see jobs.py
+job_queue = jobs.JobQueue(
+    analysis.analyze,
+    max_workers=int(os.getenv('INTENT_JOB_WORKERS', '8')),
+    max_pending=int(os.getenv('INTENT_JOB_QUEUE', '64')),
+    result_dir=os.getenv('INTENT_JOB_DIR'),
+    ttl=int(os.getenv('INTENT_JOB_TTL', '3600')),
+)
 
 # Global error handler
 @app.errorhandler(404)
@@ -28,167 +46,255 @@ def not_found(e):
     logger.warning(f"404 Not Found: {request.path}")
     return jsonify({"status": "error", "message": "Endpoint not found"}), 404
 
+@app.errorhandler(413)
+def too_large(e):
+    logger.warning(f"413 Request Entity Too Large: {request.content_length} bytes")
+    return jsonify({"status": "error", "message": csv_engine.size_limit_message(csv_engine.MAX_UPLOAD_BYTES)}), 413
+
 @app.errorhandler(500)
 def internal_error(e):
     logger.error(f"500 Internal Server Error: {str(e)}", exc_info=True)
     return jsonify({"status": "error", "message": "Internal server error"}), 500
 
+# --- METRICS ---
+
+@app.before_request
+def _start_request_metrics():
+    # Label by URL rule, not path, so /jobs/<job_id> stays one series
+    g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_start = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+
+
+@app.after_request
+def _record_request_metrics(resp):
+    route, start, method, status = g.metrics_route, g.metrics_start, request.method, str(resp.status_code)
+
+    def done():
+        # Runs once the body has been sent, so streamed exports and SSE are timed in full
+        metrics.HTTP_IN_FLIGHT.dec(route=route)
+        metrics.HTTP_DURATION.observe(time.perf_counter() - start, route=route)
+        metrics.HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    resp.call_on_close(done)
+    # werkzeug hands direct_passthrough bodies (send_file, send_from_directory)
+    # to the server as-is and never runs close callbacks for them
+    resp.direct_passthrough = False
+    return resp
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.exposition(), mimetype='text/plain; version=0.0.4')
+
+
+# ?profile=1 sampling and /admin/profiles; registers nothing unless INTENT_ADMIN_TOKEN is set
+profiling.install(app)
+
 # --- ROUTES ---
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEMO_ASSETS = assets.load_dir(os.path.join(APP_DIR, 'demo_data'), '.csv', 'text/csv; charset=utf-8')
+
+
+def _render_shell():
+    # Demo links carry their content hash, so they can be cached as immutable
+    with app.app_context():
+        html = render_template('index.html', demo_url=lambda name: f"demo_data/{name}?v={DEMO_ASSETS[name].version}")
+    return assets.Asset(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+
+# The page has no per-request content: render and compress it once
+SHELL = _render_shell()
+
+
 @app.route('/')
 def home():
-    return render_template('index.html')
+    # Debug runs re-render so template edits show up on reload
+    page = _render_shell() if app.debug else SHELL
+    return page.response(assets.REVALIDATE)
+
+
+@app.route('/demo_data/<name>')
+def demo_data(name):
+    asset = DEMO_ASSETS.get(name)
+    if asset is None:
+        return jsonify({"status": "error", "message": "Demo file not found"}), 404
+    return asset.response(assets.IMMUTABLE if request.args.get('v') == asset.version else assets.REVALIDATE)
+
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def _wants_stream():
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return streaming.wants_events(request.headers.get('Accept'))
+
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    user_input = request.json.get('data')
+    timer = stages.StageTimer()
+    with timer.stage('parse'):
+        user_input = request.json.get('data')
     logger.info(f"Analyze request: input_len={len(user_input) if user_input else 0}")
-    
-    # ---------------------------------------------------------
-    # FOR HACKATHON DEMO: SIMULATED AI LATENCY & LOGIC
-    # (This ensures your demo works 100% of the time without API keys)
-    # ---------------------------------------------------------
-    time.sleep(2) # Simulate "AI Thinking" time
-    
-    # If an OpenAI API key is present, attempt a live call (returns JSON).
-    api_key = os.getenv('OPENAI_API_KEY')
-    if api_key:
-        openai.api_key = api_key
+
+    # Job mode: queue the analysis and return immediately; poll GET /jobs/<id>
+    if request.args.get('async') in ('1', 'true'):
         try:
-            logger.info("Attempting OpenAI API call")
-            system_msg = "You are an analyst that outputs a single JSON object describing risk_level, summary, predictions (list of {metric,trend,status}), and recommendations (list of strings). Respond with JSON only."
-            user_msg = f"Analyze the following business context and return JSON:\n```{user_input}```"
-            resp = openai.ChatCompletion.create(
-                model=os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
-                messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}],
-                max_tokens=600,
-                temperature=0.2,
-            )
-            text = resp['choices'][0]['message']['content']
-            # Try to parse JSON from model output
-            try:
-                parsed = json.loads(text)
-                parsed['status'] = parsed.get('status', 'success')
-                logger.info("OpenAI returned valid JSON")
-                return jsonify(parsed)
-            except Exception:
-                # Fall through to mock if parsing fails
-                logger.warning("OpenAI response could not be parsed as JSON")
-                pass
-        except Exception as e:
-            # Log error server-side and fall back to mock response below
-            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
-
-    # Fallback mock response (safe demo path without API key)
-    risk_level = "Medium"
-    if user_input and ("churn" in user_input.lower() or "loss" in user_input.lower()):
-        risk_level = "Critical"
-    
-    response_data = {
-        "status": "success",
-        "risk_level": risk_level,
-        "summary": "Analysis indicates volatility in operational metrics. Primary concern is linked to retention and stability.",
-        "predictions": [
-            {"metric": "Employee Attrition", "trend": "+12%", "status": "High Risk"},
-            {"metric": "Customer Churn", "trend": "+5%", "status": "Warning"},
-            {"metric": "Skill Gap", "trend": "Widening", "status": "Critical"}
-        ],
-        "recommendations": [
-            "Initiate immediate retention program for top 10% talent.",
-            "Automate support workflows to reduce customer friction.",
-            "Diversify supply chain to mitigate geopolitical instability."
-        ]
-    }
-
-    return jsonify(response_data)
+            job_id = job_queue.submit(user_input)
+        except jobs.QueueFull as e:
+            logger.warning(f"Analyze job rejected, queue full (retry_after={e.retry_after}s)")
+            resp = jsonify({"status": "error", "message": "Analysis queue is full, retry later"})
+            resp.headers['Retry-After'] = str(e.retry_after)
+            return resp, 429
+        logger.info(f"Analyze job queued: {job_id}")
+        resp = jsonify({"status": "queued", "job_id": job_id})
+        resp.headers['Location'] = f'/jobs/{job_id}'
+        return resp, 202
+
+    # SSE mode (?stream=1 or Accept: text/event-stream): partial results as
+    # the model generates them; see streaming.py for the events
+    if _wants_stream():
+        events = (streaming.sse(name, data) for name, data in analysis.analyze_stream(user_input))
+        return Response(stream_with_context(events), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+    # Blocking path for the plain WSGI server; asgi.py serves this route
+    # with analysis.analyze_async so a worker is not held during the LLM call.
+    result = analysis.analyze(user_input, timer)
+    with timer.stage('render'):
+        resp = jsonify(result)
+    resp.headers['Server-Timing'] = timer.server_timing()
+    return resp
+
+
+# Upper bounds for POST /analyze/batch; clients may ask for less parallelism
+BATCH_MAX_ITEMS = int(os.getenv('INTENT_BATCH_MAX_ITEMS', '1000'))
+BATCH_PARALLELISM = int(os.getenv('INTENT_BATCH_PARALLELISM', '16'))
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    # Body: {"contexts": ["...", ...], "parallelism": 8}. Streams one NDJSON
+    # line per context as it completes, then a final {"done": true, ...} line.
+    body = request.get_json(silent=True)
+    contexts = body.get('contexts') if isinstance(body, dict) else None
+    if not isinstance(contexts, list) or not contexts or not all(isinstance(c, str) for c in contexts):
+        return jsonify({"status": "error", "message": "contexts must be a non-empty list of strings"}), 400
+    if len(contexts) > BATCH_MAX_ITEMS:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_ITEMS} contexts per batch"}), 400
+    try:
+        parallelism = int(body.get('parallelism') or BATCH_PARALLELISM)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "parallelism must be an integer"}), 400
+    parallelism = max(1, min(parallelism, BATCH_PARALLELISM))
+    logger.info(f"Analyze batch: {len(contexts)} contexts, parallelism={parallelism}")
+
+    def generate():
+        started = time.perf_counter()
+        unique = 0
+        for positions, result in analysis.analyze_many(contexts, parallelism):
+            unique += 1
+            yield ''.join(json.dumps({"index": i, "result": result}) + '\n' for i in positions)
+        yield json.dumps({"done": True, "count": len(contexts), "unique": unique,
+                          "seconds": round(time.perf_counter() - started, 3)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    response_cache = cache.default_cache()
+    if response_cache is None:
+        return jsonify({"status": "success", "backend": "none"})
+    return jsonify({"status": "success", **response_cache.stats()})
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    if job['status'] == 'done':
+        return jsonify(job['result'])
+    if job['status'] == 'failed':
+        return jsonify({"status": "error", "job_id": job_id, "message": job.get('message', 'Analysis failed')}), 500
+    resp = jsonify({"status": job['status'], "job_id": job_id})
+    resp.headers['Retry-After'] = '1'
+    return resp, 202
 
 
 @app.route('/export', methods=['POST'])
 def export_pdf():
-    # Expects JSON with keys: summary, risk, predictions (list), recommendations (list), labels, values, chart (dataURL optional)
+    # Expects JSON with keys: summary, risk, predictions (list), recommendations (list),
+    # and for the chart either labels + values (+ y_label, rolling_mean, anomalies),
+    # drawn as vector graphics, or a legacy chart dataURL
     try:
         payload = request.get_json(force=True)
     except Exception as e:
         return jsonify({"status": "error", "message": "Invalid JSON payload"}), 400
 
-    summary = payload.get('summary', '')
-    risk = payload.get('risk', '')
-    predictions = payload.get('predictions', [])
-    recommendations = payload.get('recommendations', [])
-    chart_dataurl = payload.get('chart')
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    margin_x = 40
-    y = height - 40
-
-    c.setFont('Helvetica-Bold', 18)
-    c.drawString(margin_x, y, 'Intent AI Report')
-    y -= 28
-
-    c.setFont('Helvetica', 12)
-    c.drawString(margin_x, y, f'Risk: {risk}')
-    y -= 18
-
-    c.setFont('Helvetica-Bold', 12)
-    c.drawString(margin_x, y, 'Summary:')
-    y -= 14
-    c.setFont('Helvetica', 10)
-    for line in textwrap.wrap(summary, 90):
-        c.drawString(margin_x, y, line)
-        y -= 14
-
-    y -= 8
-    # Add chart if available
-    if chart_dataurl:
-        try:
-            header, b64 = chart_dataurl.split(',', 1)
-            img_bytes = base64.b64decode(b64)
-            img = ImageReader(io.BytesIO(img_bytes))
-            img_w = width - margin_x * 2
-            img_h = 200
-            c.drawImage(img, margin_x, y - img_h, width=img_w, height=img_h)
-            y -= img_h + 12
-        except Exception:
-            pass
-
-    # Predictions
-    if predictions:
-        c.setFont('Helvetica-Bold', 12)
-        c.drawString(margin_x, y, 'Predictions:')
-        y -= 14
-        c.setFont('Helvetica', 10)
-        for p in predictions:
-            text = f"- {p.get('metric', '')}: {p.get('trend', '')} ({p.get('status', '')})"
-            for line in textwrap.wrap(text, 95):
-                c.drawString(margin_x, y, line)
-                y -= 12
-            y -= 4
-
-    # Recommendations
-    if recommendations:
-        c.setFont('Helvetica-Bold', 12)
-        c.drawString(margin_x, y, 'Recommendations:')
-        y -= 14
-        c.setFont('Helvetica', 10)
-        for r in recommendations:
-            for line in textwrap.wrap(f"- {r}", 95):
-                c.drawString(margin_x, y, line)
-                y -= 12
-            y -= 4
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return send_file(buffer, mimetype='application/pdf', as_attachment=True, download_name='intent_report.pdf')
+    if not isinstance(payload, dict):
+        return jsonify({"status": "error", "message": "Invalid JSON payload"}), 400
+
+    # Identical payloads share one cached PDF; the key is also the ETag, so a
+    # client holding the previous download can revalidate with If-None-Match
+    key = exports.payload_key(payload)
+    tag = exports.etag(key)
+    if request.if_none_match.contains_weak(tag.strip('"')):
+        resp = Response(status=304)
+        resp.headers['ETag'] = tag
+        return resp
+
+    # Paginated layout rendered to a spooled temp file, then sent in chunks
+    # so large reports don't sit in worker memory; see report.py
+    report_cache = exports.default_cache()
+    try:
+        if report_cache is None:
+            out, size = report.spool(payload)
+            source = 'miss'
+        else:
+            out, size, source = report_cache.export(key, payload)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    # Not direct_passthrough: werkzeug would then skip the response's close
+    # callbacks, which record the request metrics once the last chunk is sent
+    resp = Response(report.stream(out), mimetype='application/pdf')
+    resp.headers['Content-Length'] = str(size)
+    resp.headers['Content-Disposition'] = 'attachment; filename=intent_report.pdf'
+    resp.headers['ETag'] = tag
+    resp.headers['X-Report-Cache'] = source
+    return resp
+
+
+@app.route('/llm/stats', methods=['GET'])
+def llm_stats():
+    return jsonify({"status": "success", **llm.stats()})
+
+
+@app.route('/export/cache/stats', methods=['GET'])
+def export_cache_stats():
+    report_cache = exports.default_cache()
+    if report_cache is None:
+        return jsonify({"status": "success", "backend": "none"})
+    return jsonify({"status": "success", **report_cache.stats()})
+
+
+def _store_dataset(table):
+    # The handle is an optimisation for follow-up queries; never fail the upload over it
+    try:
+        return datasets.default_store().put(table)
+    except Exception as e:
+        logger.warning(f"Dataset store failed: {str(e)}")
+        return None
 
 
 @app.route('/upload', methods=['POST'])
 def upload():
     # Accept a CSV file upload, allow selecting a column by name or index,
     # parse numeric column, and return time-series for charting + headers
-    file = request.files.get('file')
+    with metrics.stage('csv_decode'):
+        # Werkzeug decodes the multipart body on first access
+        file = request.files.get('file')
     if not file:
         logger.warning("Upload attempted without file")
         return jsonify({"status": "error", "message": "No file uploaded"}), 400
@@ -200,158 +306,93 @@ def upload():
         logger.warning(f"Non-CSV file upload attempted: {file.filename}")
         return jsonify({"status": "error", "message": "Only CSV files are allowed"}), 400
     
-    # Check file size (max 5MB)
-    file.seek(0, 2)  # Seek to end
-    file_size = file.tell()
-    if file_size > 5 * 1024 * 1024:  # 5MB
-        logger.warning(f"File too large: {file_size} bytes")
-        return jsonify({"status": "error", "message": "File size exceeds 5MB limit"}), 400
-    file.seek(0)  # Reset to start
-
+    # Size (MAX_UPLOAD_BYTES) and row (MAX_UPLOAD_ROWS) limits are enforced
+    # by the parser while it streams the file, so oversized uploads stop early.
     selected_col = request.form.get('column')
     selected_x = request.form.get('x_column')
+    # "*" or a comma-separated list of columns returns every requested series
+    # at once, so the UI can switch columns without re-uploading
+    selected_columns = request.form.get('columns')
+    # Optional chart downsampling: max_points (and downsample=lttb|minmax)
+    try:
+        max_points, method = uploads.downsample_options(request.form)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
     try:
-        text = file.stream.read().decode('utf-8', errors='ignore')
-        
-        # Validate CSV is not empty
-        if not text.strip():
-            logger.warning("Empty CSV file uploaded")
-            return jsonify({"status": "error", "message": "CSV file is empty"}), 400
-# Limit rows to prevent DOS (max 10,000 rows)
-        stream = io.StringIO(text)
-        lines = text.split('\n')
-        if len(lines) > 10000:
-            return jsonify({"status": "error", "message": "CSV exceeds 10,000 rows limit"}), 400
-        
-        stream = io.StringIO(text)
-
-        # Peek header row
-        sample = stream.getvalue().splitlines()
-        headers = None
-        if len(sample) > 0:
-            first_row = sample[0]
-            # basic split for header detection
-            possible = [h.strip() for h in first_row.split(',')]
-            # if any non-numeric entries, treat as header
-            if any([not h.replace('.', '', 1).isdigit() for h in possible]):
-                headers = possible
-
-        labels = []
-        values = []
-
-        # If headers detected, use DictReader for convenience
-        stream.seek(0)
-        if headers:
-            reader = csv.DictReader(stream)
-            # decide which column to use
-            col_name = None
-            if selected_col:
-                # if selected_col is an index (string of int), convert
-                try:
-                    idx = int(selected_col)
-                    if 0 <= idx < len(headers):
-                        col_name = headers[idx]
-                except:
-                    # treat as header name
-                    if selected_col in headers:
-                        col_name = selected_col
-            # fallback to last header
-            if not col_name:
-                col_name = headers[-1]
-
-            # decide which column to use for x-axis (labels)
-            col_name_x = None
-            if selected_x:
-                try:
-                    idx = int(selected_x)
-                    if 0 <= idx < len(headers):
-                        col_name_x = headers[idx]
-                except:
-                    if selected_x in headers:
-                        col_name_x = selected_x
-
-            row_index = 0
-            for row in reader:
-                row_index += 1
-                cell = row.get(col_name)
-                if cell is None:
-                    continue
-                try:
-                    num = float(cell)
-                except:
-                    continue
-                # label from x column if available, else numeric row index
-                label_val = None
-                if col_name_x:
-                    label_val = row.get(col_name_x)
-                labels.append(label_val if label_val is not None else str(row_index))
-                values.append(num)
-        else:
-            # No headers: parse rows and select column by index or first numeric
-            reader = csv.reader(stream)
-            row_index = 0
-            for row in reader:
-                row_index += 1
-                if not row:
-                    continue
-                num = None
-                if selected_col:
-                    try:
-                        idx = int(selected_col)
-                        if 0 <= idx < len(row):
-                            num = float(row[idx])
-                    except:
-                        num = None
-                if num is None:
-                    for cell in row:
-                        try:
-                            num = float(cell)
-                            break
-                        except:
-                            continue
-                if num is None:
-                    continue
-                # x label from selected_x if numeric index provided
-                label_val = None
-                if selected_x:
-                    try:
-                        idx_x = int(selected_x)
-                        if 0 <= idx_x < len(row):
-                            label_val = row[idx_x]
-                    except:
-                        label_val = None
-                labels.append(label_val if label_val is not None else str(row_index))
-                values.append(num)
-
-        if not values:
-            return jsonify({"status": "error", "message": "No numeric data found in CSV. Ensure at least one column contains numbers."}), 400
-
-        first = values[0]
-        last = values[-1]
-        trend_pct = ((last - first) / abs(first) * 100) if first != 0 else 0
-        risk = "High Risk" if trend_pct > 10 else "Warning"
-
-        response = {
-            "status": "success",
-            "headers": headers or [],
-            "labels": labels,
-            "values": values,
-            "predictions": [
-                {"metric": "Uploaded Metric", "trend": f"{trend_pct:.1f}%", "status": risk}
-            ],
-            "recommendations": [
-                "Investigate root causes for rising metric.",
-                "Run targeted interventions and measure impact over next quarter."
-            ],
-            "summary": f"Uploaded metric changed by {trend_pct:.1f}% over the observed period."
-        }
-
-        logger.info(f"Upload successful: {len(values)} data points parsed")
-        return jsonify(response)
+        try:
+            with metrics.stage('csv_parse'):
+                table = csv_engine.read_table(file.stream, text_columns=[selected_x] if selected_x else ())
+            with metrics.stage('analytics'):
+                response = uploads.table_response(table, selected_col, selected_x, selected_columns, max_points, method)
+        except csv_engine.CSVError as e:
+            logger.warning(f"CSV rejected: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        # Handle for re-querying the parsed data via /datasets/<id>
+        response['dataset_id'] = _store_dataset(table)
+        logger.info(f"Upload successful: {len(response['rows']) + response['dropped_points']} data points parsed")
+        # JSON (optionally gzip/brotli) or the binary series format, per Accept headers
+        return wire.respond(response)
     except Exception as e:
         logger.error(f"Upload processing error: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+def _selector(value):
+    # JSON bodies may carry column indexes as numbers
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return None if value is None else str(value)
+
+
+@app.route('/datasets/<dataset_id>', methods=['GET'])
+def get_dataset(dataset_id):
+    meta = datasets.default_store().meta(dataset_id)
+    if meta is None:
+        return jsonify({"status": "error", "message": "Dataset not found or expired"}), 404
+    return jsonify({
+        "status": "success",
+        "dataset_id": dataset_id,
+        "headers": meta['headers'],
+        "rows": meta['rows'],
+        "columns": meta['headers'] or [str(i) for i in range(meta['width'])],
+    })
+
+
+@app.route('/datasets/<dataset_id>/analyze', methods=['POST'])
+def analyze_dataset(dataset_id):
+    # Same selection options and response as /upload, plus a start/stop row
+    # slice, answered from the stored columns instead of a re-upload
+    body = request.get_json(silent=True) or {}
+    table = datasets.default_store().load(dataset_id)
+    if table is None:
+        return jsonify({"status": "error", "message": "Dataset not found or expired"}), 404
+
+    try:
+        start = None if body.get('start') is None else int(body['start'])
+        stop = None if body.get('stop') is None else int(body['stop'])
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "start and stop must be integers"}), 400
+    try:
+        max_points, method = uploads.downsample_options(body)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        with metrics.stage('analytics'):
+            response = uploads.table_response(
+                table.slice(start, stop),
+                _selector(body.get('column')),
+                _selector(body.get('x_column')),
+                _selector(body.get('columns')),
+                max_points,
+                method,
+            )
+    except csv_engine.CSVError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    response['dataset_id'] = dataset_id
+    return wire.respond(response)
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
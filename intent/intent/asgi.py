@@ -0,0 +1,147 @@
+"""ASGI entry point.
+
+``POST /analyze`` is served natively on the event loop via
+``analysis.analyze_async``, so a single worker process can hold hundreds of
+in-flight analyses while waiting on the model. Its SSE mode (``?stream=1``
+or ``Accept: text/event-stream``) streams ``analysis.analyze_stream_async``
+events the same way, and records the same request metrics as the Flask
+routes (see metrics.py). Every other route is handed to the Flask app,
+which runs on a bounded thread pool and therefore is not starved by slow
+analyses.
+
+Run with::
+
+    gunicorn -w 4 -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+import analysis
+import metrics
+import stages
+import streaming
+from app import app as flask_app
+
+logger = logging.getLogger(__name__)
+
+wsgi_app = WSGIMiddleware(flask_app, workers=int(os.getenv('INTENT_WSGI_THREADS', '10')))
+
+
+async def _read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def _send_json(send, payload, status=200, timer=None):
+    headers = [(b'content-type', b'application/json')]
+    if timer is None:
+        body = json.dumps(payload).encode('utf-8')
+    else:
+        with timer.stage('render'):
+            body = json.dumps(payload).encode('utf-8')
+        headers.append((b'server-timing', timer.server_timing().encode('latin-1')))
+    headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers,
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def analyze(scope, receive, send):
+    timer = stages.StageTimer()
+    try:
+        with timer.stage('parse'):
+            payload = json.loads(await _read_body(receive) or b'null')
+            user_input = payload.get('data')
+    except Exception:
+        await _send_json(send, {"status": "error", "message": "Invalid JSON payload"}, 400)
+        return
+    logger.info(f"Analyze request (async): input_len={len(user_input) if user_input else 0}")
+    if _wants_stream(scope):
+        await _send_events(send, analysis.analyze_stream_async(user_input))
+        return
+    result = await analysis.analyze_async(user_input, timer)
+    await _send_json(send, result, timer=timer)
+
+
+async def _send_events(send, events):
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    async for name, data in events:
+        await send({'type': 'http.response.body', 'body': streaming.sse(name, data).encode('utf-8'),
+                    'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def _query(scope):
+    return parse_qs(scope.get('query_string', b'').decode('latin-1'))
+
+
+def _wants_stream(scope):
+    if _query(scope).get('stream', [''])[0] in ('1', 'true'):
+        return True
+    return streaming.wants_events(dict(scope.get('headers', [])).get(b'accept', b'').decode('latin-1'))
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def _is_native_analyze(scope):
+    if scope['type'] != 'http' or scope['path'] != '/analyze' or scope['method'] != 'POST':
+        return False
+    # ?async=1 is the submit-and-poll job mode, which Flask owns
+    return _query(scope).get('async', [''])[0] not in ('1', 'true')
+
+
+async def _instrumented(handler, route, scope, receive, send):
+    status = []
+
+    async def send_and_record(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        await send(message)
+
+    start = time.perf_counter()
+    with metrics.HTTP_IN_FLIGHT.track_inprogress(route=route):
+        try:
+            await handler(scope, receive, send_and_record)
+        finally:
+            metrics.HTTP_DURATION.observe(time.perf_counter() - start, route=route)
+            metrics.HTTP_REQUESTS.inc(route=route, method=scope['method'],
+                                      status=str(status[0] if status else 500))
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if _is_native_analyze(scope):
+        await _instrumented(analyze, '/analyze', scope, receive, send)
+        return
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,85 @@
+"""Precompressed, cache-validated responses for the UI shell and demo CSVs.
+
+The shell page (``templates/index.html``) and the ``demo_data`` CSVs do not
+change while the process runs. Each is rendered or read once at startup
+into an :class:`Asset` and compressed once: gzip at level 9, plus brotli at
+quality 11 when the optional ``brotli`` package is installed. Requests are
+then served from memory. Every response carries a strong ``ETag`` (content
+hash, suffixed per encoding) and ``Vary: Accept-Encoding``. A request whose
+``If-None-Match`` matches gets an empty ``304``.
+
+Cache lifetimes are set by the routes:
+
+* ``/`` is ``no-cache``: browsers keep the page but revalidate it on every
+  load, which costs a 304 until a deploy changes it.
+* Demo CSVs are linked from the page with their content hash (``?v=``), so
+  those URLs can be ``immutable`` and cached for a year. A request without
+  the current hash is revalidated like the page.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+class Asset:
+    """One immutable body with its precompressed variants."""
+
+    __slots__ = ('body', 'mimetype', 'version', 'encoded')
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        encoded = {}
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=11)
+        # mtime=0 so the gzip bytes (and their length) depend only on the content
+        encoded['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        # Tiny bodies can come out larger; never send those
+        self.encoded = {name: data for name, data in encoded.items() if len(data) < len(body)}
+
+    def etag(self, encoding=None):
+        return f'"{self.version}-{encoding}"' if encoding else f'"{self.version}"'
+
+    def _negotiate(self):
+        accepted = request.accept_encodings
+        for name in self.encoded:
+            if accepted[name]:
+                return name
+        return None
+
+    def response(self, cache_control=REVALIDATE):
+        """Flask response for the current request: 304, or the best encoding it accepts."""
+        encoding = self._negotiate()
+        current = [self.etag(name).strip('"') for name in (None, *self.encoded)]
+        if any(request.if_none_match.contains_weak(tag) for tag in current):
+            resp = current_app.response_class(status=304)
+        else:
+            body = self.encoded[encoding] if encoding else self.body
+            resp = current_app.response_class(body, mimetype=self.mimetype)
+            if encoding:
+                resp.headers['Content-Encoding'] = encoding
+        resp.headers['ETag'] = self.etag(encoding)
+        resp.headers['Cache-Control'] = cache_control
+        resp.vary.add('Accept-Encoding')
+        return resp
+
+
+def load_dir(directory, suffix, mimetype):
+    """``{file name: Asset}`` for the files in ``directory`` ending in ``suffix``."""
+    out = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(suffix):
+            with open(os.path.join(directory, name), 'rb') as f:
+                out[name] = Asset(f.read(), mimetype)
+    return out
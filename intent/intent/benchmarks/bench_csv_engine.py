@@ -0,0 +1,104 @@
+"""Benchmark: vectorized csv_engine vs. the old per-row ``float(cell)`` loop.
+
+    python -m benchmarks.bench_csv_engine                 # 10k, 1M, 10M rows
+    python -m benchmarks.bench_csv_engine --sizes 10000 100000
+
+The legacy parser below is the loop that used to live in both ``upload()``
+and ``process_csv_bytes``; it is kept here only as the baseline.
+"""
+import argparse
+import csv
+import io
+import time
+
+import numpy as np
+
+import csv_engine
+
+
+def legacy_parse(content, selected_col=None, selected_x=None):
+    text = content.decode('utf-8', errors='ignore')
+    stream = io.StringIO(text)
+    sample = stream.getvalue().splitlines()
+    headers = None
+    if sample:
+        possible = [h.strip() for h in sample[0].split(',')]
+        if any([not h.replace('.', '', 1).isdigit() for h in possible]):
+            headers = possible
+    labels = []
+    values = []
+    stream.seek(0)
+    reader = csv.DictReader(stream)
+    col_name = selected_col if selected_col in headers else headers[-1]
+    col_name_x = selected_x if selected_x in headers else None
+    row_index = 0
+    for row in reader:
+        row_index += 1
+        cell = row.get(col_name)
+        if cell is None:
+            continue
+        try:
+            num = float(cell)
+        except Exception:
+            continue
+        label_val = row.get(col_name_x) if col_name_x else None
+        labels.append(label_val if label_val is not None else str(row_index))
+        values.append(num)
+    return labels, values
+
+
+def make_csv(rows, seed=0):
+    """Synthetic date,value,volume CSV with ~1% non-numeric cells."""
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.normal(0, 1, rows)) + 100
+    volume = rng.integers(0, 10000, rows)
+    dates = np.datetime64('2000-01-01') + np.arange(rows).astype('timedelta64[m]')
+    value_cells = np.char.mod('%.4f', values).astype(object)
+    value_cells[rng.random(rows) < 0.01] = 'n/a'
+    body = '\n'.join(
+        f'{d},{v},{n}' for d, v, n in zip(dates.astype(str), value_cells, volume)
+    )
+    return ('date,value,volume\n' + body + '\n').encode('utf-8')
+
+
+def _time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # "engine s" builds the same labels + values as legacy; "column s" is the
+    # typed float64 column alone, which is what the analytics consume.
+    print(f"{'rows':>12} {'MB':>8} {'legacy s':>10} {'engine s':>10} {'speedup':>8} "
+          f"{'column s':>10} {'speedup':>8}")
+    for rows in args.sizes:
+        content = make_csv(rows)
+        repeat = args.repeat if rows <= 1_000_000 else 1
+
+        def engine():
+            return csv_engine.parse_series(io.BytesIO(content), 'value', 'date',
+                                           max_bytes=len(content), max_rows=rows + 1)
+
+        def column():
+            table = csv_engine.read_table(io.BytesIO(content), max_bytes=len(content), max_rows=rows + 1)
+            return table.numeric(1)
+
+        legacy_s = _time(lambda: legacy_parse(content, 'value', 'date'), repeat)
+        engine_s = _time(engine, repeat)
+        column_s = _time(column, repeat)
+        assert len(engine()['values']) == len(legacy_parse(content, 'value', 'date')[1])
+        print(f"{rows:>12,} {len(content) / 1e6:>8.1f} {legacy_s:>10.3f} {engine_s:>10.3f} "
+              f"{legacy_s / engine_s:>7.1f}x {column_s:>10.3f} {legacy_s / column_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
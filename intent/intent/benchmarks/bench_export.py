@@ -0,0 +1,85 @@
+"""Benchmark: /export with a browser PNG vs. the series drawn server-side.
+
+    python -m benchmarks.bench_export                  # 200, 2000 points
+    python -m benchmarks.bench_export --points 500 --repeat 10
+
+The PNG path stands in for ``metricChart.canvas.toDataURL()``: a line chart
+drawn with Pillow at the size a 2x (retina) display produces, sent as a
+base64 data URL. The vector path sends the same series as ``labels`` /
+``values`` JSON. Both go through the Flask test client, so the timings
+include request parsing and the full PDF render.
+"""
+import argparse
+import base64
+import io
+import json
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app import app
+
+# Canvas size of the dashboard chart on a 2x display
+PNG_SIZE = (1400, 700)
+
+
+def make_series(points, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.normal(0, 1, points)) + 100
+    labels = (np.datetime64('2024-01-01') + np.arange(points)).astype(str).tolist()
+    return labels, values.round(4).tolist()
+
+
+def chart_dataurl(values):
+    img = Image.new('RGB', PNG_SIZE, (15, 23, 42))
+    draw = ImageDraw.Draw(img)
+    w, h = PNG_SIZE
+    lo, hi = min(values), max(values)
+    xy = [(40 + i * (w - 80) / max(len(values) - 1, 1), h - 40 - (v - lo) / ((hi - lo) or 1) * (h - 80))
+          for i, v in enumerate(values)]
+    draw.line(xy, fill=(96, 165, 250), width=3)
+    for x, y in xy[::max(len(xy) // 200, 1)]:
+        draw.ellipse((x - 3, y - 3, x + 3, y + 3), outline=(96, 165, 250))
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def _export(client, body, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = client.post('/export', data=body, content_type='application/json')
+        best = min(best, time.perf_counter() - t0)
+        assert res.status_code == 200, res.data[:200]
+    return best, len(res.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, nargs='+', default=[200, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    base = {
+        'summary': 'Revenue is trending up while churn is flat.',
+        'risk': 'Medium',
+        'predictions': [{'metric': 'Uploaded Metric', 'trend': '4.2%', 'status': 'Warning'}],
+        'recommendations': ['Investigate root causes for rising metric.'],
+    }
+    client = app.test_client()
+    print(f"{'points':>8} {'path':>7} {'request KB':>11} {'PDF KB':>8} {'ms':>8}")
+    for points in args.points:
+        labels, values = make_series(points)
+        bodies = {
+            'png': json.dumps({**base, 'chart': chart_dataurl(values)}),
+            'vector': json.dumps({**base, 'labels': labels, 'values': values, 'y_label': 'revenue'}),
+        }
+        for path, body in bodies.items():
+            seconds, pdf_bytes = _export(client, body, args.repeat)
+            print(f"{points:>8,} {path:>7} {len(body) / 1024:>11.1f} {pdf_bytes / 1024:>8.1f} {seconds * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
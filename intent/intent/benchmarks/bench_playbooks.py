@@ -0,0 +1,80 @@
+"""Benchmark: playbook registry load time and per-query routing vs. playbook count.
+
+    python -m benchmarks.bench_playbooks                  # 3, 100, 1000 playbooks
+    python -m benchmarks.bench_playbooks --counts 1000 --no-fallback
+
+Writes synthetic JSON playbooks (five keywords and three example phrases
+each) into a temporary directory, loads them the way the apps do and times
+a keyword hit, a miss that goes to the TF-IDF fallback, and the per-query
+freshness check of :meth:`playbooks.PlaybookStore.registry`.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+import playbooks
+
+
+def _word(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9)))
+
+
+def write_playbooks(directory, count, rng):
+    names = []
+    for i in range(count):
+        spec = {
+            "name": f"scenario-{i}", "priority": i,
+            "keywords": [_word(rng) for _ in range(5)],
+            "examples": [' '.join(_word(rng) for _ in range(4)) for _ in range(3)],
+            "status": "STATUS", "color": "#FFFFFF", "confidence": "90.0%",
+            "analysis": "Analysis.", "strategy": "STRATEGY", "actions": ["1. Act."],
+            "impact_data": [1, 2, 3], "impact_label": "Label",
+        }
+        names.append(spec)
+        with open(os.path.join(directory, f"{spec['name']}.json"), 'w') as f:
+            json.dump(spec, f)
+    with open(os.path.join(directory, 'generic.json'), 'w') as f:
+        json.dump({"name": "generic", "default": True, "status": "", "color": "", "confidence": "",
+                   "analysis": "", "strategy": "", "actions": [], "impact_data": [], "impact_label": ""}, f)
+    return names
+
+
+def _per_call(fn, number):
+    t0 = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - t0) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[3, 100, 1000])
+    parser.add_argument('--no-fallback', action='store_true')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'playbooks':>9} {'load ms':>8} {'warm ms':>8} {'hit us':>7} {'miss us':>8} {'check us':>9}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as directory:
+            specs = write_playbooks(directory, count, rng)
+            t0 = time.perf_counter()
+            store = playbooks.PlaybookStore(directory, check_interval=2.0, fallback=not args.no_fallback)
+            load_ms = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            store.registry().warm()
+            warm_ms = (time.perf_counter() - t0) * 1000
+
+            hit = f"status of {specs[-1]['keywords'][0]} this week"
+            assert store.route(hit).name == specs[-1]['name']
+            hit_us = _per_call(lambda: store.route(hit), 2000) * 1e6
+            miss_us = _per_call(lambda: store.route('0000 1111 2222'), 200) * 1e6
+            check_us = _per_call(store.registry, 100000) * 1e6
+            print(f"{count:>9,} {load_ms:>8.1f} {warm_ms:>8.1f} {hit_us:>7.1f} {miss_us:>8.1f} {check_us:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: scenario routing with chained ``any(k in q ...)`` vs. router.Router.
+
+    python -m benchmarks.bench_router                     # 10 .. 10,000 rules
+    python -m benchmarks.bench_router --rules 100 1000 --text-chars 200 20000
+
+Rules get three random keywords each (4-10 letters). Inputs are random
+1-3 letter words, so no keyword can occur in them. That is the worst case for
+both: every rule is checked and nothing short-circuits. Timings are the best
+of ``--repeat``. Up to ``router.LINEAR_MAX_KEYWORDS`` keywords the router
+uses the linear scan itself; ``--regex`` forces the compiled pattern.
+"""
+import argparse
+import random
+import string
+import time
+
+import router
+from router import Router
+
+
+def make_rules(count, rng):
+    seen = set()
+    rules = []
+    for i in range(count):
+        keywords = []
+        while len(keywords) < 3:
+            word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+            if word not in seen:
+                seen.add(word)
+                keywords.append(word)
+        rules.append((f'scenario-{i}', keywords))
+    return rules
+
+
+def make_text(chars, rng):
+    # Keywords are at least 4 letters, so no rule matches
+    text = ''
+    while len(text) < chars:
+        text += ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 3))) + ' '
+    return text[:chars]
+
+
+def linear(rules, text):
+    q = text.lower()
+    for name, keywords in rules:
+        if any(k in q for k in keywords):
+            return name
+    return None
+
+
+def _best(fn, repeat, number):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--text-chars', type=int, nargs='+', default=[200, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--regex', action='store_true', help='always use the compiled regex')
+    args = parser.parse_args()
+    if args.regex:
+        router.LINEAR_MAX_KEYWORDS = 0
+
+    rng = random.Random(0)
+    print(f"{'rules':>7} {'chars':>6} {'compile ms':>11} {'linear us':>10} {'router us':>10} {'speedup':>8}")
+    for count in args.rules:
+        rules = make_rules(count, rng)
+        t0 = time.perf_counter()
+        scenarios = Router(rules)
+        compile_ms = (time.perf_counter() - t0) * 1000
+        for chars in args.text_chars:
+            text = make_text(chars, rng)
+            assert scenarios.match(text) is None and linear(rules, text) is None
+            number = max(1, 2000 // count)
+            lin = _best(lambda: linear(rules, text), args.repeat, number)
+            fast = _best(lambda: scenarios.match(text), args.repeat, number * 10)
+            print(f"{count:>7,} {chars:>6,} {compile_ms:>11.1f} {lin * 1e6:>10.1f} {fast * 1e6:>10.1f} {lin / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Minimal OpenAI-compatible chat completions server for offline load tests.
+
+Answers ``POST .../chat/completions`` after a fixed delay with a canned JSON
+analysis, using only asyncio so it can serve thousands of concurrent
+requests without becoming the bottleneck itself. Requests with
+``"stream": true`` get the same content as OpenAI-style SSE chunks of
+``chunk_size`` characters, spread evenly over the delay. The first
+``failures`` completion requests get a 500 instead, for exercising client
+retries and the circuit breaker.
+
+    python -m benchmarks.fake_llm --port 8765 --delay 0.5
+
+then point the app at it with ``OPENAI_API_KEY=test`` and
+``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+CANNED_ANALYSIS = {
+    "risk_level": "Critical",
+    "summary": "Fake LLM: churn is trending up while revenue is flat.",
+    "predictions": [
+        {"metric": "Customer Churn", "trend": "+8%", "status": "High Risk"},
+        {"metric": "Revenue", "trend": "+0.5%", "status": "Warning"},
+    ],
+    "recommendations": [
+        "Launch a retention campaign for at-risk accounts.",
+        "Review pricing for the lowest-margin tier.",
+    ],
+}
+
+
+def completion_body(content, model='fake-llm'):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def chunk_body(content=None, finish_reason=None, model='fake-llm'):
+    delta = {} if content is None else {"content": content}
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+class FakeLLMServer:
+    def __init__(self, host='127.0.0.1', port=0, delay=0.5, content=None, chunk_size=8, failures=0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.failures = failures
+        self.content = content if content is not None else json.dumps(CANNED_ANALYSIS)
+        self.requests = 0
+        self._server = None
+        self._handlers = set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _stream(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+
+        async def event(data):
+            payload = f"data: {data}\n\n".encode('utf-8')
+            writer.write(f"{len(payload):x}\r\n".encode('latin-1') + payload + b"\r\n")
+            await writer.drain()
+
+        pieces = [self.content[i:i + self.chunk_size] for i in range(0, len(self.content), self.chunk_size)]
+        for piece in pieces:
+            await asyncio.sleep(self.delay / max(len(pieces), 1))
+            await event(json.dumps(chunk_body(piece)))
+        await event(json.dumps(chunk_body(finish_reason='stop')))
+        await event('[DONE]')
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    if name.strip().lower() == 'content-length':
+                        length = int(value.strip())
+                body = await reader.readexactly(length) if length else b''
+                self.requests += 1
+                if method == 'POST' and path.endswith('/chat/completions'):
+                    if self.failures > 0:
+                        self.failures -= 1
+                        await self._respond(writer, '500 Internal Server Error',
+                                            {"error": {"message": "injected failure"}})
+                        continue
+                    if json.loads(body or b'{}').get('stream'):
+                        await self._stream(writer)
+                        continue
+                    await asyncio.sleep(self.delay)
+                    await self._respond(writer, '200 OK', completion_body(self.content))
+                else:
+                    await self._respond(writer, '404 Not Found', {"error": {"message": "not found"}})
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread; returns once it is listening."""
+        ready = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        self._loop = loop
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    def stop(self):
+        loop = getattr(self, '_loop', None)
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds per completion')
+    parser.add_argument('--chunk-size', type=int, default=8, help='characters per streamed delta')
+    parser.add_argument('--failures', type=int, default=0, help='answer the first N completions with a 500')
+    args = parser.parse_args()
+    server = FakeLLMServer(args.host, args.port, args.delay, chunk_size=args.chunk_size, failures=args.failures)
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1 (delay={args.delay}s)")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Startup benchmark: ``python -X importtime`` budget for the app entry points.
+
+    python -m benchmarks.import_budget                    # app and asgi
+    python -m benchmarks.import_budget --budget-ms 250 --runs 5 --top 15
+
+Imports each module in a fresh interpreter ``--runs`` times with
+``-X importtime`` and keeps the fastest run, which is the least disturbed by
+the machine. Prints the cumulative import time and the slowest imports
+under it. Exits with status 1 when any entry point is over
+``--budget-ms`` or imports one of ``startup.LAZY_MODULES``, so it can gate
+CI.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if __package__ in (None, ''):
+    # Run as a script (python benchmarks/import_budget.py): make the app modules importable
+    sys.path.insert(0, APP_DIR)
+
+from startup import LAZY_MODULES  # noqa: E402
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_profile(module):
+    """``(total_us, [(cumulative_us, depth, name), ...])`` for one fresh import.
+
+    Children are listed before their parent, the module itself (depth 0) last.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=APP_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        us, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 0 and name != module:
+            # Interpreter startup (site, encodings, ...), not this import
+            rows = []
+            continue
+        rows.append((us, depth, name))
+        if depth == 0:
+            return us, rows
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=['app', 'asgi'])
+    parser.add_argument('--budget-ms', type=float, default=400.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        total, rows = min((import_profile(module) for _ in range(args.runs)), key=lambda run: run[0])
+        eager = sorted({name for _, _, name in rows} & set(LAZY_MODULES))
+        over = total / 1000 > args.budget_ms
+        status = 'FAIL' if over or eager else 'ok'
+        print(f"{module}: {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms) {status}")
+        if eager:
+            print(f"  imported at startup, should be lazy: {', '.join(eager)}")
+        # Direct dependencies of the entry point, slowest first
+        for us, _, name in sorted((r for r in rows if r[1] == 1), reverse=True)[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+        failed = failed or over or bool(eager)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Load test: sync gunicorn workers vs. the ASGI /analyze path.
+
+Starts the fake LLM server, then boots the app twice -- once as
+``gunicorn -w N app:app`` (sync workers, the old deployment) and once as
+``gunicorn -w N -k uvicorn.workers.UvicornWorker asgi:app`` -- and fires the
+same burst of concurrent ``/analyze`` requests at each. While the burst is
+in flight it also times small ``/upload`` probes to show whether the other
+routes are starved.
+
+    python -m benchmarks.load_analyze --requests 200 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE_CSV = b'date,value\n2024-01,1\n2024-02,2\n2024-03,3\n'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _boot(target, port, workers, worker_class, env):
+    cmd = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+           '--timeout', '120', '--keep-alive', '30', '--log-level', 'warning']
+    if worker_class:
+        cmd += ['-k', worker_class]
+    cmd.append(target)
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/', timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f'{target} did not start')
+
+
+async def _burst(base, total, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    probes = []
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=300) as client:
+        async def one(i):
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.post('/analyze', json={'data': f'churn is rising in region {i}'})
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        async def probe(done):
+            async with httpx.AsyncClient(base_url=base, timeout=300) as probe_client:
+                while not done.is_set():
+                    t0 = time.perf_counter()
+                    await probe_client.post('/upload', files={'file': ('probe.csv', PROBE_CSV, 'text/csv')})
+                    probes.append(time.perf_counter() - t0)
+                    await asyncio.sleep(0.1)
+
+        done = asyncio.Event()
+        probe_task = asyncio.create_task(probe(done))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await probe_task
+    return elapsed, latencies, probes
+
+
+def run(label, target, worker_class, args, env):
+    port = _free_port()
+    proc = _boot(target, port, args.workers, worker_class, env)
+    try:
+        elapsed, latencies, probes = asyncio.run(
+            _burst(f'http://127.0.0.1:{port}', args.requests, args.concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"{label:<12} {args.requests / elapsed:8.1f} req/s  "
+          f"p50={statistics.median(latencies):.2f}s p95={_percentile(latencies, 95):.2f}s  "
+          f"/upload probe p50={statistics.median(probes) * 1000:.0f}ms max={max(probes) * 1000:.0f}ms")
+    return args.requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--llm-delay', type=float, default=0.5, help='fake LLM latency in seconds')
+    parser.add_argument('--demo-latency', type=float, default=0.0,
+                        help='value for INTENT_DEMO_LATENCY (the app default is 2s)')
+    args = parser.parse_args()
+
+    llm_server = FakeLLMServer(delay=args.llm_delay).start_in_thread()
+    env = dict(os.environ,
+               OPENAI_API_KEY='test',
+               OPENAI_BASE_URL=llm_server.base_url,
+               INTENT_DEMO_LATENCY=str(args.demo_latency))
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.workers} workers, "
+          f"LLM delay {args.llm_delay}s")
+    sync_rps = run('sync', 'app:app', None, args, env)
+    async_rps = run('asgi', 'asgi:app', 'uvicorn.workers.UvicornWorker', args, env)
+    print(f"throughput gain: {async_rps / sync_rps:.1f}x")
+    llm_server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""Benchmark suite: latency percentiles, throughput and peak RSS per route.
+
+    python -m benchmarks.run                              # every case
+    python -m benchmarks.run --cases upload --rows 10000 100000
+    python -m benchmarks.run --output before.json         # on the old commit
+    python -m benchmarks.run --compare before.json        # on the new one
+
+Cases:
+
+- ``upload-<rows>-header`` / ``-headerless``: synthetic three-column CSVs
+  posted to ``/upload`` with ``max_points=2000``, as the UI does. The upload
+  byte and row limits are lifted so the 1M-row file is accepted.
+- ``export-plain``, ``export-series`` (2,000-point vector chart),
+  ``export-png`` (chart sent as a PNG data URL) and ``export-long`` (500
+  recommendations, 200 predictions). The report cache is off, so every
+  request renders.
+- ``analyze-mock`` (no API key) and ``analyze-llm`` (the local fake LLM
+  server, ``--llm-delay`` seconds per completion). The response cache is off
+  and ``INTENT_MODE=production``, so there is no simulated latency.
+
+Everything runs offline. Each case runs in a freshly spawned process, so its
+peak RSS is its own. Requests go through the Flask test client from
+``--concurrency`` threads: the timings are the app's own, with no network
+or server in between. A case stops after ``--repeat`` requests or once
+``--max-seconds`` have passed, whichever comes first, but always makes at
+least ``MIN_REQUESTS``. Results go to ``--output`` as JSON (default
+``bench-<commit>.json``) and ``--compare`` prints the change against an
+earlier file.
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if __package__ in (None, ''):
+    # Run as a script (python benchmarks/run.py): make the app modules importable
+    sys.path.insert(0, APP_DIR)
+
+CASE_GROUPS = ('upload', 'export', 'analyze')
+MIN_REQUESTS = 5
+# The UI downsamples uploads to this many chart points (MAX_CHART_POINTS in index.html)
+CHART_POINTS = 2000
+
+
+def make_csv(rows, header, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    columns = np.column_stack([np.arange(rows), np.cumsum(rng.normal(0, 1, rows)) + 1000,
+                               rng.integers(0, 500, rows)])
+    buf = io.StringIO()
+    if header:
+        buf.write('day,revenue,units\n')
+    np.savetxt(buf, columns, fmt=['%d', '%.4f', '%d'], delimiter=',')
+    return buf.getvalue().encode('utf-8')
+
+
+def _export_payload(kind):
+    from benchmarks.bench_export import chart_dataurl, make_series
+
+    payload = {
+        'summary': 'Revenue is trending up while churn is flat.',
+        'risk': 'Medium',
+        'predictions': [{'metric': 'Uploaded Metric', 'trend': '4.2%', 'status': 'Warning'}],
+        'recommendations': ['Investigate root causes for rising metric.'],
+    }
+    if kind in ('series', 'png'):
+        labels, values = make_series(CHART_POINTS)
+        if kind == 'series':
+            payload.update(labels=labels, values=values, y_label='revenue')
+        else:
+            payload['chart'] = chart_dataurl(values)
+    elif kind == 'long':
+        payload['predictions'] = [{'metric': f'Metric {i}', 'trend': f'{i % 9}.5%', 'status': 'Warning'}
+                                  for i in range(200)]
+        payload['recommendations'] = [f'Recommendation {i}: review the drivers behind segment {i} '
+                                      'and agree an owner for the follow-up.' for i in range(500)]
+    return json.dumps(payload).encode('utf-8')
+
+
+def _upload_request(case):
+    from werkzeug.datastructures import FileStorage
+    from werkzeug.test import encode_multipart
+
+    # Encoded once, so the timings don't include building the request
+    content = make_csv(case['rows'], case['header'])
+    boundary, body = encode_multipart({
+        'file': FileStorage(io.BytesIO(content), filename='bench.csv', content_type='text/csv'),
+        'max_points': str(CHART_POINTS),
+    })
+    content_type = f'multipart/form-data; boundary={boundary}'
+    return body, lambda client, i: client.post('/upload', data=body, content_type=content_type)
+
+
+def _export_request(case):
+    body = _export_payload(case['variant'])
+    return body, lambda client, i: client.post('/export', data=body, content_type='application/json')
+
+
+def _analyze_request(case):
+    # Distinct inputs, as a cache would otherwise be in play; so no single body to report
+    return None, lambda client, i: client.post('/analyze', json={'data': f'Churn is rising in region {i}'})
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _percentile(ordered, pct):
+    # Nearest-rank on a sorted list
+    return ordered[max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))]
+
+
+def run_case(case, options):
+    """Run one case in this process and return its result dict."""
+    llm_server = None
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.update(
+            INTENT_MODE='production',
+            INTENT_CACHE_BACKEND='none',
+            INTENT_REPORT_CACHE_BACKEND='none',
+            INTENT_DATASET_DIR=scratch,
+            INTENT_MAX_UPLOAD_ROWS=str(10 ** 9),
+            INTENT_MAX_UPLOAD_BYTES=str(2 ** 31),
+        )
+        os.environ.pop('OPENAI_API_KEY', None)
+        if case['name'] == 'analyze-llm':
+            from benchmarks.fake_llm import FakeLLMServer
+
+            llm_server = FakeLLMServer(delay=options['llm_delay']).start_in_thread()
+            os.environ.update(OPENAI_API_KEY='bench', OPENAI_BASE_URL=llm_server.base_url)
+        try:
+            return _measure(case, options)
+        finally:
+            if llm_server is not None:
+                llm_server.stop()
+
+
+def _measure(case, options):
+    from app import app
+
+    # Per-request INFO lines would be most of the output, and of the time for small requests
+    logging.getLogger().setLevel(logging.WARNING)
+
+    body, send = {'upload': _upload_request, 'export': _export_request,
+                  'analyze': _analyze_request}[case['group']](case)
+    clients = [app.test_client() for _ in range(options['concurrency'])]
+
+    def one(client, i):
+        t0 = time.perf_counter()
+        res = send(client, i)
+        size = len(res.data)
+        res.close()
+        return time.perf_counter() - t0, res.status_code, size
+
+    one(clients[0], -1)  # warm-up: imports, lazy caches, first-call setup
+    started = time.perf_counter()
+    deadline = started + options['max_seconds']
+
+    def worker(slot):
+        # Each thread keeps its own results; they are combined after the pool joins
+        out = []
+        i = slot
+        while i < options['repeat'] and (i < MIN_REQUESTS or time.perf_counter() < deadline):
+            out.append(one(clients[slot], i))
+            i += options['concurrency']
+        return out
+
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+        samples = [sample for out in pool.map(worker, range(options['concurrency'])) for sample in out]
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(seconds for seconds, _, _ in samples)
+    errors = sum(1 for _, status, _ in samples if status != 200)
+    response_bytes = max(size for _, _, size in samples)
+    return {
+        'case': case['name'],
+        'route': f"/{case['group']}",
+        'requests': len(ordered),
+        'errors': errors,
+        'concurrency': options['concurrency'],
+        'request_bytes': len(body) if body is not None else None,
+        'response_bytes': response_bytes,
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'throughput_rps': round(len(ordered) / elapsed, 2),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def build_cases(args):
+    cases = []
+    if 'upload' in args.cases:
+        for rows in args.rows:
+            for header in (True, False):
+                cases.append({'name': f"upload-{rows}-{'header' if header else 'headerless'}",
+                              'group': 'upload', 'rows': rows, 'header': header})
+    if 'export' in args.cases:
+        for variant in ('plain', 'series', 'png', 'long'):
+            cases.append({'name': f'export-{variant}', 'group': 'export', 'variant': variant})
+    if 'analyze' in args.cases:
+        for variant in ('mock', 'llm'):
+            cases.append({'name': f'analyze-{variant}', 'group': 'analyze'})
+    return cases
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results):
+    print(f"{'case':<28} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'RSS MB':>7}")
+    for r in results:
+        rss = '-' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.0f}"
+        errors = f"  {r['errors']} errors" if r['errors'] else ''
+        print(f"{r['case']:<28} {r['requests']:>4} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['throughput_rps']:>8.1f} {rss:>7}{errors}")
+
+
+def _print_comparison(results, path):
+    with open(path) as f:
+        before = {r['case']: r for r in json.load(f)['results']}
+    print(f"\nvs. {path}")
+    print(f"{'case':<28} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'RSS':>8}")
+    for r in results:
+        old = before.get(r['case'])
+        if old is None:
+            continue
+
+        def change(field):
+            if not old.get(field) or r.get(field) is None:
+                return '-'
+            return f"{(r[field] / old[field] - 1) * 100:+.0f}%"
+        print(f"{r['case']:<28} {change('p50_ms'):>8} {change('p95_ms'):>8} {change('p99_ms'):>8} "
+              f"{change('throughput_rps'):>8} {change('peak_rss_mb'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', nargs='+', choices=CASE_GROUPS, default=list(CASE_GROUPS))
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=50, help='maximum requests per case')
+    parser.add_argument('--max-seconds', type=float, default=15.0, help='time budget per case')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--llm-delay', type=float, default=0.05, help='fake LLM latency in seconds')
+    parser.add_argument('--output', help='results file (default bench-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    options = {'repeat': args.repeat, 'max_seconds': args.max_seconds,
+               'concurrency': args.concurrency, 'llm_delay': args.llm_delay}
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for case in build_cases(args):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_case, (case, options))
+        results.append(result)
+        print(f"  {case['name']}: p50 {result['p50_ms']:.2f} ms", file=sys.stderr)
+
+    _print_results(results)
+    output = args.output or f"bench-{commit or 'local'}.json"
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nwrote {output}")
+    if args.compare:
+        _print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Content-addressed response cache for analysis results.
+
+Keys are a SHA-256 of the normalized input text plus the model name and
+prompt version, so near-identical inputs (case, whitespace) share an entry
+and a prompt or model change never serves stale answers.
+
+Two backends are provided:
+
+* ``MemoryBackend`` -- per-process LRU bounded by total bytes.
+* ``SQLiteBackend`` -- a local SQLite file shared by every gunicorn worker
+  (and the Streamlit app) on the host, with the same LRU/byte cap.
+
+Configured from the environment by :func:`default_cache`:
+``INTENT_CACHE_BACKEND`` (``memory``/``sqlite``/``none``), ``INTENT_CACHE_PATH``,
+``INTENT_CACHE_TTL`` (seconds) and ``INTENT_CACHE_MAX_BYTES``.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.casefold().split())
+
+
+def make_key(text, model, prompt_version):
+    material = json.dumps([prompt_version, model, normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters['evictions'] += 1
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def incr(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork (gunicorn preload) or a thread
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, now):
+        conn = self._conn()
+        row = conn.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at < now:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return bytes(value)
+
+    def set(self, key, value, expires_at):
+        if len(value) > self.max_bytes:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+            (key, value, len(value), expires_at, now),
+        )
+        self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM entries WHERE expires_at < ?', (now,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        for _ in victims:
+            self.incr('evictions')
+
+    def incr(self, counter):
+        self._conn().execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + 1', (counter,))
+
+    def stats(self):
+        conn = self._conn()
+        stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+        stats.update(dict(conn.execute('SELECT name, value FROM counters')))
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        stats.update(entries=entries, bytes=size)
+        return stats
+
+    def clear(self):
+        self._conn().execute('DELETE FROM entries')
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            raw = self.backend.get(key, time.time())
+            self.backend.incr('misses' if raw is None else 'hits')
+        except Exception as e:
+            logger.warning(f"Cache read failed: {str(e)}")
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value):
+        try:
+            raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+            self.backend.set(key, raw, time.time() + self.ttl)
+            self.backend.incr('sets')
+        except Exception as e:
+            logger.warning(f"Cache write failed: {str(e)}")
+
+    def stats(self):
+        stats = self.backend.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = self.backend.name
+        stats['ttl'] = self.ttl
+        stats['max_bytes'] = self.backend.max_bytes
+        return stats
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache built from the environment, or None if disabled."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            backend_name = os.getenv('INTENT_CACHE_BACKEND', 'memory').lower()
+            max_bytes = int(os.getenv('INTENT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+            ttl = int(os.getenv('INTENT_CACHE_TTL', '3600'))
+            if backend_name in ('none', 'off', '0'):
+                _default = False
+            elif backend_name == 'sqlite':
+                path = os.getenv('INTENT_CACHE_PATH') or os.path.join(tempfile.gettempdir(), 'intent-cache.sqlite3')
+                _default = ResponseCache(SQLiteBackend(path, max_bytes), ttl)
+            else:
+                _default = ResponseCache(MemoryBackend(max_bytes), ttl)
+        return _default or None
@@ -0,0 +1,380 @@
+"""Columnar CSV engine shared by the Flask app and the Streamlit app.
+
+Uploads are parsed in one pass by pandas' C parser into typed NumPy columns;
+numeric conversion and NaN-skipping are vectorized instead of running
+``float(cell)`` per row in Python. The upload stream is decoded
+incrementally through a byte-limited reader, so the raw bytes are never held
+in memory as a whole and an oversized upload is rejected as soon as it
+crosses the byte or row limit.
+
+pandas is imported by the first parse, not at module load, so processes
+that never parse a CSV (or haven't yet) don't pay its import time.
+
+"""
+import csv
+import io
+import os
+import re
+import warnings
+
+import numpy as np
+
+MAX_UPLOAD_BYTES = int(os.getenv('INTENT_MAX_UPLOAD_BYTES', str(5 * 1024 * 1024)))
+MAX_UPLOAD_ROWS = int(os.getenv('INTENT_MAX_UPLOAD_ROWS', '10000'))
+
+# Read granularity for the underlying upload stream
+CHUNK_SIZE = 64 * 1024
+
+
+class CSVError(ValueError):
+    """Raised for uploads that should be rejected with a 400 and this message."""
+
+
+def size_limit_message(max_bytes):
+    return f"File size exceeds {max_bytes / (1024 * 1024):g}MB limit"
+
+
+def row_limit_message(max_rows):
+    return f"CSV exceeds {max_rows:,} rows limit"
+
+
+class LimitedReader(io.RawIOBase):
+    """Binary reader that raises CSVError once more than max_bytes are read."""
+
+    def __init__(self, raw, max_bytes):
+        self._raw = raw
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._raw.read(min(len(buffer), CHUNK_SIZE))
+        if not data:
+            return 0
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise CSVError(size_limit_message(self.max_bytes))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_limited(stream, max_bytes=None):
+    """Wrap a binary upload stream as a buffered, size-limited reader."""
+    limited = LimitedReader(stream, MAX_UPLOAD_BYTES if max_bytes is None else max_bytes)
+    return io.BufferedReader(limited, buffer_size=CHUNK_SIZE)
+
+
+def _looks_like_header(row):
+    # if any non-numeric entries, treat as header
+    return any(not h.strip().replace('.', '', 1).isdigit() for h in row)
+
+
+def _resolve_column(selected, headers):
+    """Map a column name or index (as a string) onto a header index."""
+    if not selected:
+        return None
+    try:
+        idx = int(selected)
+        return idx if 0 <= idx < len(headers) else None
+    except ValueError:
+        return headers.index(selected) if selected in headers else None
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class _Prepend(io.RawIOBase):
+    """Binary stream that replays an already-consumed line before the rest."""
+
+    def __init__(self, head, rest):
+        self._head = head
+        self._rest = rest
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if self._head:
+            if size is None or size < 0:
+                out, self._head = self._head + self._rest.read(), b''
+                return out
+            out, self._head = self._head[:size], self._head[size:]
+            return out
+        return self._rest.read(size)
+
+
+class Table:
+    """Parsed CSV: raw pandas columns addressed by position, plus headers."""
+
+    def __init__(self, headers, frame, row_numbers):
+        self.headers = headers
+        self.frame = frame
+        # 1-based data row number of every frame row, used as default labels
+        self.row_numbers = row_numbers
+
+    @property
+    def width(self):
+        return self.frame.shape[1]
+
+    def __len__(self):
+        return self.frame.shape[0]
+
+    @property
+    def column_names(self):
+        # Headerless files address columns by their index
+        return self.headers or [str(i) for i in range(self.width)]
+
+    def numeric(self, idx):
+        """Column ``idx`` as float64 with NaN for non-numeric and infinite cells."""
+        col = self.frame[idx]
+        if col.dtype.kind in 'iub':
+            return col.to_numpy(dtype=np.float64)
+        if col.dtype.kind == 'f':
+            values = col.to_numpy(dtype=np.float64)
+        else:
+            import pandas as pd
+            values = pd.to_numeric(col, errors='coerce').to_numpy(dtype=np.float64)
+        # "inf" parses as a number; as a gap it can't break the fit or the JSON
+        infinite = np.isinf(values)
+        return np.where(infinite, np.nan, values) if infinite.any() else values
+
+    def slice(self, start=None, stop=None):
+        """Rows ``start:stop`` (0-based, like a Python slice) as a new Table."""
+        return Table(self.headers, self.frame.iloc[start:stop], self.row_numbers[start:stop])
+
+    def text(self, idx):
+        """Column ``idx`` as an object array of strings, None where a row is too short."""
+        col = self.frame[idx]
+        out = col.astype(str).to_numpy(dtype=object)
+        out[col.isna().to_numpy()] = None
+        return out
+
+
+# How many times to re-read a seekable upload to widen the column set when a
+# later row has more fields than the first one; after that, such rows are
+# skipped.
+MAX_WIDTH_RETRIES = 3
+
+NA_VALUES = ['', 'NA', 'N/A', 'n/a', 'NaN', 'nan', 'null', 'NULL', 'None', '-', '#N/A']
+
+_FIELDS_RE = re.compile(r'saw (\d+)')
+
+
+def read_table(stream, text_columns=(), max_bytes=None, max_rows=None):
+    """Parse a binary CSV stream into a :class:`Table` in a single pass.
+
+    ``text_columns`` are column selectors (name or index) that are kept as
+    raw strings, e.g. the x-axis label column. Raises CSVError for empty
+    files and files over the byte or row limit.
+    """
+    import pandas as pd
+
+    max_rows = MAX_UPLOAD_ROWS if max_rows is None else max_rows
+    start = stream.tell() if stream.seekable() else None
+    width = 0
+
+    for attempt in range(MAX_WIDTH_RETRIES + 1):
+        raw = open_limited(stream, max_bytes)
+        first_line = raw.readline()
+        while first_line and not first_line.strip().strip(b','):
+            first_line = raw.readline()
+        if not first_line:
+            raise CSVError("CSV file is empty")
+        first = next(csv.reader([first_line.decode('utf-8', errors='ignore')]))
+
+        if _looks_like_header(first):
+            headers = [h.strip() for h in first]
+            source = raw
+            data_rows = max_rows - 1
+            text_idx = {_resolve_column(c, headers) for c in text_columns}
+        else:
+            headers = []
+            source = _Prepend(first_line, raw)
+            data_rows = max_rows
+            text_idx = {_int_or_none(c) for c in text_columns}
+
+        width = max(width, len(first))
+        text_idx = {i for i in text_idx if i is not None and 0 <= i < width}
+        can_retry = start is not None and attempt < MAX_WIDTH_RETRIES
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always', pd.errors.ParserWarning)
+                frame = pd.read_csv(
+                    source,
+                    header=None,
+                    names=list(range(width)),
+                    index_col=False,
+                    dtype={i: object for i in text_idx} or None,
+                    # Text columns keep '' for empty cells; numeric ones treat
+                    # the usual placeholders as NaN so they stay float64
+                    keep_default_na=False,
+                    na_values={i: NA_VALUES for i in range(width) if i not in text_idx},
+                    encoding='utf-8',
+                    encoding_errors='ignore',
+                    nrows=data_rows + 1,
+                    # Blank lines still count as rows for headerless files, like csv.reader
+                    skip_blank_lines=bool(headers),
+                    on_bad_lines='error' if can_retry else 'skip',
+                    engine='c',
+                )
+        except pd.errors.EmptyDataError:
+            frame = pd.DataFrame({i: pd.Series([], dtype=object) for i in range(width)})
+        except pd.errors.ParserError as e:
+            # A row is wider than the first one: re-read with more columns
+            match = _FIELDS_RE.search(str(e))
+            if not can_retry or not match:
+                raise CSVError("Could not parse CSV file") from e
+            width = int(match.group(1))
+            stream.seek(start)
+            continue
+        if can_retry and any(issubclass(w.category, pd.errors.ParserWarning) for w in caught):
+            # The first data row had exactly one extra field, which the parser
+            # truncates instead of rejecting
+            width += 1
+            stream.seek(start)
+            continue
+        break
+
+    if len(frame) > data_rows:
+        raise CSVError(row_limit_message(max_rows))
+    return Table(headers, frame, np.arange(1, len(frame) + 1))
+
+
+def _labels(table, x_idx, mask):
+    # label from x column if available; None means "label by row number",
+    # which callers can send as numbers instead of a list of strings
+    if x_idx is None:
+        return None
+    labels = table.text(x_idx)[mask]
+    missing = labels == None  # noqa: E711 -- elementwise on an object array
+    labels[missing] = table.row_numbers[mask][missing].astype(str)
+    return labels
+
+
+def label_strings(rows, labels):
+    """String labels for a selection: ``labels`` itself, or the row numbers as text."""
+    return labels if labels is not None else rows.astype(str).astype(object)
+
+
+def select_series(table, selected_col=None, selected_x=None):
+    """Pick the Y column (and optional X label column) out of a table.
+
+    Returns ``(rows, labels, values)`` NumPy arrays with non-numeric rows
+    removed: 1-based data row numbers, X labels (None when no X column is
+    selected) and the float64 values.
+    """
+    if table.headers:
+        # decide which column to use, falling back to the last header
+        col_idx = _resolve_column(selected_col, table.headers)
+        if col_idx is None:
+            col_idx = len(table.headers) - 1
+        x_idx = _resolve_column(selected_x, table.headers)
+        values = table.numeric(col_idx)
+    else:
+        # No headers: use the selected column, else the first numeric cell per row
+        col_idx = _int_or_none(selected_col)
+        x_idx = _int_or_none(selected_x)
+        if x_idx is not None and not 0 <= x_idx < table.width:
+            x_idx = None
+        matrix = np.column_stack([table.numeric(i) for i in range(table.width)])
+        valid = ~np.isnan(matrix)
+        first_numeric = valid.argmax(axis=1)
+        values = matrix[np.arange(len(matrix)), first_numeric]
+        if col_idx is not None and 0 <= col_idx < table.width:
+            preferred = matrix[:, col_idx]
+            values = np.where(np.isnan(preferred), values, preferred)
+
+    mask = ~np.isnan(values)
+    return table.row_numbers[mask], _labels(table, x_idx, mask), values[mask]
+
+
+def select_columns(table, columns='*', selected_x=None):
+    """Pick every numeric column (``'*'``) or a requested subset out of a table.
+
+    ``columns`` is ``'*'`` or a comma-separated string / list of column names
+    or indexes. Returns ``(rows, labels, series)`` like :func:`select_series`,
+    where ``series`` maps column name to a float64 array aligned with ``rows``,
+    NaN marking a missing value.
+    Rows with no numeric value in any selected column are dropped. Raises
+    CSVError for unknown columns.
+    """
+    names = table.column_names
+    x_idx = _resolve_column(selected_x, names)
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+    if not columns or '*' in columns:
+        wanted = [i for i in range(len(names)) if i != x_idx]
+    else:
+        wanted = []
+        for selected in columns:
+            idx = _resolve_column(selected, names)
+            if idx is None:
+                raise CSVError(f"Unknown column: {selected}")
+            wanted.append(idx)
+
+    series = {}
+    for idx in wanted:
+        values = table.numeric(idx)
+        if names[idx] not in series and not np.isnan(values).all():
+            series[names[idx]] = values
+    if not series:
+        return table.row_numbers[:0], None, {}
+
+    mask = ~np.isnan(np.column_stack(list(series.values()))).all(axis=1)
+    return table.row_numbers[mask], _labels(table, x_idx, mask), {name: values[mask] for name, values in series.items()}
+
+
+def json_values(values):
+    """Float array as a JSON-ready list, with None (null) for NaN and infinities."""
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+NO_NUMERIC_MESSAGE = "No numeric data found in CSV. Ensure at least one column contains numbers."
+
+
+def series_from_table(table, selected_col=None, selected_x=None):
+    """:func:`select_series` as a response dict; raises CSVError if nothing is numeric."""
+    rows, labels, values = select_series(table, selected_col, selected_x)
+    if not len(values):
+        raise CSVError(NO_NUMERIC_MESSAGE)
+    return {"headers": table.headers, "rows": rows, "labels": labels, "values": values}
+
+
+def columns_from_table(table, columns='*', selected_x=None):
+    """:func:`select_columns` as a response dict; raises CSVError if nothing is numeric."""
+    rows, labels, series = select_columns(table, columns, selected_x)
+    if not series:
+        raise CSVError(NO_NUMERIC_MESSAGE)
+    return {"headers": table.headers, "rows": rows, "labels": labels, "series": series}
+
+
+def parse_series(stream, selected_col=None, selected_x=None, max_bytes=None, max_rows=None):
+    """Parse one numeric series out of a CSV upload.
+
+    ``stream`` is a binary file-like object. Returns a dict with ``headers``
+    (empty when the file has no header row) and the NumPy ``rows``,
+    ``labels`` and ``values`` arrays of :func:`select_series`. Raises
+    CSVError for empty files, files over the limits and files with no
+    numeric data.
+    """
+    table = read_table(stream, text_columns=[selected_x] if selected_x else (),
+                       max_bytes=max_bytes, max_rows=max_rows)
+    return series_from_table(table, selected_col, selected_x)
+
+
+def parse_columns(stream, columns='*', selected_x=None, max_bytes=None, max_rows=None):
+    """Parse several numeric series out of a CSV upload in one pass.
+
+    Returns a dict with ``headers``, shared ``rows`` and ``labels`` and
+    ``series`` (column name -> float64 array, NaN for gaps), in file order.
+    Raises CSVError like :func:`parse_series`.
+    """
+    table = read_table(stream, text_columns=[selected_x] if selected_x else (),
+                       max_bytes=max_bytes, max_rows=max_rows)
+    return columns_from_table(table, columns, selected_x)
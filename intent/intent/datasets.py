@@ -0,0 +1,204 @@
+"""Server-side store for parsed CSV uploads.
+
+``/upload`` parses a file once and stores its columns here. The response
+carries a ``dataset_id`` handle, and later requests slice or re-analyze
+the data by handle without re-uploading or re-parsing it.
+
+Each dataset is a directory under ``root`` holding one ``.npy`` file per
+column plus a ``meta.json``. Numeric columns are memory-mapped on load, so
+a query only pages in the rows it touches. Text columns (labels) are stored
+as fixed-width strings. The store lives on the local filesystem, so every
+gunicorn worker (and the Streamlit app) on the host shares it.
+
+Ids are a hash of the parsed content, so uploading the same file twice
+yields the same handle. Datasets expire ``ttl`` seconds after their last
+access. Once the store grows past ``max_bytes``, the least recently used
+ones are removed.
+
+Configured from the environment by :func:`default_store`:
+``INTENT_DATASET_DIR``, ``INTENT_DATASET_TTL`` (seconds) and
+``INTENT_DATASET_MAX_BYTES``.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import csv_engine
+
+logger = logging.getLogger(__name__)
+
+DATASET_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def source_id(content):
+    """Dataset id for raw upload bytes, for callers that hold the whole file."""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def _column_arrays(col):
+    """Split a parsed column into (values, missing-mask) arrays fit for np.save."""
+    if col.dtype.kind in 'fiub':
+        return col.to_numpy(), None
+    missing = col.isna().to_numpy()
+    return col.where(~missing, '').astype(str).to_numpy(dtype=str), missing
+
+
+class DatasetStore:
+    def __init__(self, root=None, ttl=3600, max_bytes=512 * 1024 * 1024):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'intent-datasets')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._last_purge = 0.0
+
+    def _path(self, dataset_id):
+        return os.path.join(self.root, dataset_id)
+
+    def put(self, table, dataset_id=None):
+        """Store a :class:`csv_engine.Table` and return its dataset id.
+
+        ``dataset_id`` defaults to a hash of the table's contents.
+        """
+        columns = [_column_arrays(table.frame[i]) for i in range(table.width)]
+        meta = {
+            "headers": table.headers,
+            "rows": len(table),
+            "width": table.width,
+            "kinds": ['text' if missing is not None else 'numeric' for _, missing in columns],
+            "bytes": sum(values.nbytes + (missing.nbytes if missing is not None else 0)
+                         for values, missing in columns),
+        }
+        if dataset_id is None:
+            digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode('utf-8'))
+            for values, missing in columns:
+                digest.update(values.dtype.str.encode('ascii'))
+                digest.update(values.tobytes())
+                if missing is not None:
+                    digest.update(missing.tobytes())
+            dataset_id = digest.hexdigest()[:32]
+
+        path = self._path(dataset_id)
+        if os.path.isdir(path):
+            self._touch(path)
+            return dataset_id
+
+        # Build in a private directory, then rename it into place so readers
+        # never see a half-written dataset
+        tmp = os.path.join(self.root, f'.{dataset_id}.{uuid.uuid4().hex}.tmp')
+        os.makedirs(tmp)
+        try:
+            for i, (values, missing) in enumerate(columns):
+                np.save(os.path.join(tmp, f'{i}.npy'), values)
+                if missing is not None:
+                    np.save(os.path.join(tmp, f'{i}.missing.npy'), missing)
+            meta['created_at'] = time.time()
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+            # another worker stored the same content first
+        self._purge(force=True)
+        return dataset_id
+
+    def meta(self, dataset_id):
+        """Return the stored metadata, or None for unknown, expired or malformed ids."""
+        if not DATASET_ID_RE.match(dataset_id or ''):
+            return None
+        path = self._path(dataset_id)
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            if time.time() - os.stat(path).st_mtime > self.ttl:
+                return None
+        except (FileNotFoundError, ValueError):
+            return None
+        return meta
+
+    def load(self, dataset_id):
+        """Return the stored :class:`csv_engine.Table`, or None if it is gone."""
+        self._purge()
+        meta = self.meta(dataset_id)
+        if meta is None:
+            return None
+        path = self._path(dataset_id)
+        frame = {}
+        try:
+            for i, kind in enumerate(meta['kinds']):
+                values = np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r')
+                if kind == 'text':
+                    values = values.astype(object)
+                    values[np.load(os.path.join(path, f'{i}.missing.npy'))] = None
+                frame[i] = values
+        except FileNotFoundError:
+            # evicted by another worker while we were reading
+            return None
+        self._touch(path)
+        import pandas as pd
+
+        # copy=False keeps the numeric columns backed by the mapped files
+        frame = pd.DataFrame(frame, columns=range(meta['width']), copy=False)
+        return csv_engine.Table(meta['headers'], frame, np.arange(1, meta['rows'] + 1))
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _purge(self, force=False):
+        """Drop expired datasets, then least recently used ones over max_bytes."""
+        now = time.time()
+        if not force and now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        live = []
+        for entry in os.scandir(self.root):
+            try:
+                if entry.name.startswith('.'):
+                    # stale build directories from a crashed writer
+                    if now - entry.stat().st_mtime > self.ttl:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                accessed = entry.stat().st_mtime
+                if now - accessed > self.ttl:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                with open(os.path.join(entry.path, 'meta.json'), encoding='utf-8') as f:
+                    live.append((accessed, json.load(f)['bytes'], entry.path))
+            except (OSError, ValueError, KeyError):
+                pass
+        total = sum(size for _, size, _ in live)
+        for _, size, path in sorted(live):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Process-wide store built from the environment."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = DatasetStore(
+                root=os.getenv('INTENT_DATASET_DIR'),
+                ttl=int(os.getenv('INTENT_DATASET_TTL', '3600')),
+                max_bytes=int(os.getenv('INTENT_DATASET_MAX_BYTES', str(512 * 1024 * 1024))),
+            )
+        return _default
@@ -0,0 +1,99 @@
+"""Server-side downsampling of long series before they are sent to Chart.js.
+
+Both methods return the positions of the points to keep, so labels, values
+and any per-point overlays can be sliced consistently:
+
+* ``lttb`` -- Largest-Triangle-Three-Buckets. Within each bucket it keeps the
+  point that forms the largest triangle with its neighbouring buckets. This
+  preserves the visual shape of the line. Each bucket is anchored on the
+  *mean* of the previous bucket rather than the previously chosen point, so
+  every bucket is scored independently in one vectorized pass.
+* ``minmax`` -- keeps the minimum and maximum of every bucket, so no peak
+  or trough is ever lost.
+
+Both run in O(n) with NumPy; no per-point Python loop.
+"""
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def _first_per_bucket(hit, bucket):
+    # Position of the first True in each bucket, for buckets sorted ascending
+    idx = np.flatnonzero(hit)
+    b = bucket[idx]
+    return idx[np.r_[True, b[1:] != b[:-1]]]
+
+
+def lttb(values, n_out):
+    """Positions of ``n_out`` points chosen by (mean-anchored) LTTB."""
+    n = len(values)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 buckets over the interior points 1..n-2; the ends are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+    cs = np.concatenate(([0.0], np.cumsum(values)))
+    mean_y = (cs[ends] - cs[starts]) / sizes
+    mean_x = (starts + ends - 1) / 2.0
+
+    # Anchors: previous bucket mean (or the first point), next bucket mean (or the last)
+    ax = np.r_[0.0, mean_x[:-1]]
+    ay = np.r_[values[0], mean_y[:-1]]
+    bx = np.r_[mean_x[1:], n - 1.0]
+    by = np.r_[mean_y[1:], values[-1]]
+
+    bucket = np.repeat(np.arange(len(sizes)), sizes)
+    x = np.arange(1, n - 1, dtype=np.float64)
+    y = values[1:n - 1]
+    area = np.abs((ax[bucket] - bx[bucket]) * (y - ay[bucket]) - (ax[bucket] - x) * (by[bucket] - ay[bucket]))
+    best = np.maximum.reduceat(area, starts - 1)
+    picks = _first_per_bucket(area == best[bucket], bucket) + 1
+    return np.concatenate(([0], picks, [n - 1]))
+
+
+def minmax(values, n_out):
+    """Positions of the min and max of ``(n_out - 2) // 2`` buckets, plus both ends."""
+    n = len(values)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    edges = np.linspace(0, n, (n_out - 2) // 2 + 1).astype(np.int64)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(edges))
+    lo = _first_per_bucket(values == np.minimum.reduceat(values, starts)[bucket], bucket)
+    hi = _first_per_bucket(values == np.maximum.reduceat(values, starts)[bucket], bucket)
+    return np.unique(np.concatenate(([0], lo, hi, [n - 1])))
+
+
+def select(values, max_points, method='lttb', keep=()):
+    """Sorted positions to keep from ``values`` (NaN and infinite entries are gaps).
+
+    Gaps are skipped, and the positions in ``keep`` (e.g. flagged anomalies)
+    are always included, so the result can exceed ``max_points`` by
+    ``len(keep)``. Raises ValueError for an unknown method.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    positions = np.flatnonzero(np.isfinite(values))
+    if len(positions) <= max_points:
+        chosen = positions
+    else:
+        pick = lttb if method == 'lttb' else minmax
+        chosen = positions[pick(values[positions], max_points)]
+    if len(keep):
+        chosen = np.union1d(chosen, np.asarray(keep, dtype=np.int64))
+    return chosen
+
+
+def select_many(series, max_points, method='lttb', keep=()):
+    """Shared positions for several aligned series (multi-column uploads).
+
+    Each series gets an equal share of ``max_points``; the union of their
+    picks is returned so every line keeps its own shape.
+    """
+    budget = max(max_points // max(len(series), 1), 4)
+    chosen = [select(values, budget, method) for values in series]
+    if len(keep):
+        chosen.append(np.asarray(keep, dtype=np.int64))
+    return np.unique(np.concatenate(chosen)) if chosen else np.arange(0)
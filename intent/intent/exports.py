@@ -0,0 +1,174 @@
+"""Cache and request coalescing for ``/export`` PDFs.
+
+Reports are keyed by a SHA-256 of the canonicalized payload: the fields
+:func:`report.render` reads, with JSON numbers normalized and the chart
+data URL reduced to a hash of its decoded image bytes. The key doubles as
+the response ``ETag``, so a client that already holds the PDF gets a 304.
+
+Rendered PDFs are kept in a :class:`cache.SQLiteBackend` file by default,
+shared by every worker on the host and bounded by the same LRU byte cap.
+Concurrent requests for the same key in one process share a single render.
+
+Configured from the environment by :func:`default_cache`:
+``INTENT_REPORT_CACHE_BACKEND`` (``sqlite``/``memory``/``none``),
+``INTENT_REPORT_CACHE_PATH``, ``INTENT_REPORT_CACHE_TTL`` (seconds) and
+``INTENT_REPORT_CACHE_MAX_BYTES``.
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+import cache
+import report
+
+logger = logging.getLogger(__name__)
+
+# Bump when the PDF layout changes so cached reports are not served stale
+REPORT_VERSION = '2'
+
+REPORT_FIELDS = ('summary', 'risk', 'predictions', 'recommendations',
+                 'labels', 'values', 'y_label', 'rolling_mean', 'anomalies', 'chart')
+
+# Larger PDFs are streamed from their spool file and never cached
+MAX_ENTRY_BYTES = 16 * 1024 * 1024
+
+
+def _numbers(items):
+    # 1 and 1.0 render the same; None (a gap) stays None
+    try:
+        return [None if v is None else float(v) for v in items]
+    except (TypeError, ValueError):
+        return items  # malformed; report.render rejects it
+
+
+def _chart_digest(dataurl):
+    try:
+        return hashlib.sha256(base64.b64decode(dataurl.split(',', 1)[1])).hexdigest()
+    except Exception:
+        return dataurl
+
+
+def payload_key(payload):
+    """Cache key (and ETag) for an ``/export`` payload."""
+    fields = {name: payload.get(name) for name in REPORT_FIELDS}
+    for name in ('values', 'rolling_mean'):
+        if isinstance(fields[name], list):
+            fields[name] = _numbers(fields[name])
+    if isinstance(fields['chart'], str) and fields['labels'] is None and fields['values'] is None:
+        fields['chart'] = _chart_digest(fields['chart'])
+    else:
+        fields['chart'] = None  # the series takes precedence; see report.render
+    material = json.dumps([REPORT_VERSION, fields], sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def etag(key):
+    return f'"{key[:32]}"'
+
+
+class ReportCache:
+    def __init__(self, backend, ttl=86400, max_entry_bytes=MAX_ENTRY_BYTES):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        try:
+            pdf = self.backend.get(key, time.time())
+            self.backend.incr('misses' if pdf is None else 'hits')
+            return pdf
+        except Exception as e:
+            logger.warning(f"Report cache read failed: {str(e)}")
+            return None
+
+    def _set(self, key, pdf):
+        try:
+            self.backend.set(key, pdf, time.time() + self.ttl)
+            self.backend.incr('sets')
+        except Exception as e:
+            logger.warning(f"Report cache write failed: {str(e)}")
+
+    def _render(self, key, payload):
+        out, size = report.spool(payload)
+        if size > self.max_entry_bytes:
+            return out, size, None
+        pdf = out.read()
+        out.close()
+        self._set(key, pdf)
+        return None, size, pdf
+
+    def export(self, key, payload):
+        """``(file, size, source)`` for a payload: a cached, shared or fresh PDF.
+
+        ``source`` is ``hit``, ``coalesced`` or ``miss``. Raises ValueError
+        from :func:`report.render` for malformed payloads, to every waiter.
+        """
+        pdf = self._get(key)
+        if pdf is not None:
+            return io.BytesIO(pdf), len(pdf), 'hit'
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            pdf = flight.result()
+            if pdf is not None:
+                return io.BytesIO(pdf), len(pdf), 'coalesced'
+            # too large to share: render our own copy
+            out, size = report.spool(payload)
+            return out, size, 'miss'
+
+        try:
+            out, size, pdf = self._render(key, payload)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(pdf)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return (out if pdf is None else io.BytesIO(pdf)), size, 'miss'
+
+    def stats(self):
+        stats = self.backend.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = self.backend.name
+        stats['ttl'] = self.ttl
+        stats['max_bytes'] = self.backend.max_bytes
+        return stats
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide report cache built from the environment, or None if disabled."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            backend_name = os.getenv('INTENT_REPORT_CACHE_BACKEND', 'sqlite').lower()
+            max_bytes = int(os.getenv('INTENT_REPORT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+            ttl = int(os.getenv('INTENT_REPORT_CACHE_TTL', '86400'))
+            if backend_name in ('none', 'off', '0'):
+                _default = False
+            elif backend_name == 'memory':
+                _default = ReportCache(cache.MemoryBackend(max_bytes), ttl)
+            else:
+                path = os.getenv('INTENT_REPORT_CACHE_PATH') or os.path.join(
+                    tempfile.gettempdir(), 'intent-reports.sqlite3')
+                _default = ReportCache(cache.SQLiteBackend(path, max_bytes), ttl)
+        return _default or None
@@ -0,0 +1,25 @@
+"""Gunicorn settings, loaded automatically from the working directory.
+
+Command-line flags (the Dockerfile and Procfile pass workers, worker class
+and bind address) take precedence over anything set here.
+
+``INTENT_PRELOAD=1`` (or ``--preload``) loads the app and its heavy
+dependencies once in the master; workers are forked from it and share those
+pages copy-on-write. See startup.py.
+"""
+import os
+
+preload_app = os.getenv('INTENT_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def on_starting(server):
+    # Worker metric files from a previous run would be summed into this one's totals
+    import metrics
+    metrics.clear_dir()
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if server.cfg.preload_app:
+        import startup
+        startup.preload()
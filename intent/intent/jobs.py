@@ -0,0 +1,121 @@
+"""Submit-and-poll job queue for slow analyses.
+
+Jobs run on a bounded thread pool. Once every worker is busy and the
+pending queue is full, ``submit`` raises :class:`QueueFull` carrying a
+Retry-After estimate instead of queueing without limit.
+
+Job state is written as one small JSON file per job under ``result_dir`` so
+any gunicorn worker on the same host can answer ``GET /jobs/<id>``, not just
+the one that accepted the job.
+"""
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    def __init__(self, fn, max_workers=4, max_pending=32, result_dir=None, ttl=3600):
+        self.fn = fn
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_dir = result_dir or os.path.join(tempfile.gettempdir(), 'intent-jobs')
+        self.ttl = ttl
+        os.makedirs(self.result_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='intent-job')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_seconds = 2.0
+        self._last_purge = 0.0
+
+    def _path(self, job_id):
+        return os.path.join(self.result_dir, f'{job_id}.json')
+
+    def _write(self, job_id, state):
+        path = self._path(job_id)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def retry_after(self):
+        with self._lock:
+            backlog = self._in_flight
+            avg = self._avg_seconds
+        return max(1, math.ceil(avg * backlog / self.max_workers))
+
+    def submit(self, *args):
+        """Queue ``fn(*args)`` and return its job id, or raise QueueFull."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull(self.retry_after())
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._in_flight += 1
+        self._write(job_id, {"job_id": job_id, "status": "queued", "submitted_at": time.time()})
+        try:
+            self._executor.submit(self._run, job_id, args)
+        except Exception:
+            self._release()
+            raise
+        return job_id
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _run(self, job_id, args):
+        started = time.time()
+        try:
+            self._write(job_id, {"job_id": job_id, "status": "running", "started_at": started})
+            try:
+                state = {"job_id": job_id, "status": "done", "result": self.fn(*args)}
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+                state = {"job_id": job_id, "status": "failed", "message": "Analysis failed"}
+            state['finished_at'] = time.time()
+            self._write(job_id, state)
+        finally:
+            with self._lock:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.time() - started)
+            self._release()
+
+    def get(self, job_id):
+        """Return the stored job state, or None for unknown or malformed ids."""
+        if not JOB_ID_RE.match(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        for entry in os.scandir(self.result_dir):
+            try:
+                if entry.name.endswith('.json') and now - entry.stat().st_mtime > self.ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,378 @@
+"""Shared OpenAI chat completions client for the Flask app and Streamlit.
+
+Clients are created lazily and reused for the life of the process so every
+call shares one keep-alive connection pool. The ``openai`` and ``httpx``
+packages (about a third of a second to import) are only imported by the
+first call, so workers that never reach the model don't load them.
+``OPENAI_BASE_URL`` can point the clients at a local stub (see
+``benchmarks/fake_llm.py``) for load testing.
+
+Every call goes through the same policy:
+
+* **Deadline** -- ``OPENAI_TIMEOUT`` seconds for the whole call, retries
+  included; each attempt only gets the time that is left.
+* **Retries** -- up to ``OPENAI_RETRIES`` more attempts for connection
+  errors, timeouts, 429s and 5xx responses, after a full-jitter exponential
+  backoff (``OPENAI_RETRY_BACKOFF`` base seconds). The SDK's own retries are
+  disabled so the two policies do not multiply.
+* **Circuit breaker** -- after ``OPENAI_BREAKER_FAILURES`` consecutive
+  failed calls the breaker opens, and calls raise :class:`CircuitOpen`
+  immediately, so callers fall back to the local answer without waiting on
+  a sick upstream. After ``OPENAI_BREAKER_RESET`` seconds one trial call is
+  let through; its outcome closes or re-opens the breaker.
+
+Counters for all of the above are returned by :func:`stats`.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+import metrics
+
+_sync_client = None
+_sync_client_key = None
+# AsyncOpenAI wraps an httpx.AsyncClient, which is bound to the event loop it
+# was first used on, so keep one client per loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _retryable(e):
+    # Errors that say nothing about the request itself, only about upstream health
+    import openai
+    return isinstance(e, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the model while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_after:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    _count('breaker_opened')
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about upstream health (it failed locally)."""
+        with self._lock:
+            self._trial_running = False
+
+    def reset(self):
+        self.record_success()
+
+
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('OPENAI_BREAKER_FAILURES', '5')),
+    reset_after=float(os.getenv('OPENAI_BREAKER_RESET', '30')),
+)
+
+_COUNTERS = ('calls', 'attempts', 'successes', 'failures', 'retries', 'timeouts',
+             'short_circuits', 'breaker_opened', 'streams')
+_metrics = dict.fromkeys(_COUNTERS, 0)
+_metrics['latency_seconds_total'] = 0.0
+_metrics_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+    if name in _COUNTERS:
+        metrics.LLM_EVENTS.inc(amount, event=name)
+
+
+def stats():
+    """Call, retry, timeout and breaker counters for this process."""
+    with _metrics_lock:
+        out = dict(_metrics)
+    out['latency_seconds_avg'] = round(out['latency_seconds_total'] / out['successes'], 4) if out['successes'] else 0.0
+    out['breaker_state'] = breaker.state
+    return out
+
+
+def reset_stats():
+    with _metrics_lock:
+        _metrics.update(dict.fromkeys(_COUNTERS, 0), latency_seconds_total=0.0)
+
+
+def _client_key():
+    return (os.getenv('OPENAI_API_KEY'), os.getenv('OPENAI_BASE_URL') or None)
+
+
+def _pool_limits():
+    import httpx
+
+    # Passing our own httpx clients also sidesteps the ``proxies`` argument
+    # that openai 1.52 hands to httpx>=0.28.
+    size = int(os.getenv('OPENAI_POOL_SIZE', '100'))
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size,
+                        keepalive_expiry=float(os.getenv('OPENAI_KEEPALIVE', '30')))
+
+
+def _deadline_seconds():
+    return float(os.getenv('OPENAI_TIMEOUT', '20'))
+
+
+def _max_retries():
+    return int(os.getenv('OPENAI_RETRIES', '2'))
+
+
+def _backoff(attempt):
+    # Full jitter: uniform over [0, base * 2^attempt], capped at 5s
+    base = float(os.getenv('OPENAI_RETRY_BACKOFF', '0.25'))
+    return random.uniform(0, min(5.0, base * 2 ** attempt))
+
+
+def model_name():
+    return os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+
+
+def is_configured():
+    return bool(os.getenv('OPENAI_API_KEY'))
+
+
+def get_client():
+    global _sync_client, _sync_client_key
+    import httpx
+    import openai
+
+    key = _client_key()
+    if _sync_client is None or _sync_client_key != key:
+        api_key, base_url = key
+        _sync_client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                     http_client=httpx.Client(limits=_pool_limits()))
+        _sync_client_key = key
+    return _sync_client
+
+
+def get_async_client():
+    import httpx
+    import openai
+
+    loop = asyncio.get_running_loop()
+    key = _client_key()
+    entry = _async_clients.get(loop)
+    if entry is None or entry[0] != key:
+        api_key, base_url = key
+        entry = (key, openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0,
+                                         http_client=httpx.AsyncClient(limits=_pool_limits())))
+        _async_clients[loop] = entry
+    return entry[1]
+
+
+def _request_kwargs(messages):
+    return {
+        'model': model_name(),
+        'messages': messages,
+        'max_tokens': 600,
+        'temperature': 0.2,
+    }
+
+
+def _admit():
+    _count('calls')
+    if not breaker.allow():
+        _count('short_circuits')
+        raise CircuitOpen("LLM circuit breaker is open")
+    return time.monotonic() + _deadline_seconds()
+
+
+def _attempt_failed(e, attempt, deadline):
+    """Backoff before the next attempt, or None if the call has failed for good."""
+    import openai
+
+    if isinstance(e, openai.APITimeoutError):
+        _count('timeouts')
+    if not _retryable(e):
+        if isinstance(e, openai.APIStatusError):
+            # The upstream answered (e.g. 400/401), so it is up
+            breaker.record_success()
+        else:
+            # Never reached the upstream (a bug or bad arguments on our side)
+            breaker.release()
+        return None
+    delay = _backoff(attempt)
+    if attempt < _max_retries() and time.monotonic() + delay < deadline:
+        _count('retries')
+        return delay
+    breaker.record_failure()
+    _count('failures')
+    return None
+
+
+def _succeeded(started):
+    breaker.record_success()
+    _count('successes')
+    _count('latency_seconds_total', time.monotonic() - started)
+
+
+def _call(request, deadline, settle=True):
+    """Run ``request(timeout)`` under the retry and breaker policy.
+
+    With ``settle=False`` a successful request is not yet recorded as a
+    success; streams record their outcome once the body has been read.
+    """
+    started = time.monotonic()
+    attempt = 0
+    with metrics.LLM_IN_FLIGHT.track_inprogress(), metrics.stage('llm'):
+        while True:
+            _count('attempts')
+            try:
+                result = request(max(deadline - time.monotonic(), 0.001))
+            except Exception as e:
+                delay = _attempt_failed(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if settle:
+                _succeeded(started)
+            return result
+
+
+async def _acall(request, deadline, settle=True):
+    """Async variant of :func:`_call`; ``request`` returns an awaitable."""
+    started = time.monotonic()
+    attempt = 0
+    with metrics.LLM_IN_FLIGHT.track_inprogress(), metrics.stage('llm'):
+        while True:
+            _count('attempts')
+            try:
+                result = await request(max(deadline - time.monotonic(), 0.001))
+            except Exception as e:
+                delay = _attempt_failed(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if settle:
+                _succeeded(started)
+            return result
+
+
+def complete(messages):
+    """Run a chat completion and return the message content."""
+    deadline = _admit()
+    resp = _call(lambda timeout: get_client().chat.completions.create(
+        timeout=timeout, **_request_kwargs(messages)), deadline)
+    return resp.choices[0].message.content
+
+
+async def acomplete(messages):
+    """Async variant of :func:`complete`."""
+    deadline = _admit()
+    resp = await _acall(lambda timeout: get_async_client().chat.completions.create(
+        timeout=timeout, **_request_kwargs(messages)), deadline)
+    return resp.choices[0].message.content
+
+
+def _stream_failed(e):
+    import openai
+
+    # Retrying is only possible before the first piece; later failures count
+    # against the breaker and end the call
+    if isinstance(e, openai.APITimeoutError):
+        _count('timeouts')
+    breaker.record_failure()
+    _count('failures')
+
+
+def _stream_ended(started, outcome):
+    # One breaker outcome per stream, recorded when it ends
+    if outcome == 'done':
+        _succeeded(started)
+    elif outcome is None:
+        # Abandoned by the consumer: says nothing about upstream health
+        breaker.release()
+
+
+def stream(messages):
+    """Run a streamed chat completion, yielding content pieces as they arrive.
+
+    The deadline covers the whole stream; opening it is retried like
+    :func:`complete`.
+    """
+    import openai
+
+    deadline = _admit()
+    _count('streams')
+    started = time.monotonic()
+    chunks = _call(lambda timeout: get_client().chat.completions.create(
+        stream=True, timeout=timeout, **_request_kwargs(messages)), deadline, settle=False)
+    outcome = None
+    try:
+        for chunk in chunks:
+            if time.monotonic() > deadline:
+                raise openai.APITimeoutError(request=chunks.response.request)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = 'done'
+    except Exception as e:
+        outcome = 'failed'
+        _stream_failed(e)
+        raise
+    finally:
+        _stream_ended(started, outcome)
+        chunks.close()
+
+
+async def astream(messages):
+    """Async variant of :func:`stream`."""
+    import openai
+
+    deadline = _admit()
+    _count('streams')
+    started = time.monotonic()
+    chunks = await _acall(lambda timeout: get_async_client().chat.completions.create(
+        stream=True, timeout=timeout, **_request_kwargs(messages)), deadline, settle=False)
+    outcome = None
+    try:
+        async for chunk in chunks:
+            if time.monotonic() > deadline:
+                raise openai.APITimeoutError(request=chunks.response.request)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        outcome = 'done'
+    except Exception as e:
+        outcome = 'failed'
+        _stream_failed(e)
+        raise
+    finally:
+        _stream_ended(started, outcome)
+        await chunks.close()
@@ -0,0 +1,300 @@
+"""Prometheus-style metrics, aggregated across worker processes.
+
+Counters, gauges and histograms are kept in memory per process. When
+``INTENT_METRICS_DIR`` is set, each process also writes its values to
+``<dir>/metrics-<pid>.json``: from a background thread at most every
+``FLUSH_INTERVAL`` seconds, at exit, and whenever it serves ``/metrics``.
+:func:`exposition` merges every file into the Prometheus text format.
+Counters and histograms are summed over all workers, including ones that
+have exited, so totals survive worker restarts. Gauges (in-flight requests)
+are summed over live workers only. Empty the directory when the server
+starts (``gunicorn.conf.py`` does); otherwise a previous run's totals are
+counted too. Without ``INTENT_METRICS_DIR`` only the current process is
+reported.
+
+Values recorded before a fork (e.g. in a preloading gunicorn master) stay
+with the parent; each child starts from zero.
+"""
+import atexit
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0
+
+# Seconds; spans cache hits (sub-ms) to slow LLM calls and large PDF renders
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = {}
+_values = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+_dirty = False
+_flusher_pid = None
+
+
+def _labels_key(metric, labels):
+    if len(labels) == len(metric.labelnames):
+        try:
+            return tuple([str(labels[name]) for name in metric.labelnames])
+        except KeyError:
+            pass
+    raise ValueError(f"{metric.name} takes labels {metric.labelnames}, got {tuple(labels)}")
+
+
+def _update(key, fn):
+    global _pid, _dirty, _values
+    with _lock:
+        if os.getpid() != _pid:
+            # Forked: the parent's values are the parent's to report
+            _pid = os.getpid()
+            _values = {}
+        _values[key] = fn(_values.get(key))
+        _dirty = True
+    if _flusher_pid != _pid and metrics_dir():
+        _start_flusher()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[name] = self
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _update((self.name, _labels_key(self, labels)), lambda v: (v or 0) + amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        _update((self.name, _labels_key(self, labels)), lambda v: (v or 0) + amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        _update((self.name, _labels_key(self, labels)), lambda v: value)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        # Stored as [per-bucket counts..., +Inf count, sum]; cumulated on export
+        slot = bisect.bisect_left(self.buckets, value)
+
+        def add(v):
+            v = v or [0] * (len(self.buckets) + 1) + [0.0]
+            v[slot] += 1
+            v[-1] += value
+            return v
+        _update((self.name, _labels_key(self, labels)), add)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+# --- Metrics recorded by the apps ---
+
+HTTP_REQUESTS = Counter('intent_http_requests_total', 'HTTP requests by route, method and status',
+                        ('route', 'method', 'status'))
+HTTP_DURATION = Histogram('intent_http_request_duration_seconds',
+                          'Time from request start to the last byte of the response', ('route',))
+HTTP_IN_FLIGHT = Gauge('intent_http_requests_in_flight', 'Requests being served', ('route',))
+STAGE_DURATION = Histogram('intent_stage_duration_seconds',
+                           'Time spent per pipeline stage (csv_parse, analytics, llm, pdf_layout, ...)',
+                           ('stage',))
+LLM_EVENTS = Counter('intent_llm_events_total',
+                     'LLM client events: calls, attempts, retries, timeouts, failures, short_circuits, ...',
+                     ('event',))
+LLM_IN_FLIGHT = Gauge('intent_llm_calls_in_flight', 'LLM calls waiting on the upstream')
+LLM_FALLBACKS = Counter('intent_llm_fallbacks_total',
+                        'Analyses answered by the local mock after a live call was attempted', ('reason',))
+
+
+def stage(name):
+    """Context manager timing one pipeline stage into ``intent_stage_duration_seconds``."""
+    return STAGE_DURATION.time(stage=name)
+
+
+# --- Multi-process files ---
+
+def metrics_dir():
+    return os.getenv('INTENT_METRICS_DIR')
+
+
+def clear_dir():
+    """Remove every worker file; call once when the server starts."""
+    directory = metrics_dir()
+    if not directory:
+        return
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _snapshot():
+    with _lock:
+        if os.getpid() != _pid:
+            return []
+        return [[name, list(labels), value] for (name, labels), value in _values.items()]
+
+
+def flush():
+    """Write this process's values to its file in ``INTENT_METRICS_DIR``."""
+    global _dirty
+    directory = metrics_dir()
+    if not directory:
+        return
+    with _lock:
+        _dirty = False
+    path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({"pid": os.getpid(), "samples": _snapshot()}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Metrics flush failed: {str(e)}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        if _dirty:
+            flush()
+
+
+def _start_flusher():
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _flusher_pid == os.getpid():
+        flush()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(total, name, labels, value, live):
+    metric = _registry.get(name)
+    if metric is None or (metric.kind == 'gauge' and not live):
+        return
+    key = (name, tuple(labels))
+    if metric.kind == 'histogram':
+        current = total.get(key)
+        if current is not None and len(current) == len(value):
+            value = [a + b for a, b in zip(current, value)]
+        total[key] = list(value)
+    else:
+        total[key] = total.get(key, 0) + value
+
+
+def collect():
+    """``{(name, labels): value}`` summed over every worker."""
+    total = {}
+    for name, labels, value in _snapshot():
+        _merge(total, name, labels, value, live=True)
+    directory = metrics_dir()
+    if directory:
+        flush()
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('pid') == os.getpid():
+                continue
+            live = _alive(data['pid'])
+            for name, labels, value in data.get('samples', ()):
+                _merge(total, name, labels, value, live)
+    return total
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    samples = collect()
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for (sample_name, labels), value in sorted(samples.items()):
+            if sample_name != name:
+                continue
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (math.inf,), value[:-1]):
+                cumulative += count
+                le = (('le', _format_value(bound)),)
+                lines.append(f'{name}_bucket{_format_labels(metric.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(metric.labelnames, labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(metric.labelnames, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,227 @@
+"""Scenario playbooks loaded from data files.
+
+Each ``.json`` (or, with PyYAML installed, ``.yaml``/``.yml``) file under the
+playbook directory holds one playbook or a list of them:
+
+```json
+{"name": "cyber", "priority": 10, "keywords": ["breach", "attack"],
+ "examples": ["hackers got into our systems"],
+ "status": "CRITICAL EXPOSURE", "color": "#FF4B4B", "confidence": "98.4%",
+ "analysis": "...", "strategy": "...", "actions": ["..."],
+ "impact_data": [100, 80, 45], "impact_label": "..."}
+```
+
+Playbooks are routed in ``priority`` order (then name) by a
+:class:`router.Router` built once per load; exactly one playbook is marked
+``"default": true`` and answers queries nothing else matches. Loaded
+playbooks are immutable ``__slots__`` objects, and their ``response``
+mapping is built once, so a query costs one router pass and no allocation.
+
+:class:`PlaybookStore` re-checks file mtimes at most every
+``check_interval`` seconds. When something changed it builds a new
+:class:`Registry` on a background thread, fallback model included, and
+swaps it in; queries keep using the old one meanwhile. A file that fails to
+load is logged and the previous registry is kept. Call :func:`default_store`
+at process start: under a preloading gunicorn master the playbooks are then
+loaded before the fork, and workers share them copy-on-write.
+
+Configured from the environment by :func:`default_store`:
+``INTENT_PLAYBOOK_DIR`` and ``INTENT_PLAYBOOK_RELOAD`` (seconds, ``0`` to
+check on every query).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import router
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+LOAD_ERRORS = (OSError, ValueError, TypeError, AttributeError) + ((yaml.YAMLError,) if yaml is not None else ())
+
+PLAYBOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'playbooks')
+
+RESPONSE_FIELDS = ('status', 'color', 'confidence', 'analysis', 'strategy',
+                   'actions', 'impact_data', 'impact_label')
+
+
+class Playbook:
+    """One scenario: how it is matched and the response it gives."""
+
+    __slots__ = ('name', 'priority', 'keywords', 'examples', 'default', 'source') + RESPONSE_FIELDS + ('response',)
+
+    def __init__(self, spec, source=None):
+        missing = [f for f in ('name',) + RESPONSE_FIELDS if f not in spec]
+        if missing:
+            raise ValueError(f"playbook {spec.get('name', '?')!r} is missing {', '.join(missing)}")
+        if not isinstance(spec['actions'], list) or not isinstance(spec['impact_data'], list):
+            raise ValueError(f"playbook {spec['name']!r}: actions and impact_data must be lists")
+        values = {
+            'name': str(spec['name']),
+            'priority': float(spec.get('priority', 100)),
+            'keywords': tuple(str(k) for k in spec.get('keywords', ())),
+            'examples': tuple(str(e) for e in spec.get('examples', ())),
+            'default': bool(spec.get('default', False)),
+            'source': source,
+        }
+        for field in RESPONSE_FIELDS:
+            values[field] = spec[field]
+        values['actions'] = tuple(str(a) for a in spec['actions'])
+        values['impact_data'] = tuple(float(v) for v in spec['impact_data'])
+        values['response'] = MappingProxyType({f: values[f] for f in RESPONSE_FIELDS})
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return f"Playbook({self.name!r})"
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        if path.endswith('.json'):
+            return json.load(f)
+        return yaml.safe_load(f)
+
+
+def _files(directory):
+    suffixes = ('.json', '.yaml', '.yml') if yaml is not None else ('.json',)
+    with os.scandir(directory) as entries:
+        return sorted((e.path, e.stat().st_mtime_ns, e.stat().st_size)
+                      for e in entries if e.is_file() and e.name.endswith(suffixes))
+
+
+class Registry:
+    """An immutable set of playbooks and the router over them."""
+
+    def __init__(self, playbooks, fallback=True):
+        ordered = sorted((p for p in playbooks if not p.default), key=lambda p: (p.priority, p.name))
+        defaults = [p for p in playbooks if p.default]
+        if len(defaults) != 1:
+            raise ValueError(f"expected exactly one default playbook, found {len(defaults)}")
+        names = [p.name for p in playbooks]
+        if len(set(names)) != len(names):
+            raise ValueError("playbook names must be unique")
+        self.playbooks = tuple(ordered)
+        self.default = defaults[0]
+        self._by_name = {p.name: p for p in playbooks}
+        self._router = router.Router([(p.name, p.keywords, p.examples) for p in ordered], fallback=fallback)
+
+    @classmethod
+    def load(cls, directory, fallback=True):
+        playbooks = []
+        for path, _, _ in _files(directory):
+            try:
+                data = _read(path)
+                for spec in (data if isinstance(data, list) else [data]):
+                    playbooks.append(Playbook(spec, source=path))
+            except LOAD_ERRORS as e:
+                raise ValueError(f"{os.path.basename(path)}: {e}") from e
+        return cls(playbooks, fallback=fallback)
+
+    def __len__(self):
+        return len(self.playbooks) + 1
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def warm(self):
+        self._router.warm()
+
+    def route(self, query):
+        """The playbook for ``query``; the default one if nothing matches."""
+        name = self._router.classify(query)
+        return self._by_name[name] if name else self.default
+
+
+class PlaybookStore:
+    def __init__(self, directory=PLAYBOOK_DIR, check_interval=2.0, fallback=True):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.fallback = fallback
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._signature = _files(directory)
+        self._registry = Registry.load(directory, fallback=fallback)
+        self._checked = time.monotonic()
+
+    def reload(self, signature=None):
+        """Rebuild the registry from disk and swap it in; raises ValueError
+        (or OSError) and keeps the current one if a file is bad."""
+        signature = signature or _files(self.directory)
+        registry = Registry.load(self.directory, fallback=self.fallback)
+        registry.warm()
+        with self._lock:
+            self._signature = signature
+            self._registry = registry
+            self.reloads += 1
+        logger.info(f"Reloaded {len(registry)} playbooks from {self.directory}")
+        return registry
+
+    def _reload_in_background(self, signature):
+        try:
+            self.reload(signature)
+        except (OSError, ValueError) as e:
+            logger.error(f"Playbook reload failed, keeping the previous set: {str(e)}")
+            with self._lock:
+                # Don't retry until the files change again
+                self._signature = signature
+        finally:
+            self._reloading = False
+
+    def _check(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._reloading or now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                signature = _files(self.directory)
+            except OSError as e:
+                logger.error(f"Playbook directory check failed: {str(e)}")
+                return
+            if signature == self._signature:
+                return
+            self._reloading = True
+        # Build off the request path; queries keep the old registry until the swap
+        threading.Thread(target=self._reload_in_background, args=(signature,), daemon=True).start()
+
+    def registry(self):
+        """The current :class:`Registry`; a changed directory is reloaded in the background."""
+        if time.monotonic() - self._checked >= self.check_interval:
+            self._check()
+        return self._registry
+
+    def route(self, query):
+        return self.registry().route(query)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Process-wide playbook store built from the environment."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PlaybookStore(
+                os.getenv('INTENT_PLAYBOOK_DIR') or PLAYBOOK_DIR,
+                check_interval=float(os.getenv('INTENT_PLAYBOOK_RELOAD', '2')),
+            )
+            # Train the fallback model without holding up startup
+            threading.Thread(target=_default.registry().warm, daemon=True).start()
+        return _default
@@ -0,0 +1,235 @@
+"""Opt-in sampling profiler for single requests.
+
+Only active when ``INTENT_ADMIN_TOKEN`` is set: :func:`install` registers no
+hooks and no routes otherwise, so normal requests pay nothing. With a token,
+a request that sends ``?profile=1`` (or ``X-Intent-Profile: 1``) together
+with ``X-Admin-Token: <token>`` is sampled from start to last body byte.
+A background thread reads the request thread's stack every
+``INTENT_PROFILE_INTERVAL`` seconds (``sys._current_frames``, the same
+approach as py-spy and pyinstrument). Sampling stops when the response is
+closed, or after ``INTENT_PROFILE_MAX_SECONDS`` if it never is; the profile is
+saved either way. Requests that ask for a profile with a wrong or missing
+token get a 403.
+
+Profiles are written in collapsed-stack format (one ``a;b;c count`` line per
+distinct stack), which flamegraph.pl, speedscope and inferno read directly.
+They go to ``INTENT_PROFILE_DIR``, which keeps the newest
+``INTENT_PROFILE_KEEP`` files. The response's ``X-Profile-Id`` header names
+the file. ``GET /admin/profiles`` lists the stored profiles and
+``GET /admin/profiles/<id>`` returns one; both require the token.
+"""
+import collections
+import hmac
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from flask import g, jsonify, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = '.folded'
+_ID_RE = re.compile(r'^[\w.-]+$')
+
+
+class Sampler:
+    """Counts the stacks of one thread, sampled every ``interval`` seconds.
+
+    Stops by itself after ``max_seconds`` and passes the counts to
+    ``on_limit``, so a request that is never closed can't leave it running.
+    """
+
+    def __init__(self, thread_id, interval=0.001, max_seconds=None, on_limit=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.on_limit = on_limit
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """The counts on the first call; None once stopped (by an earlier call or the limit)."""
+        with self._lock:
+            if self._stopped:
+                return None
+            self._stopped = True
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        return self.counts
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds if self.max_seconds else None
+        while not self._stop.wait(self.interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                counts = self.stop()
+                if counts is not None and self.on_limit is not None:
+                    self.on_limit(counts)
+                return
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+
+def _frame_name(code):
+    # Function granularity (first line, not the current one) keeps flame graphs readable
+    path = code.co_filename.replace(os.sep, '/').rsplit('/', 2)
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class ProfileStore:
+    """Ring buffer of collapsed-stack files in one directory."""
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def new_id(self, method, route):
+        slug = re.sub(r'[^\w]+', '_', route).strip('_') or 'root'
+        return f"{time.time_ns() // 1000}-{os.getpid()}-{method.lower()}-{slug}"
+
+    def save(self, profile_id, counts):
+        # Written as the request ends: the file's mtime minus the start time
+        # in the id is the request's duration
+        path = os.path.join(self.directory, profile_id + SUFFIX)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            for stack, count in counts.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(tmp, path)
+        self._trim()
+
+    def _trim(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SUFFIX))
+        for name in names[:-self.keep] if self.keep else names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def list(self):
+        """Newest first: id, created (unix seconds), seconds, samples, bytes."""
+        out = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    samples = sum(int(line.rsplit(' ', 1)[1]) for line in f if line.strip())
+                stat = os.stat(path)
+            except (OSError, ValueError, IndexError):
+                continue
+            created = int(name.split('-', 1)[0]) / 1e6
+            out.append({
+                "id": name[:-len(SUFFIX)],
+                "created": created,
+                "seconds": round(max(stat.st_mtime - created, 0.0), 6),
+                "samples": samples,
+                "bytes": stat.st_size,
+            })
+        return out
+
+
+def _authorized(token):
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+def _requested():
+    return (request.args.get('profile') in ('1', 'true')
+            or request.headers.get('X-Intent-Profile') in ('1', 'true'))
+
+
+def install(app, token=None, directory=None, keep=None, interval=None, max_seconds=None):
+    """Register the profiling hooks and admin routes on ``app``.
+
+    Settings default to the environment. Returns the :class:`ProfileStore`,
+    or None (and registers nothing) when there is no admin token.
+    """
+    token = token or os.getenv('INTENT_ADMIN_TOKEN')
+    if not token:
+        return None
+    store = ProfileStore(
+        directory or os.getenv('INTENT_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'intent-profiles'),
+        keep=int(keep if keep is not None else os.getenv('INTENT_PROFILE_KEEP', '50')),
+    )
+    interval = float(interval if interval is not None else os.getenv('INTENT_PROFILE_INTERVAL', '0.001'))
+    max_seconds = float(max_seconds if max_seconds is not None else os.getenv('INTENT_PROFILE_MAX_SECONDS', '120'))
+
+    def save(profile_id, counts):
+        try:
+            store.save(profile_id, counts)
+        except OSError as e:
+            logger.warning(f"Profile save failed: {str(e)}")
+
+    @app.before_request
+    def _start_profile():
+        if not _requested():
+            return None
+        if not _authorized(token):
+            logger.warning(f"Profile requested without a valid admin token: {request.path}")
+            return jsonify({"status": "error", "message": "Profiling requires a valid X-Admin-Token"}), 403
+        route = request.url_rule.rule if request.url_rule else request.path
+        profile_id = store.new_id(request.method, route)
+        sampler = Sampler(threading.get_ident(), interval, max_seconds,
+                          on_limit=lambda counts: save(profile_id, counts))
+        g.profile = (profile_id, sampler.start())
+
+    @app.after_request
+    def _finish_profile(resp):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return resp
+        profile_id, sampler = profile
+
+        def done():
+            # After the body is sent, so streamed responses are profiled in full
+            counts = sampler.stop()
+            if counts is not None:
+                save(profile_id, counts)
+        resp.call_on_close(done)
+        # werkzeug skips close callbacks for direct_passthrough bodies
+        resp.direct_passthrough = False
+        resp.headers['X-Profile-Id'] = profile_id
+        return resp
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # Only still set if the request failed before after_request ran
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile[1].stop()
+
+    @app.route('/admin/profiles', methods=['GET'])
+    def list_profiles():
+        if not _authorized(token):
+            return jsonify({"status": "error", "message": "Forbidden"}), 403
+        return jsonify({"status": "success", "profiles": store.list()})
+
+    @app.route('/admin/profiles/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        if not _authorized(token):
+            return jsonify({"status": "error", "message": "Forbidden"}), 403
+        if not _ID_RE.match(profile_id) or not os.path.exists(os.path.join(store.directory, profile_id + SUFFIX)):
+            return jsonify({"status": "error", "message": "Profile not found"}), 404
+        return send_from_directory(store.directory, profile_id + SUFFIX, mimetype='text/plain')
+
+    logger.info(f"Request profiling enabled; profiles in {store.directory}")
+    return store
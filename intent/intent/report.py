@@ -0,0 +1,335 @@
+"""PDF report layout for ``/export``.
+
+The report is laid out page by page on a ReportLab canvas: text is wrapped
+to the printable width, the predictions table repeats its header row on
+every page it spans, and a new page starts whenever the next block does not
+fit. A finished page is only its content stream (a few KB of drawing
+operators, deflated when the file is written), so a 100+ page report stays
+small in memory.
+
+ReportLab only writes the file (cross-reference table included) in
+``save()``, so bytes cannot leave before the last page is done. The PDF is
+written to a :class:`tempfile.SpooledTemporaryFile` instead of an in-memory
+buffer: it spills to disk past :data:`SPOOL_BYTES`, and :func:`stream`
+sends it to the client in :data:`CHUNK_BYTES` pieces.
+
+The chart is drawn from the raw ``labels`` / ``values`` series as vector
+paths (see :meth:`ReportLayout.line_chart`), so the browser does not have to
+upload a base64 PNG. A ``chart`` data URL is still accepted from older
+clients.
+
+ReportLab's canvas and utilities are imported by the first export rather
+than at module load, so workers that never export don't pay for them.
+"""
+import base64
+import io
+import tempfile
+
+import numpy as np
+from reportlab.lib.pagesizes import letter
+
+import downsample
+import metrics
+
+PAGE_SIZE = letter
+MARGIN = 40
+BODY_FONT = ('Helvetica', 10)
+SPOOL_BYTES = 1024 * 1024
+CHUNK_BYTES = 64 * 1024
+
+CHART_HEIGHT = 200
+# More points than the 530pt-wide plot can resolve; longer series are LTTB-downsampled
+CHART_POINTS = 1000
+CHART_COLORS = {'values': '#2563EB', 'rolling_mean': '#94A3B8',
+                'anomalies': '#DC2626', 'grid': '#E2E8F0', 'axis': '#64748B'}
+
+# Predictions table: (heading, payload key, share of the printable width)
+PREDICTION_COLUMNS = (('Metric', 'metric', 0.55), ('Trend', 'trend', 0.28), ('Status', 'status', 0.17))
+
+
+class ReportLayout:
+    """Top-down cursor over a paginated canvas."""
+
+    def __init__(self, out, title='Intent AI Report'):
+        from reportlab.pdfgen import canvas
+
+        self.canvas = canvas.Canvas(out, pagesize=PAGE_SIZE, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.width, self.height = PAGE_SIZE
+        self.text_width = self.width - 2 * MARGIN
+        self.title = title
+        self.page = 1
+        self.y = self.height - MARGIN
+
+    def _footer(self):
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawRightString(self.width - MARGIN, MARGIN / 2, f'Page {self.page}')
+
+    def new_page(self):
+        self._footer()
+        self.canvas.showPage()
+        self.page += 1
+        self.y = self.height - MARGIN
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawString(MARGIN, self.y, f'{self.title} (continued)')
+        self.y -= 20
+
+    def ensure(self, height):
+        """Start a new page unless ``height`` points still fit on this one."""
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def heading(self, text, size=12):
+        # keep a heading with at least the first line of its section
+        self.ensure(size + 2 + 14)
+        self.canvas.setFont('Helvetica-Bold', size)
+        self.canvas.drawString(MARGIN, self.y, text)
+        self.y -= size + 2
+
+    def paragraph(self, text, font=BODY_FONT, leading=14, indent=0):
+        from reportlab.lib.utils import simpleSplit
+
+        for line in simpleSplit(str(text), font[0], font[1], self.text_width - indent):
+            self.ensure(leading)
+            self.canvas.setFont(*font)
+            self.canvas.drawString(MARGIN + indent, self.y, line)
+            self.y -= leading
+
+    def image(self, reader, height=200):
+        self.ensure(height + 12)
+        self.canvas.drawImage(reader, MARGIN, self.y - height, width=self.text_width, height=height)
+        self.y -= height + 12
+
+    def _polyline(self, px, py):
+        # One path with a gap wherever a value is missing
+        path = self.canvas.beginPath()
+        pen_down = False
+        for x, y in zip(px.tolist(), py.tolist()):
+            if y != y:  # NaN
+                pen_down = False
+            elif pen_down:
+                path.lineTo(x, y)
+            else:
+                path.moveTo(x, y)
+                pen_down = True
+        self.canvas.drawPath(path, stroke=1, fill=0)
+
+    def line_chart(self, series, height=CHART_HEIGHT):
+        """Vector line chart of a :func:`chart_series` dict: axes, values,
+        rolling mean and anomaly markers."""
+        self.ensure(height + 24)
+        c = self.canvas
+        values, labels, n = series['values'], series['labels'], len(series['values'])
+        left, right = MARGIN + 44, MARGIN + self.text_width
+        top, bottom = self.y - 4, self.y - height + 16
+        index = downsample.select(values, CHART_POINTS, keep=series['anomalies']) if n > CHART_POINTS else np.arange(n)
+
+        shown = [values[index]] + ([series['rolling_mean'][index]] if series['rolling_mean'] is not None else [])
+        finite = np.concatenate(shown)
+        finite = finite[np.isfinite(finite)]
+        lo, hi = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+        if hi == lo:
+            lo, hi = lo - 1, hi + 1
+        px = left + index * ((right - left) / max(n - 1, 1))
+
+        def y_of(v):
+            return bottom + (v - lo) / (hi - lo) * (top - bottom)
+
+        c.saveState()
+        c.setLineWidth(0.5)
+        c.setFont('Helvetica', 7)
+        for i in range(5):
+            v = lo + (hi - lo) * i / 4
+            c.setStrokeColor(CHART_COLORS['grid'])
+            c.line(left, y_of(v), right, y_of(v))
+            c.setFillColor(CHART_COLORS['axis'])
+            c.drawRightString(left - 4, y_of(v) - 2, f'{v:.4g}')
+        for pos in np.unique(np.linspace(0, n - 1, min(n, 6)).astype(int)).tolist():
+            x = left + pos * ((right - left) / max(n - 1, 1))
+            c.drawCentredString(x, bottom - 10, str(labels[pos])[:14])
+
+        if series['rolling_mean'] is not None:
+            c.setDash(4, 3)
+            c.setStrokeColor(CHART_COLORS['rolling_mean'])
+            self._polyline(px, y_of(series['rolling_mean'][index]))
+            c.setDash()
+        c.setLineWidth(1.2)
+        c.setStrokeColor(CHART_COLORS['values'])
+        self._polyline(px, y_of(values[index]))
+        c.setFillColor(CHART_COLORS['anomalies'])
+        for pos in series['anomalies']:
+            c.circle(left + pos * ((right - left) / max(n - 1, 1)), y_of(values[pos]), 2.5, stroke=0, fill=1)
+
+        # Legend under the plot
+        c.setFont('Helvetica', 8)
+        x = left
+        entries = [(series['name'], 'values')]
+        if series['rolling_mean'] is not None:
+            entries.append(('Rolling mean', 'rolling_mean'))
+        if len(series['anomalies']):
+            entries.append(('Anomalies', 'anomalies'))
+        for text, key in entries:
+            c.setFillColor(CHART_COLORS[key])
+            c.rect(x, bottom - 24, 8, 4, stroke=0, fill=1)
+            c.setFillColor(CHART_COLORS['axis'])
+            c.drawString(x + 12, bottom - 25, text)
+            x += 24 + c.stringWidth(text, 'Helvetica', 8)
+        c.restoreState()
+        self.y -= height + 24
+
+    def _table_row(self, cells, font, leading):
+        from reportlab.lib.utils import simpleSplit
+
+        widths = [self.text_width * share for _, _, share in PREDICTION_COLUMNS]
+        wrapped = [simpleSplit(cell, font[0], font[1], w - 6) or [''] for cell, w in zip(cells, widths)]
+        return widths, wrapped, leading * max(len(lines) for lines in wrapped) + 4
+
+    def table(self, rows, font=BODY_FONT, leading=12):
+        """Predictions table; the header row is repeated after each page break."""
+        header = [heading for heading, _, _ in PREDICTION_COLUMNS]
+        bold = ('Helvetica-Bold', font[1])
+
+        def draw(cells, row_font, height, widths, wrapped):
+            x = MARGIN
+            self.canvas.setFont(*row_font)
+            for w, lines in zip(widths, wrapped):
+                for i, line in enumerate(lines):
+                    self.canvas.drawString(x, self.y - i * leading, line)
+                x += w
+            self.y -= height
+            self.canvas.line(MARGIN, self.y + leading - 1, MARGIN + self.text_width, self.y + leading - 1)
+
+        head_widths, head_wrapped, head_height = self._table_row(header, bold, leading)
+        # header plus one body row, so the header is never orphaned
+        self.ensure(head_height + leading + 4)
+        draw(header, bold, head_height, head_widths, head_wrapped)
+        for row in rows:
+            cells = [str(row.get(key, '')) if isinstance(row, dict) else '' for _, key, _ in PREDICTION_COLUMNS]
+            widths, wrapped, height = self._table_row(cells, font, leading)
+            if self.y - height < MARGIN:
+                self.new_page()
+                draw(header, bold, head_height, head_widths, head_wrapped)
+            draw(cells, font, height, widths, wrapped)
+
+    def space(self, points):
+        self.y -= points
+
+    def finish(self):
+        self._footer()
+        self.canvas.showPage()
+        self.canvas.save()
+
+
+def _floats(items, field, size=None):
+    if not isinstance(items, list) or (size is not None and len(items) != size):
+        raise ValueError(f"{field} must be a list of numbers" + (" as long as labels" if size is not None else ""))
+    try:
+        return np.array([np.nan if v is None else v for v in items], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a list of numbers")
+
+
+def chart_series(payload):
+    """The chart fields of an ``/export`` payload, or None when it has none.
+
+    ``labels`` and ``values`` (numbers, null for gaps) draw the line;
+    optional ``y_label``, ``rolling_mean`` (aligned with ``values``) and
+    ``anomalies`` (positions) add the overlays the UI shows. Raises
+    ValueError with a user-facing message for malformed fields.
+    """
+    labels = payload.get('labels')
+    if labels is None and payload.get('values') is None:
+        return None
+    if not isinstance(labels, list) or not labels:
+        raise ValueError("labels must be a non-empty list")
+    values = _floats(payload.get('values'), 'values', len(labels))
+    rolling = payload.get('rolling_mean')
+    rolling = _floats(rolling, 'rolling_mean', len(labels)) if rolling is not None else None
+    anomalies = payload.get('anomalies') or []
+    if not isinstance(anomalies, list) or not all(isinstance(p, int) and 0 <= p < len(labels) for p in anomalies):
+        raise ValueError("anomalies must be a list of positions in values")
+    return {
+        "name": str(payload.get('y_label') or 'Metric'),
+        "labels": labels,
+        "values": values,
+        "rolling_mean": rolling,
+        "anomalies": np.array([p for p in anomalies if np.isfinite(values[p])], dtype=np.int64),
+    }
+
+
+def _chart_image(dataurl):
+    # Browser-rendered chart as a data URL; unreadable images are skipped
+    from reportlab.lib.utils import ImageReader
+
+    try:
+        _, b64 = dataurl.split(',', 1)
+        return ImageReader(io.BytesIO(base64.b64decode(b64)))
+    except Exception:
+        return None
+
+
+@metrics.stage('pdf_layout')
+def render(payload, out):
+    """Write the report for an ``/export`` payload to the binary file ``out``.
+
+    Raises ValueError for malformed chart fields (see :func:`chart_series`).
+    """
+    series = chart_series(payload)
+    layout = ReportLayout(out)
+    layout.heading('Intent AI Report', size=18)
+    layout.space(10)
+    layout.paragraph(f"Risk: {payload.get('risk', '')}", font=('Helvetica', 12), leading=18)
+
+    layout.heading('Summary:')
+    layout.paragraph(payload.get('summary', '') or '')
+    layout.space(8)
+
+    if series is not None:
+        with metrics.stage('chart_draw'):
+            layout.line_chart(series)
+    elif payload.get('chart'):
+        with metrics.stage('image_embed'):
+            chart = _chart_image(payload['chart'])
+            if chart is not None:
+                layout.image(chart)
+
+    predictions = payload.get('predictions') or []
+    if predictions:
+        layout.heading('Predictions:')
+        layout.table(predictions)
+        layout.space(8)
+
+    recommendations = payload.get('recommendations') or []
+    if recommendations:
+        layout.heading('Recommendations:')
+        for rec in recommendations:
+            layout.paragraph(f'- {rec}', leading=12)
+            layout.space(4)
+
+    layout.finish()
+    return layout.page
+
+
+def spool(payload):
+    """Render into a spooled temporary file, rewound; returns ``(file, size)``."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    try:
+        render(payload, out)
+        size = out.tell()
+        out.seek(0)
+    except Exception:
+        out.close()
+        raise
+    return out, size
+
+
+def stream(out):
+    """Yield the spooled PDF in chunks, closing (and deleting) it at the end."""
+    try:
+        while True:
+            chunk = out.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        out.close()
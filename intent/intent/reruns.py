@@ -0,0 +1,104 @@
+"""The work behind the Streamlit app's caches, without Streamlit.
+
+Streamlit reruns ``streamlit_app.py`` from the top on every widget change.
+The app wraps these functions in ``st.cache_resource`` / ``st.cache_data``
+and ``st.session_state``; the cache keys and the cached values are computed
+here, so they can be tested without a Streamlit runtime.
+
+* Uploads are keyed by :func:`upload_id`, the hash of their bytes, so the
+  same file uploaded twice (or under another name) shares one entry.
+* Analyses are keyed by :func:`analysis_key`, the dataset id and X column.
+* Text analyses are keyed by :func:`text_key`, built on
+  :func:`cache.make_key`, so inputs differing only in case or whitespace
+  share an answer.
+"""
+import hashlib
+import io
+import os
+
+import cache
+import csv_engine
+import datasets
+import uploads
+
+# Bump when the Streamlit prompt changes so cached answers are not reused
+PROMPT_VERSION = 'streamlit-1'
+
+
+def upload_id(ids, file_id, read):
+    """Dataset id of an upload, hashed once per ``file_id``.
+
+    ``ids`` is a per-session dict (``st.session_state``) and ``read``
+    returns the upload's bytes; it is only called for a new ``file_id``.
+    """
+    if file_id not in ids:
+        ids[file_id] = datasets.source_id(read())
+    return ids[file_id]
+
+
+def analysis_key(dataset_id, selected_x):
+    """Cache key of one upload analysis; a blank X column means row numbers."""
+    return dataset_id, (selected_x or None)
+
+
+def text_key(user_input, model):
+    return cache.make_key(user_input, model, PROMPT_VERSION)
+
+
+def table_id(content, selected_x=None):
+    """Dataset store id for ``content`` parsed with ``selected_x`` kept as text.
+
+    The X column changes the parse, so it is part of the id. Without one this
+    is :func:`datasets.source_id`, the id :func:`upload_id` returns.
+    """
+    if not selected_x:
+        return datasets.source_id(content)
+    digest = hashlib.sha256(content)
+    digest.update(b'\0x=' + str(selected_x).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def load_table(content, selected_x=None, store=None):
+    """Parsed table for these bytes, from the dataset store when possible.
+
+    Keyed by :func:`table_id`, so each file is parsed once per X column by
+    the first Streamlit session (or process on the host) that needs it.
+    Flask's ``/upload`` ids hash the parsed columns instead, so the two apps
+    do not share entries.
+    """
+    store = store or datasets.default_store()
+    dataset_id = table_id(content, selected_x)
+    table = store.load(dataset_id)
+    if table is None:
+        table = csv_engine.read_table(io.BytesIO(content), text_columns=[selected_x] if selected_x else (),
+                                      max_bytes=len(content))
+        store.put(table, dataset_id)
+    return table
+
+
+def table_analysis(table, selected_col=None, selected_x=None, columns=None, max_points=None, method='lttb'):
+    try:
+        return uploads.to_json(uploads.table_response(table, selected_col, selected_x, columns, max_points, method))
+    except csv_engine.CSVError as e:
+        return {"status": "error", "message": str(e)}
+
+
+def process_csv_bytes(content, selected_col=None, selected_x=None, columns=None, max_points=None,
+                      method='lttb'):
+    try:
+        table = load_table(content, selected_x)
+    except csv_engine.CSVError as e:
+        return {"status": "error", "message": str(e)}
+    return table_analysis(table, selected_col, selected_x, columns, max_points, method)
+
+
+def demo_results(app_dir, paths, max_points=None):
+    """``{path: analysis}`` for the demo CSVs under ``app_dir``."""
+    results = {}
+    for path in paths:
+        try:
+            with open(os.path.join(app_dir, path), 'rb') as f:
+                results[path] = process_csv_bytes(f.read(), max_points=max_points)
+        except OSError as e:
+            results[path] = {"status": "error", "message": str(e)}
+    return results
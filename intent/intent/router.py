@@ -0,0 +1,175 @@
+"""Keyword scenario routing in one pass over the input.
+
+A :class:`Router` takes scenario rules in priority order, each a name and a
+list of keywords, and answers the same question as a chain of
+``if any(k in text for k in keywords): ... elif ...`` checks: the first
+rule with a keyword that occurs in the (lowercased) text.
+
+All keywords are compiled into a single regex shaped like a trie, so shared
+prefixes are tested once and the text is scanned once no matter how many
+rules there are. Each search resumes one character past the previous match's
+start, so overlapping keywords are all seen. The pattern is greedy, so it
+yields the longest keyword starting at a position; every shorter keyword
+there is a prefix of it, so each keyword carries the best rule among its own
+prefixes.
+
+Rules can also carry example phrases for an optional TF-IDF fallback, used
+when no keyword matches: a nearest-centroid (Rocchio) linear classifier over
+character n-grams. Centroids stay sparse, so memory grows with the text of
+the rules rather than rules x features. scikit-learn is imported and the
+model fit on first use (or :meth:`Router.warm`); without scikit-learn the
+fallback is simply off.
+
+Small rule sets (see ``LINEAR_MAX_KEYWORDS``) keep the plain substring scan,
+which is faster there; ``benchmarks/bench_router.py`` shows the crossover.
+"""
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Up to this many keywords, ``in`` scans (memchr in C) beat one regex pass
+LINEAR_MAX_KEYWORDS = 32
+
+
+def _trie(words):
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return root
+
+
+def _pattern(node):
+    end = '' in node
+    branches = []
+    chars = []
+    for ch in sorted(k for k in node if k):
+        child = node[ch]
+        if len(child) == 1 and '' in child:
+            chars.append(re.escape(ch))
+        else:
+            branches.append(re.escape(ch) + _pattern(child))
+    if chars:
+        branches.append(chars[0] if len(chars) == 1 else '[' + ''.join(chars) + ']')
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if end:
+        # Optional suffix, greedy, so the longest keyword wins at each position
+        return '(?:' + body + ')?'
+    return body
+
+
+def compile_keywords(words):
+    """One regex matching any of ``words``, longest first at each position."""
+    return re.compile(_pattern(_trie(words)))
+
+
+class Router:
+    """Route text to the first matching rule.
+
+    ``rules`` is a sequence of ``(name, keywords)`` or
+    ``(name, keywords, examples)`` in priority order. With ``fallback=True``
+    text that matches no keyword is compared with the TF-IDF centroid of each
+    rule's keywords and examples, and routed to the closest one if its cosine
+    similarity is at least ``min_similarity``.
+    """
+
+    def __init__(self, rules, fallback=False, min_similarity=0.2):
+        self.names = []
+        self._docs = []
+        best = {}
+        for index, rule in enumerate(rules):
+            name, keywords = rule[0], rule[1]
+            examples = rule[2] if len(rule) > 2 else ()
+            self.names.append(name)
+            self._docs.append([k.lower() for k in keywords] + [e.lower() for e in examples])
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and keyword not in best:
+                    best[keyword] = index
+        # Shorter keywords at the same position are prefixes of the match
+        self._best = {}
+        for keyword in best:
+            self._best[keyword] = min(best[keyword[:n]] for n in range(1, len(keyword) + 1)
+                                      if keyword[:n] in best)
+        self._linear = None
+        self._regex = None
+        if len(best) <= LINEAR_MAX_KEYWORDS:
+            self._linear = sorted(best.items(), key=lambda item: item[1])
+        else:
+            self._regex = compile_keywords(best)
+        self.fallback = fallback
+        self.min_similarity = min_similarity
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def match(self, text):
+        """Name of the first rule with a keyword in ``text``, or None."""
+        if not text:
+            return None
+        text = text.lower()
+        if self._linear is not None:
+            for keyword, index in self._linear:
+                if keyword in text:
+                    return self.names[index]
+            return None
+        search = self._regex.search
+        best = None
+        m = search(text)
+        while m is not None:
+            index = self._best[m.group()]
+            if index == 0:
+                return self.names[0]
+            if best is None or index < best:
+                best = index
+            # Resume one past the start so overlapping keywords are seen too
+            m = search(text, m.start() + 1)
+        return None if best is None else self.names[best]
+
+    def warm(self):
+        """Train the fallback model now rather than on the first miss."""
+        if self.fallback:
+            self._load_model()
+
+    def _load_model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._train() or False
+        return self._model
+
+    def _train(self):
+        if len(self.names) < 2:
+            return None
+        try:
+            from scipy import sparse
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.preprocessing import normalize
+        except ImportError:
+            logger.warning("scikit-learn is not installed; scenario fallback disabled")
+            return None
+        docs = [doc for docs in self._docs for doc in docs]
+        owner = [index for index, docs in enumerate(self._docs) for _ in docs]
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True)
+        features = vectorizer.fit_transform(docs)
+        membership = sparse.csr_matrix(([1.0] * len(docs), (owner, range(len(docs)))),
+                                       shape=(len(self.names), len(docs)))
+        centroids = normalize(membership @ features).T.tocsr()
+        return vectorizer, centroids
+
+    def classify(self, text):
+        """Like :meth:`match`, falling back to the TF-IDF model if enabled."""
+        name = self.match(text)
+        if name is not None or not self.fallback or not text or not text.strip():
+            return name
+        model = self._load_model()
+        if not model:
+            return None
+        vectorizer, centroids = model
+        scores = (vectorizer.transform([text.lower()]) @ centroids).toarray()[0]
+        best = scores.argmax()
+        return self.names[best] if scores[best] >= self.min_similarity else None
@@ -0,0 +1,90 @@
+"""Demo/production mode and measured pipeline stages.
+
+``INTENT_MODE=production`` removes every simulated delay. ``demo`` (the
+default) keeps the hackathon pacing: the ``INTENT_DEMO_LATENCY`` seconds of
+"AI thinking" before each analysis, and short pauses between the DECISION OS
+progress stages so the audience can read them.
+
+:class:`StageTimer` measures the real stages of a request (parse, analyze,
+render). Progress bars advance as stages finish, and HTTP responses carry the
+timings in a ``Server-Timing`` header and ``intent_stage_duration_seconds``
+(see metrics.py), so what users see reflects actual work rather than sleeps.
+Demo pauses happen between stages and are never counted in the timings.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MODES = ('demo', 'production')
+
+
+def mode():
+    value = os.getenv('INTENT_MODE', 'demo').strip().lower()
+    if value not in MODES:
+        logger.warning(f"Unknown INTENT_MODE {value!r}; using demo")
+        return 'demo'
+    return value
+
+
+def is_production():
+    return mode() == 'production'
+
+
+def demo_latency():
+    """Simulated analysis latency in seconds; 0 in production mode."""
+    return 0.0 if is_production() else float(os.getenv('INTENT_DEMO_LATENCY', '2'))
+
+
+def demo_pause(seconds):
+    """Sleep for presentation pacing in demo mode only."""
+    if seconds > 0 and not is_production():
+        time.sleep(seconds)
+
+
+class StageTimer:
+    """Wall-clock time per named stage of one request.
+
+    ``expected`` lists the stages a run will go through, for
+    :meth:`progress`. ``on_stage(timer, name, done)`` is called as each stage
+    starts (``done=False``) and finishes (``done=True``).
+    """
+
+    def __init__(self, expected=(), on_stage=None):
+        self.expected = tuple(expected)
+        self.on_stage = on_stage
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.on_stage:
+            self.on_stage(self, name, False)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            metrics.STAGE_DURATION.observe(elapsed, stage=name)
+            if self.on_stage:
+                self.on_stage(self, name, True)
+
+    def progress(self):
+        """Fraction of the expected stages that have finished, 0.0 to 1.0."""
+        if not self.expected:
+            return 1.0
+        return sum(1 for name in self.expected if name in self.timings) / len(self.expected)
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def server_timing(self):
+        """``Server-Timing`` header value, durations in milliseconds."""
+        return ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.timings.items())
+
+    def summary(self):
+        return ' · '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.timings.items())
@@ -0,0 +1,28 @@
+"""Startup cost: the dependencies the apps import lazily, and preloading them.
+
+``import app`` does not load pandas (csv_engine, datasets), openai and httpx
+(llm) or ReportLab's canvas and utilities (report); each is imported by the
+first request that needs it. A worker is ready after Flask and NumPy, and
+``/`` never pays for the rest.
+
+With ``gunicorn --preload`` (or ``INTENT_PRELOAD=1``, see
+``gunicorn.conf.py``) the master calls :func:`preload` before forking
+instead: every worker then starts with these modules already imported,
+sharing their pages copy-on-write, and no first request pays the import.
+
+``benchmarks/import_budget.py`` fails when ``import app`` gets slower than
+its budget or imports any of :data:`LAZY_MODULES`.
+"""
+import gc
+import importlib
+
+LAZY_MODULES = ('pandas', 'openai', 'httpx', 'reportlab.pdfgen.canvas', 'reportlab.lib.utils')
+
+
+def preload():
+    """Import :data:`LAZY_MODULES` and freeze the heap; call in the master before forking."""
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+    # Move everything allocated so far out of the collector's reach, so a
+    # worker's collections don't write to (and so copy) the shared pages
+    gc.freeze()
@@ -0,0 +1,166 @@
+"""Progressive results for streamed analyses.
+
+The model streams its JSON answer a few characters at a time.
+:class:`FragmentParser` scans the text once, incrementally, and reports each
+top-level member of the object as soon as its value is complete, and each
+element of a top-level array (one prediction, one recommendation) as soon
+as that element is complete. Complete fragments are decoded with
+``json.loads``; nothing is ever re-scanned.
+
+Events are ``(name, data)`` pairs, sent to browsers as Server-Sent Events:
+
+* ``field`` -- ``{"key": "summary", "value": "..."}`` for non-array members
+* ``item`` -- ``{"key": "predictions", "index": 0, "value": {...}}``
+* ``done`` -- the final response body, the same dict ``/analyze`` returns.
+  Clients should render it as authoritative: a stream that fails part way
+  ends with the fallback analysis here.
+"""
+import json
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+WHITESPACE = ' \t\r\n'
+
+
+class FragmentParser:
+    """Incremental parser for a JSON object streamed in arbitrary pieces.
+
+    Text before the opening ``{`` (e.g. a Markdown code fence) and after
+    the closing ``}`` is ignored. :meth:`feed` returns the events completed
+    by the new text.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.done = False
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        # top-level object: 'key' -> 'colon' -> 'value' -> 'in_value' -> 'after'
+        self._state = 'key'
+        self._key = None
+        self._value_start = None
+        self._item_start = None
+        self._item_count = 0
+
+    def _fragment(self, start, end):
+        try:
+            return json.loads(self.text[start:end])
+        except ValueError:
+            return None
+
+    def _field(self, events, end):
+        value = self._fragment(self._value_start, end)
+        if not isinstance(value, list):
+            events.append(('field', {"key": self._key, "value": value}))
+        self._value_start = None
+        self._state = 'after'
+
+    def _item(self, events, end):
+        events.append(('item', {"key": self._key, "index": self._item_count,
+                                "value": self._fragment(self._item_start, end)}))
+        self._item_count += 1
+        self._item_start = None
+
+    def _in_top_array(self):
+        return len(self._stack) == 2 and self._stack[1] == '['
+
+    def _value_begins(self, i):
+        # A value (string, container or scalar) starts at position i
+        if len(self._stack) == 1 and self._state == 'value':
+            self._value_start = i
+            self._state = 'in_value'
+        elif self._in_top_array() and self._item_start is None:
+            self._item_start = i
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self.done:
+                break
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._state == 'key':
+                        self._key = self._fragment(self._string_start, i + 1)
+                        self._state = 'colon'
+                    elif len(self._stack) == 1 and self._value_start == self._string_start:
+                        self._field(events, i + 1)
+                    elif self._in_top_array() and self._item_start == self._string_start:
+                        self._item(events, i + 1)
+                continue
+            if not self._stack:
+                if c == '{':
+                    self._stack.append('{')
+                continue
+            if c in WHITESPACE:
+                continue
+            if c == '"':
+                self._value_begins(i)
+                self._in_string = True
+                self._string_start = i
+            elif c in '{[':
+                self._value_begins(i)
+                if len(self._stack) == 1 and c == '[':
+                    self._item_count = 0
+                self._stack.append(c)
+            elif c in ',}]':
+                # a pending scalar (number, true, false, null) ends here
+                if len(self._stack) == 1 and self._state == 'in_value':
+                    self._field(events, i)
+                elif self._in_top_array() and self._item_start is not None:
+                    self._item(events, i)
+                if c == ',':
+                    if len(self._stack) == 1:
+                        self._state = 'key'
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    self.done = True
+                elif len(self._stack) == 1 and self._state == 'in_value':
+                    self._field(events, i + 1)
+                elif self._in_top_array() and self._item_start is not None:
+                    self._item(events, i + 1)
+            elif c == ':':
+                if len(self._stack) == 1 and self._state == 'colon':
+                    self._state = 'value'
+            else:
+                self._value_begins(i)
+        self._pos = len(text)
+        return events
+
+
+def result_events(result):
+    """The events for an already complete result (cache hits, the mock)."""
+    for key, value in result.items():
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                yield 'item', {"key": key, "index": index, "value": item}
+        else:
+            yield 'field', {"key": key, "value": value}
+    yield 'done', result
+
+
+def wants_events(accept):
+    """True if an ``Accept`` header value prefers SSE over JSON.
+
+    Parsed with werkzeug's q-value rules, so the Flask and ASGI routes agree
+    (``text/event-stream;q=0.1, */*`` still gets JSON).
+    """
+    mimetypes = parse_accept_header(accept or '', MIMEAccept)
+    return mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream'
+
+
+def sse(name, data):
+    """One Server-Sent Events message."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,70 @@
+import math
+import time
+import warnings
+
+import numpy as np
+
+import analytics
+
+
+def test_linear_fit_and_forecast_interval():
+    values = 3.0 + 2.0 * np.arange(20)
+    slope, intercept, r2, residual_std = analytics.linear_fit(values)
+    assert round(slope, 9) == 2.0 and round(intercept, 9) == 3.0 and r2 == 1.0
+    fc = analytics.forecast(values, horizon=2)
+    assert np.allclose(fc['values'], [43.0, 45.0])
+    assert np.allclose(fc['lower'], fc['upper'])  # no noise, no interval
+
+    noisy = values + np.random.default_rng(0).normal(0, 1, 20)
+    fc = analytics.forecast(noisy, horizon=3)
+    widths = np.subtract(fc['upper'], fc['lower'])
+    assert (widths > 0).all() and widths[2] > widths[0]
+
+
+def test_rolling_mean_std_matches_naive():
+    values = np.random.default_rng(1).normal(1e6, 5, 200)
+    mean, std = analytics.rolling_mean_std(values, 10)
+    assert np.isnan(mean[:9]).all()
+    assert np.allclose(mean[9:], [values[i - 9:i + 1].mean() for i in range(9, 200)])
+    assert np.allclose(std[9:], [values[i - 9:i + 1].std() for i in range(9, 200)])
+
+
+def test_changepoint_and_anomalies():
+    rng = np.random.default_rng(2)
+    step = np.r_[rng.normal(10, 1, 100), rng.normal(14, 1, 100)]
+    shift = analytics.changepoint(step)
+    assert shift is not None and abs(shift['index'] - 100) <= 2
+    assert shift['after'] > shift['before']
+
+    spike = np.arange(60.0) + rng.normal(0, 1, 60)
+    spike[40] += 25
+    stats = analytics.summarize(spike)
+    assert 40 in stats['anomalies']
+    assert stats['changepoint'] is None  # a single outlier is not a level shift
+
+
+def test_summarize_maps_positions_across_gaps():
+    values = np.r_[np.full(30, 5.0), np.nan, np.full(30, 9.0)]
+    values[:61:2] += 0.01  # avoid a zero noise scale
+    stats = analytics.summarize(values)
+    assert stats['count'] == 60
+    assert stats['changepoint']['index'] == 31
+    assert len(stats['rolling_mean']) == 61 and np.isnan(stats['rolling_mean'][30])
+
+
+def test_summarize_skips_infinite_cells():
+    values = np.r_[np.arange(10.0), np.inf, np.arange(10.0, 20.0), -np.inf]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        stats = analytics.summarize(values)
+    assert stats['count'] == 20
+    assert stats['max'] == 19.0 and math.isclose(stats['slope'], 1.0)
+    assert np.isnan(stats['rolling_mean'][10])
+    assert np.isfinite(stats['forecast']['values']).all()
+
+
+def test_summarize_one_million_points_is_fast():
+    values = np.cumsum(np.random.default_rng(3).normal(0, 1, 1_000_000))
+    start = time.perf_counter()
+    analytics.summarize(values)
+    assert time.perf_counter() - start < 1.0
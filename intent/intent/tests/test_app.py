@@ -1,5 +1,7 @@
 import io
 import json
+import threading
+import time
 import pytest
 
 from app import app
@@ -18,12 +20,44 @@ def test_home(client):
     assert b'Intent' in res.data
 
 
+def test_home_precompressed_and_revalidated(client):
+    import gzip
+    import re
+    res = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert res.headers['Cache-Control'] == 'no-cache' and 'Accept-Encoding' in res.headers['Vary']
+    page = gzip.decompress(res.data)
+    assert len(res.data) < len(page) / 3
+    repeat = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': res.headers['ETag']})
+    assert repeat.status_code == 304 and repeat.data == b''
+
+    # Demo links are versioned by content hash and cached as immutable
+    url = re.search(rb"loadDemo\('([^']+)'\)", page).group(1).decode()
+    demo = client.get('/' + url)
+    assert demo.status_code == 200 and demo.data.startswith(b'date,')
+    assert 'immutable' in demo.headers['Cache-Control']
+    assert client.get('/' + url.split('?')[0]).headers['Cache-Control'] == 'no-cache'
+    assert client.get('/demo_data/missing.csv').status_code == 404
+
+
 def test_analyze_mock(client):
     payload = {'data': 'We are seeing increased churn and loss of revenue.'}
     res = client.post('/analyze', json=payload)
     assert res.status_code == 200
     data = res.get_json()
     assert 'status' in data or 'risk_level' in data
+    assert 'analyze;dur=' in res.headers['Server-Timing']
+
+
+def test_analyze_timing_excludes_demo_latency(client, monkeypatch):
+    import analysis
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0.3)
+    started = time.perf_counter()
+    res = client.post('/analyze', json={'data': f'Timing check {time.time_ns()}'})
+    assert time.perf_counter() - started >= 0.3
+    timings = dict(part.split(';dur=') for part in res.headers['Server-Timing'].split(', '))
+    assert set(timings) == {'parse', 'cache', 'analyze', 'render'}
+    assert sum(float(ms) for ms in timings.values()) < 300
 
 
 def test_upload_csv(client):
@@ -38,6 +72,25 @@ def test_upload_csv(client):
     assert isinstance(d['values'], list) and len(d['values']) == 3
 
 
+def test_metrics_endpoint(client):
+    csv_content = 'date,value\n2020-01,100\n2020-02,110\n'
+    res = client.post('/upload', data={'file': (io.BytesIO(csv_content.encode('utf-8')), 'sample.csv')},
+                      content_type='multipart/form-data')
+    assert res.status_code == 200
+    # Servers close every response; request metrics are recorded then
+    res.close()
+    res = client.get('/metrics')
+    assert res.status_code == 200
+    assert res.content_type.startswith('text/plain')
+    text = res.get_data(as_text=True)
+    assert 'intent_http_requests_total{route="/upload",method="POST",status="200"}' in text
+    assert 'intent_http_request_duration_seconds_bucket{route="/upload",le="+Inf"}' in text
+    for stage in ('csv_decode', 'csv_parse', 'analytics'):
+        assert f'intent_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    # The scrape itself is still in flight
+    assert 'intent_http_requests_in_flight{route="/metrics"} 1' in text
+
+
 def test_export_pdf(client):
     payload = {
         'summary': 'Test summary',
@@ -46,7 +99,326 @@ def test_export_pdf(client):
         'recommendations': ['Do X'],
         'chart': None
     }
+    import metrics
+    count = ('intent_http_requests_total', ('/export', 'POST', '200'))
+    before = metrics.collect().get(count, 0)
     res = client.post('/export', json=payload)
     assert res.status_code == 200
     assert res.content_type == 'application/pdf'
     assert len(res.data) > 100
+    res.close()
+    # The streamed PDF is recorded once sent, and leaves nothing in flight
+    text = client.get('/metrics').get_data(as_text=True)
+    assert metrics.collect()[count] == before + 1
+    assert 'intent_http_requests_in_flight{route="/export"} 0' in text
+
+
+def test_export_pdf_paginates_long_reports(client):
+    import re
+    payload = {
+        'summary': 'Quarterly review ' * 200,
+        'risk': 'High',
+        'predictions': [{'metric': f'Metric {i}', 'trend': f'{i}%', 'status': 'Warning'} for i in range(400)],
+        'recommendations': [f'Recommendation {i}: ' + 'act now ' * 30 for i in range(100)],
+    }
+    res = client.post('/export', json=payload)
+    assert res.status_code == 200
+    assert res.content_type == 'application/pdf'
+    assert int(res.headers['Content-Length']) == len(res.data)
+    assert len(re.findall(rb'/Type /Page\b', res.data)) > 10
+
+
+def test_export_pdf_draws_chart_from_series(client):
+    payload = {
+        'summary': 'Chart export',
+        'risk': 'Medium',
+        'predictions': [],
+        'recommendations': [],
+        'labels': [str(i) for i in range(5000)],
+        'values': [float(i % 97) if i != 10 else None for i in range(5000)],
+        'rolling_mean': [None] * 5000,
+        'anomalies': [42],
+        'y_label': 'sales',
+    }
+    res = client.post('/export', json=payload)
+    assert res.status_code == 200
+    assert res.content_type == 'application/pdf'
+    assert b'/Subtype /Image' not in res.data
+
+    payload['values'] = payload['values'][:10]
+    res = client.post('/export', json=payload)
+    assert res.status_code == 400
+    assert 'values' in res.get_json()['message']
+
+
+def test_export_cache_etag_and_coalescing(client, monkeypatch, tmp_path):
+    import cache
+    import exports
+    import report
+    report_cache = exports.ReportCache(cache.SQLiteBackend(str(tmp_path / 'reports.sqlite3'), 1024 * 1024))
+    monkeypatch.setattr(exports, '_default', report_cache)
+    renders = []
+    real_spool = report.spool
+
+    def slow_spool(payload):
+        renders.append(payload)
+        time.sleep(0.2)
+        return real_spool(payload)
+
+    monkeypatch.setattr(report, 'spool', slow_spool)
+    payload = {'summary': 'Cached', 'risk': 'Low', 'predictions': [], 'recommendations': ['Do X'],
+               'labels': ['a', 'b'], 'values': [1, 2]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(app.test_client().post('/export', json=payload)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(renders) == 1
+    assert sorted(r.headers['X-Report-Cache'] for r in results) == ['coalesced'] * 3 + ['miss']
+    assert len({r.data for r in results}) == 1
+
+    # 1.0 == 1 after canonicalization: a cache hit, same ETag
+    res = client.post('/export', json=dict(payload, values=[1.0, 2.0]))
+    assert res.headers['X-Report-Cache'] == 'hit'
+    assert res.data == results[0].data
+    tag = res.headers['ETag']
+    res = client.post('/export', json=payload, headers={'If-None-Match': tag})
+    assert res.status_code == 304 and not res.data
+    assert len(renders) == 1
+
+    res = client.post('/export', json=dict(payload, summary='Changed'), headers={'If-None-Match': tag})
+    assert res.status_code == 200 and res.headers['ETag'] != tag
+    assert client.get('/export/cache/stats').get_json()['entries'] == 2
+
+
+def test_analyze_batch_streams_ndjson(client, monkeypatch):
+    import analysis
+    import cache
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0.3)
+    monkeypatch.setattr(cache, '_default', False)
+    contexts = [f'Context {i}' for i in range(8)] + ['context 0', 'We see churn']
+    started = time.perf_counter()
+    res = client.post('/analyze/batch', json={'contexts': contexts, 'parallelism': 9})
+    lines = [json.loads(line) for line in res.data.decode('utf-8').splitlines()]
+    elapsed = time.perf_counter() - started
+    assert res.mimetype == 'application/x-ndjson'
+    assert elapsed < 1.5  # one latency for 9 unique inputs, not ten
+    done = lines.pop()
+    assert done['done'] and done['count'] == 10 and done['unique'] == 9
+    assert sorted(line['index'] for line in lines) == list(range(10))
+    by_index = {line['index']: line['result'] for line in lines}
+    assert by_index[0] == by_index[8]  # "context 0" deduped onto "Context 0"
+    assert by_index[9]['risk_level'] == 'Critical'
+
+    assert client.post('/analyze/batch', json={'contexts': []}).status_code == 400
+    assert client.post('/analyze/batch', json={'contexts': ['a'], 'parallelism': 'x'}).status_code == 400
+
+
+def test_analyze_sse_mode(client, monkeypatch):
+    import analysis
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    res = client.post('/analyze', json={'data': 'Losses are mounting'}, headers={'Accept': 'text/event-stream'})
+    assert res.mimetype == 'text/event-stream'
+    body = res.data.decode('utf-8')
+    assert body.startswith('event: field\n')
+    last = body.strip().split('\n\n')[-1]
+    assert last.startswith('event: done\n')
+    assert json.loads(last.split('data: ', 1)[1])['risk_level'] == 'Critical'
+
+
+def test_analyze_job_mode(client, monkeypatch, tmp_path):
+    import analysis
+    import jobs
+    import app as app_module
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    monkeypatch.setattr(app_module, 'job_queue', jobs.JobQueue(analysis.analyze, result_dir=str(tmp_path)))
+
+    res = client.post('/analyze?async=1', json={'data': 'churn is rising'})
+    assert res.status_code == 202
+    job_id = res.get_json()['job_id']
+
+    for _ in range(100):
+        res = client.get(f'/jobs/{job_id}')
+        if res.status_code != 202:
+            break
+        time.sleep(0.02)
+    assert res.status_code == 200
+    assert res.get_json()['risk_level'] == 'Critical'
+    assert client.get('/jobs/' + '0' * 32).status_code == 404
+
+
+def test_analyze_job_queue_full(client, monkeypatch, tmp_path):
+    import jobs
+    import app as app_module
+    release = threading.Event()
+    queue = jobs.JobQueue(lambda text: release.wait(5), max_workers=1, max_pending=0, result_dir=str(tmp_path))
+    monkeypatch.setattr(app_module, 'job_queue', queue)
+    try:
+        assert client.post('/analyze?async=1', json={'data': 'a'}).status_code == 202
+        res = client.post('/analyze?async=1', json={'data': 'b'})
+        assert res.status_code == 429
+        assert int(res.headers['Retry-After']) >= 1
+    finally:
+        release.set()
+
+
+def test_analyze_cache_hit_skips_latency(client, monkeypatch):
+    import analysis
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    client.post('/analyze', json={'data': 'Cache me: supply delays'})
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 5)
+    start = time.time()
+    res = client.post('/analyze', json={'data': '  cache ME:   supply delays '})
+    assert res.status_code == 200
+    assert time.time() - start < 1
+    stats = client.get('/cache/stats').get_json()
+    assert stats['hits'] >= 1
+
+
+def test_upload_infinite_cells_are_gaps(client):
+    cells = [1, 2, 'inf', 4, '-inf', 6, 'Infinity', 8] * 5
+    for content in ('day,value\n' + ''.join(f'{i},{v}\n' for i, v in enumerate(cells)),
+                    ''.join(f'{v}\n' for v in cells)):
+        data = {'file': (io.BytesIO(content.encode('utf-8')), 'inf.csv')}
+        res = client.post('/upload', data=data, content_type='multipart/form-data')
+        assert res.status_code == 200
+
+        def reject(token):
+            raise AssertionError(f'{token} is not valid JSON')
+        body = json.loads(res.get_data(as_text=True), parse_constant=reject)
+        assert body['status'] == 'success'
+        assert all(v is None or abs(v) < 10 for v in body['values'])
+
+
+def test_upload_headerless_csv(client):
+    csv_content = '1,5\n2,7\n3,9\n'
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'plain.csv'), 'column': '1'}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    d = res.get_json()
+    assert d['headers'] == []
+    assert d['values'] == [5.0, 7.0, 9.0]
+    assert d['labels'] == ['1', '2', '3']
+
+
+def test_upload_skips_non_numeric_and_ragged_rows(client):
+    csv_content = 'date,value\n2024-01,10\n2024-02,n/a\n2024-03,12,extra\n2024-04\n2024-05,14\n'
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'ragged.csv'), 'column': 'value', 'x_column': 'date'}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    d = res.get_json()
+    assert d['values'] == [10.0, 12.0, 14.0]
+    assert d['labels'] == ['2024-01', '2024-03', '2024-05']
+
+
+def test_upload_all_columns(client):
+    csv_content = 'date,sales,costs,region\n2024-01,100,50,north\n2024-02,120,,south\n2024-03,150,40,east\n'
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'multi.csv'), 'x_column': 'date', 'columns': '*'}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    d = res.get_json()
+    assert d['columns'] == ['sales', 'costs']
+    assert d['default_column'] == 'costs'
+    assert d['labels'] == ['2024-01', '2024-02', '2024-03']
+    assert d['series']['costs'] == [50.0, None, 40.0]
+    assert round(d['stats']['sales']['trend_pct'], 1) == 50.8  # least-squares, not first-vs-last
+    assert d['stats']['sales']['status'] == 'High Risk'
+
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'multi.csv'), 'columns': 'sales,missing'}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert res.status_code == 400
+    assert 'missing' in res.get_json()['message']
+
+
+def test_upload_dataset_handle_requery(client, monkeypatch, tmp_path):
+    import datasets
+    monkeypatch.setattr(datasets, '_default', datasets.DatasetStore(str(tmp_path)))
+    csv_content = 'date,sales,costs\n2024-01,100,50\n2024-02,120,55\n2024-03,150,40\n'
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'multi.csv'), 'x_column': 'date'}
+    d = client.post('/upload', data=data, content_type='multipart/form-data').get_json()
+    dataset_id = d['dataset_id']
+    assert d['values'] == [50.0, 55.0, 40.0]
+
+    meta = client.get(f'/datasets/{dataset_id}').get_json()
+    assert meta['rows'] == 3 and meta['columns'] == ['date', 'sales', 'costs']
+
+    res = client.post(f'/datasets/{dataset_id}/analyze', json={'column': 'sales', 'x_column': 'date', 'start': 1})
+    d = res.get_json()
+    assert d['labels'] == ['2024-02', '2024-03']
+    assert d['values'] == [120.0, 150.0]
+
+    res = client.post(f'/datasets/{dataset_id}/analyze', json={'columns': ['sales', 2]})
+    assert res.get_json()['columns'] == ['sales', 'costs']
+
+    assert client.get('/datasets/' + '0' * 32).status_code == 404
+    res = client.post(f'/datasets/{dataset_id}/analyze', json={'start': 'x'})
+    assert res.status_code == 400
+
+
+def test_upload_downsamples_for_chart(client):
+    rows = ''.join(f'{i},{(i % 50) * 1.5}\n' for i in range(3000))
+    csv_content = 'step,value\n' + rows + '3000,900\n'
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'long.csv'), 'x_column': 'step', 'max_points': '200'}
+    d = client.post('/upload', data=data, content_type='multipart/form-data').get_json()
+    assert len(d['values']) <= 201
+    assert d['dropped_points'] == 3001 - len(d['values'])
+    assert d['downsample'] == {'method': 'lttb', 'max_points': 200, 'original_points': 3001}
+    assert d['labels'][-1] == '3000'
+    # flagged points are kept and their positions refer to the returned series
+    assert d['analytics']['anomaly_count'] >= 1
+    assert d['values'][d['analytics']['anomalies'][-1]] == 900.0
+    assert len(d['analytics']['rolling_mean']) == len(d['values'])
+
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'long.csv'), 'max_points': 'lots'}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert res.status_code == 400
+
+
+def test_upload_content_negotiation(client):
+    import gzip
+    import math
+    import wire
+    rows = ''.join(f'{math.sin(i) * 100}\n' for i in range(3000))
+    content = ('value\n' + rows).encode('utf-8')
+
+    def post(headers, **form):
+        data = {'file': (io.BytesIO(content), 'long.csv'), **form}
+        return client.post('/upload', data=data, content_type='multipart/form-data', headers=headers)
+
+    plain = post({})
+    res = post({'Accept-Encoding': 'gzip'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in res.headers['Vary']
+    assert json.loads(gzip.decompress(res.data)) == plain.get_json()
+
+    # implicit row labels travel as a range; values as a float64 buffer
+    res = post({'Accept': wire.BINARY_MIME})
+    assert res.mimetype == wire.BINARY_MIME
+    assert b'"range":[1,1,3000]' in res.data
+    assert len(res.data) < len(plain.data) / 2
+    d = wire.decode_binary(res.data)
+    assert d['labels'] == plain.get_json()['labels']
+    assert d['values'].tolist() == plain.get_json()['values']
+
+    # downsampled rows are no longer evenly spaced: sent as row numbers
+    d = wire.decode_binary(post({'Accept': wire.BINARY_MIME}, max_points='100').data)
+    expected = post({}, max_points='100').get_json()
+    assert d['labels'] == expected['labels']
+    assert len(d['analytics']['rolling_mean']) == len(d['values'])
+
+
+def test_upload_limits_enforced_while_streaming(client, monkeypatch):
+    import csv_engine
+    monkeypatch.setattr(csv_engine, 'MAX_UPLOAD_ROWS', 3)
+    csv_content = 'date,value\n' + ''.join(f'2020-{i:02d},{i}\n' for i in range(1, 10))
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'rows.csv')}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert res.status_code == 400
+    assert 'rows limit' in res.get_json()['message']
+
+    monkeypatch.setattr(csv_engine, 'MAX_UPLOAD_ROWS', 10000)
+    monkeypatch.setattr(csv_engine, 'MAX_UPLOAD_BYTES', 20)
+    data = {'file': (io.BytesIO(csv_content.encode('utf-8')), 'bytes.csv')}
+    res = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert res.status_code == 400
+    assert 'File size exceeds' in res.get_json()['message']
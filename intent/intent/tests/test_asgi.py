@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import analysis
+import cache
+import metrics
+from app import app as flask_app
+from asgi import app
+from benchmarks.fake_llm import CANNED_ANALYSIS, FakeLLMServer
+
+
+@pytest.fixture(autouse=True)
+def no_demo_latency(monkeypatch):
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+
+
+def _request(method, path, **kwargs):
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(go())
+
+
+def test_async_analyze_mock():
+    key = ('intent_http_requests_total', ('/analyze', 'POST', '200'))
+    before = metrics.collect().get(key, 0)
+    res = _request('POST', '/analyze', json={'data': 'We are seeing increased churn.'})
+    assert res.status_code == 200
+    data = res.json()
+    assert data['status'] == 'success'
+    assert data['risk_level'] == 'Critical'
+    assert 'render;dur=' in res.headers['server-timing']
+    assert metrics.collect()[key] == before + 1
+
+
+def test_async_analyze_uses_llm(monkeypatch):
+    server = FakeLLMServer(delay=0).start_in_thread()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    try:
+        res = _request('POST', '/analyze', json={'data': 'Revenue is flat.'})
+    finally:
+        server.stop()
+    assert res.status_code == 200
+    assert res.json()['summary'].startswith('Fake LLM')
+    assert server.requests == 1
+
+
+def test_async_analyze_invalid_json():
+    res = _request('POST', '/analyze', content=b'not json', headers={'content-type': 'application/json'})
+    assert res.status_code == 400
+
+
+def test_other_routes_fall_through_to_flask():
+    res = _request('GET', '/')
+    assert res.status_code == 200
+    assert b'Intent' in res.content
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        name, data = block.split('\n')
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def test_async_analyze_streams_sse(monkeypatch):
+    server = FakeLLMServer(delay=0.05, chunk_size=5).start_in_thread()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    monkeypatch.setattr(cache, '_default', False)
+    try:
+        res = _request('POST', '/analyze?stream=1', json={'data': 'Revenue is flat.'})
+    finally:
+        server.stop()
+    assert res.headers['content-type'].startswith('text/event-stream')
+    events = _events(res.text)
+    names = [name for name, _ in events]
+    assert names[0] == 'field' and names[-1] == 'done'
+    assert events[1] == ('field', {'key': 'summary', 'value': CANNED_ANALYSIS['summary']})
+    items = [data['value'] for name, data in events if name == 'item' and data['key'] == 'predictions']
+    assert items == CANNED_ANALYSIS['predictions']
+    assert events[-1][1]['recommendations'] == CANNED_ANALYSIS['recommendations']
+
+
+@pytest.mark.parametrize('accept, events', [
+    ('text/event-stream', True),
+    ('text/event-stream, application/json;q=0.5', True),
+    ('text/event-stream;q=0.1, */*', False),
+    ('application/json, text/event-stream', False),
+    ('*/*', False),
+    ('', False),
+])
+def test_accept_negotiation_matches_flask(accept, events):
+    # The ASGI route and the Flask route pick the same representation
+    headers = {'Accept': accept} if accept else {}
+    body = {'data': 'Revenue is flat.'}
+    asgi_res = _request('POST', '/analyze', json=body, headers=headers)
+    flask_res = flask_app.test_client().post('/analyze', json=body, headers=headers)
+    for res in (asgi_res, flask_res):
+        assert res.headers['content-type'].startswith('text/event-stream' if events else 'application/json')
@@ -0,0 +1,40 @@
+import cache
+
+
+def test_key_normalizes_case_and_whitespace():
+    a = cache.make_key('Churn  is rising\n', 'gpt', '1')
+    b = cache.make_key('churn is rising', 'gpt', '1')
+    assert a == b
+    assert a != cache.make_key('churn is rising', 'gpt', '2')
+    assert a != cache.make_key('churn is rising', 'other-model', '1')
+
+
+def test_memory_backend_lru_byte_cap():
+    c = cache.ResponseCache(cache.MemoryBackend(max_bytes=60), ttl=60)
+    c.set('a', {'v': 'x' * 20})
+    c.set('b', {'v': 'y' * 20})
+    assert c.get('a') is not None  # touch a so b is least recently used
+    c.set('c', {'v': 'z' * 20})
+    assert c.get('b') is None
+    assert c.get('a') == {'v': 'x' * 20}
+    stats = c.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 60
+
+
+def test_ttl_expiry():
+    c = cache.ResponseCache(cache.MemoryBackend(max_bytes=1024), ttl=-1)
+    c.set('a', {'v': 1})
+    assert c.get('a') is None
+
+
+def test_sqlite_backend_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    writer = cache.ResponseCache(cache.SQLiteBackend(path, max_bytes=1024), ttl=60)
+    reader = cache.ResponseCache(cache.SQLiteBackend(path, max_bytes=1024), ttl=60)
+    writer.set('k', {'risk_level': 'Critical'})
+    assert reader.get('k') == {'risk_level': 'Critical'}
+    assert reader.get('missing') is None
+    stats = reader.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
@@ -0,0 +1,61 @@
+import io
+import os
+import time
+
+import numpy as np
+
+import csv_engine
+import datasets
+
+
+CSV = b'date,sales,costs\n2024-01,100,50\n2024-02,120,\n2024-03,150,40\n2024-04,n/a,45\n'
+
+
+def _table(content=CSV):
+    return csv_engine.read_table(io.BytesIO(content), text_columns=['date'])
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    store = datasets.DatasetStore(str(tmp_path), ttl=60)
+    dataset_id = store.put(_table())
+    assert store.put(_table()) == dataset_id  # content-addressed
+
+    table = store.load(dataset_id)
+    base = table.frame[1].to_numpy()
+    while base.base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+    rows, labels, series = csv_engine.select_columns(table, '*', 'date')
+    assert rows.tolist() == [1, 2, 3, 4]
+    assert labels.tolist() == ['2024-01', '2024-02', '2024-03', '2024-04']
+    assert np.array_equal(series['costs'], [50, np.nan, 40, 45], equal_nan=True)
+
+    rows, labels, values = csv_engine.select_series(table.slice(1, 3), 'sales', 'date')
+    assert rows.tolist() == [2, 3]
+    assert labels.tolist() == ['2024-02', '2024-03']
+    assert values.tolist() == [120.0, 150.0]
+
+
+def test_unknown_and_expired_ids(tmp_path):
+    store = datasets.DatasetStore(str(tmp_path), ttl=60)
+    assert store.load('0' * 32) is None
+    assert store.load('../etc') is None
+    dataset_id = store.put(_table())
+    old = os.stat(tmp_path / dataset_id).st_mtime - 120
+    os.utime(tmp_path / dataset_id, (old, old))
+    assert store.load(dataset_id) is None
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    first = _table()
+    size = sum(datasets._column_arrays(first.frame[i])[0].nbytes for i in range(first.width))
+    store = datasets.DatasetStore(str(tmp_path), ttl=60, max_bytes=size * 2.5)
+    a = store.put(first)
+    b = store.put(_table(CSV + b'2024-05,160,41\n'))
+    now = time.time()
+    os.utime(tmp_path / a, (now - 10, now - 10))
+    os.utime(tmp_path / b, (now - 20, now - 20))  # b is least recently used
+    c = store.put(_table(CSV + b'2024-06,170,42\n'))
+    assert store.meta(a) is not None
+    assert store.meta(c) is not None
+    assert not os.path.exists(tmp_path / b)
@@ -0,0 +1,48 @@
+import numpy as np
+
+import downsample
+
+
+def test_lttb_keeps_ends_and_shape():
+    values = np.sin(np.linspace(0, 20, 10_000))
+    idx = downsample.lttb(values, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == 9_999
+    assert (np.diff(idx) > 0).all()
+    # peaks and troughs survive
+    assert values[idx].max() > 0.999 and values[idx].min() < -0.999
+
+
+def test_minmax_keeps_extremes():
+    values = np.random.default_rng(0).normal(0, 1, 10_000)
+    idx = downsample.minmax(values, 200)
+    assert len(idx) <= 200
+    assert values.argmax() in idx and values.argmin() in idx
+
+
+def test_select_skips_gaps_and_keeps_flagged_points():
+    values = np.cos(np.linspace(0, 10, 5_000))
+    values[::7] = np.nan
+    idx = downsample.select(values, 100, keep=[1234])
+    assert 1234 in idx
+    assert not np.isnan(values[idx]).any()
+    assert len(idx) <= 101
+    assert len(downsample.select(values[:50], 100)) == len(values[:50]) - 8
+
+
+def test_select_treats_infinite_cells_as_gaps():
+    values = np.sin(np.linspace(0, 20, 5_000))
+    values[[10, 2_500]] = np.inf
+    values[4_000] = -np.inf
+    for method in downsample.METHODS:
+        idx = downsample.select(values, 100, method)
+        assert np.isfinite(values[idx]).all()
+        assert len(idx) <= 100
+
+
+def test_select_many_shares_positions():
+    a = np.sin(np.linspace(0, 20, 4_000))
+    b = np.cos(np.linspace(0, 20, 4_000))
+    idx = downsample.select_many([a, b], 400)
+    assert len(idx) <= 400
+    assert a[idx].max() > 0.99 and b[idx].min() < -0.99
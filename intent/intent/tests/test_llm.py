@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+import analysis
+import llm
+import metrics
+from benchmarks.fake_llm import CANNED_ANALYSIS, FakeLLMServer
+
+MESSAGES = [{"role": "user", "content": "Revenue is flat."}]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeLLMServer(delay=0).start_in_thread()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    monkeypatch.setenv('OPENAI_RETRY_BACKOFF', '0.01')
+    monkeypatch.setattr(llm, 'breaker', llm.CircuitBreaker(failure_threshold=2, reset_after=0.2))
+    llm.reset_stats()
+    yield server
+    server.stop()
+
+
+def test_retries_then_succeeds(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_RETRIES', '2')
+    server.failures = 2
+    assert llm.complete(MESSAGES)
+    stats = llm.stats()
+    assert stats['attempts'] == 3
+    assert stats['retries'] == 2
+    assert stats['successes'] == 1
+    assert stats['breaker_state'] == 'closed'
+
+
+def test_deadline_bounds_slow_upstream(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_TIMEOUT', '0.2')
+    server.delay = 2
+    t0 = time.monotonic()
+    with pytest.raises(openai.APITimeoutError):
+        llm.complete(MESSAGES)
+    assert time.monotonic() - t0 < 1
+    assert llm.stats()['timeouts'] >= 1
+
+
+def test_breaker_opens_and_recovers(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_RETRIES', '0')
+    server.failures = 2
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            llm.complete(MESSAGES)
+    assert llm.breaker.state == 'open'
+
+    # Open: no request reaches the upstream
+    requests = server.requests
+    with pytest.raises(llm.CircuitOpen):
+        llm.complete(MESSAGES)
+    assert server.requests == requests
+    assert llm.stats()['short_circuits'] == 1
+
+    # After the cooldown one trial call goes through and closes it again
+    time.sleep(0.25)
+    assert llm.complete(MESSAGES)
+    assert llm.breaker.state == 'closed'
+
+
+def test_local_errors_leave_breaker_alone(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_RETRIES', '0')
+    llm.breaker.record_failure()
+    llm.breaker.record_failure()
+    time.sleep(0.25)
+
+    def broken(timeout):
+        raise TypeError("unexpected keyword argument")
+    # The half-open trial fails before reaching the upstream: still not closed,
+    # and the next call gets the trial instead
+    with pytest.raises(TypeError):
+        llm._call(broken, llm._admit())
+    assert llm.breaker.state == 'half_open'
+    assert llm.complete(MESSAGES)
+    assert llm.breaker.state == 'closed'
+
+
+def test_open_breaker_falls_back_to_mock(server, monkeypatch):
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    monkeypatch.setattr(analysis.cache, '_default', False)
+    llm.breaker.record_failure()
+    llm.breaker.record_failure()
+    server.delay = 2
+    key = ('intent_llm_fallbacks_total', ('circuit_open',))
+    before = metrics.collect().get(key, 0)
+    t0 = time.monotonic()
+    result = analysis.analyze('We are seeing increased churn.')
+    assert time.monotonic() - t0 < 0.5
+    assert result['summary'] != CANNED_ANALYSIS['summary']
+    assert server.requests == 0
+    assert metrics.collect()[key] == before + 1
+
+
+def test_async_retries_and_stream(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_RETRIES', '1')
+    server.failures = 1
+
+    async def go():
+        text = await llm.acomplete(MESSAGES)
+        pieces = [piece async for piece in llm.astream(MESSAGES)]
+        return text, ''.join(pieces)
+
+    text, streamed = asyncio.run(go())
+    assert text == streamed
+    assert llm.stats()['retries'] == 1
+    assert llm.stats()['streams'] == 1
+
+
+def test_stream_outcome_recorded_once(server, monkeypatch):
+    # Opens at once, then runs past the deadline mid-body
+    monkeypatch.setenv('OPENAI_TIMEOUT', '0.3')
+    server.delay = 1.5
+    with pytest.raises(openai.APITimeoutError):
+        for _ in llm.stream(MESSAGES):
+            pass
+    stats = llm.stats()
+    assert (stats['successes'], stats['failures']) == (0, 1)
+
+    # A consumer that stops early records nothing and frees the trial slot
+    server.delay = 0
+    llm.breaker.state = 'half_open'
+    pieces = llm.stream(MESSAGES)
+    next(pieces)
+    pieces.close()
+    stats = llm.stats()
+    assert (stats['successes'], stats['failures']) == (0, 1)
+    assert llm.breaker.allow()
@@ -0,0 +1,117 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+
+REQUESTS = metrics.Counter('test_requests_total', 'Test requests', ('route',))
+LATENCY = metrics.Histogram('test_latency_seconds', 'Test latency', buckets=(0.1, 1.0))
+BUSY = metrics.Gauge('test_busy', 'Test in-flight')
+
+
+def test_text_exposition():
+    REQUESTS.inc(route='/a "quoted"')
+    LATENCY.observe(0.05)
+    LATENCY.observe(0.5)
+    LATENCY.observe(5)
+    text = metrics.exposition()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_requests_total{route="/a \\"quoted\\""} 1' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum 5.55' in text
+    assert 'test_latency_seconds_count 3' in text
+    with pytest.raises(ValueError):
+        REQUESTS.inc(path='/a')
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_aggregates_worker_files(monkeypatch, tmp_path):
+    monkeypatch.setenv('INTENT_METRICS_DIR', str(tmp_path))
+    key = ('test_requests_total', ('/files',))
+    gauge = ('test_busy', ())
+    before = metrics.collect()
+    for pid, requests, busy in ((os.getppid(), 2, 3), (_dead_pid(), 5, 7)):
+        with open(tmp_path / f'metrics-{pid}.json', 'w') as f:
+            json.dump({"pid": pid, "samples": [['test_requests_total', ['/files'], requests],
+                                               ['test_busy', [], busy]]}, f)
+    after = metrics.collect()
+    # An exited worker's requests still count; its in-flight gauge does not
+    assert after[key] == before.get(key, 0) + 7
+    assert after[gauge] == before.get(gauge, 0) + 3
+
+
+def _child_work():
+    REQUESTS.inc(route='/forked')
+    metrics.flush()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_workers_start_from_zero(monkeypatch, tmp_path):
+    monkeypatch.setenv('INTENT_METRICS_DIR', str(tmp_path))
+    key = ('test_requests_total', ('/forked',))
+    REQUESTS.inc(route='/forked')
+    context = multiprocessing.get_context('fork')
+    children = [context.Process(target=_child_work) for _ in range(2)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+    # The parent's own increment is not copied into either child's file
+    assert metrics.collect()[key] == 3
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import analysis
+    from app import app
+    monkeypatch.setattr(analysis, 'DEMO_LATENCY_SECONDS', 0)
+    with app.test_client() as client:
+        yield client
+
+
+def _served(client, route, send):
+    """``(requests recorded, change in flight)`` for one request, read and closed."""
+    count = ('intent_http_requests_total', (route, 'POST', '200'))
+    # Other tests' unclosed test-client responses stay in flight; compare deltas
+    gauge = ('intent_http_requests_in_flight', (route,))
+    before = metrics.collect()
+    res = send(client)
+    assert res.status_code == 200 and res.data
+    res.close()
+    after = metrics.collect()
+    return after[count] - before.get(count, 0), after.get(gauge, 0) - before.get(gauge, 0)
+
+
+@pytest.mark.parametrize('route, send', [
+    ('/export', lambda c: c.post('/export', json={'summary': 'S', 'risk': 'Low', 'predictions': [],
+                                                 'recommendations': []})),
+    ('/analyze/batch', lambda c: c.post('/analyze/batch', json={'contexts': ['a', 'b']})),
+    ('/analyze', lambda c: c.post('/analyze?stream=1', json={'data': 'Streamed'})),
+])
+def test_streamed_responses_are_recorded(client, route, send):
+    assert _served(client, route, send) == (1, 0)
+
+
+def test_passthrough_responses_are_recorded():
+    from flask import Response, request
+    from app import app
+    count = ('intent_http_requests_total', ('/metrics', 'GET', '200'))
+    before = metrics.collect().get(count, 0)
+    with app.test_request_context('/metrics'):
+        app.preprocess_request()
+        resp = app.process_response(Response(iter([b'file']), direct_passthrough=True))
+        body = resp.get_app_iter(request.environ)
+        assert b''.join(body) == b'file'
+        body.close()
+    assert metrics.collect()[count] == before + 1
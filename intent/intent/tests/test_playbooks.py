@@ -0,0 +1,68 @@
+import json
+import os
+import time
+
+import pytest
+
+import playbooks
+
+
+def _write(directory, name, **fields):
+    spec = {"name": name, "status": name.upper(), "color": "#FFFFFF", "confidence": "90.0%",
+            "analysis": "", "strategy": "", "actions": [], "impact_data": [1, 2], "impact_label": "", **fields}
+    path = os.path.join(directory, f'{name}.json')
+    with open(path, 'w') as f:
+        json.dump(spec, f)
+    return path
+
+
+def test_shipped_playbooks_route_and_are_immutable():
+    registry = playbooks.Registry.load(playbooks.PLAYBOOK_DIR, fallback=False)
+    assert [p.name for p in registry.playbooks] == ['cyber', 'revenue', 'supply_chain']
+    assert registry.route('We had a data BREACH in Q3').name == 'cyber'
+    assert registry.route('shipping delay').name == 'supply_chain'
+    book = registry.route('nothing to see here')
+    assert book is registry.default and book.response['status'] == 'ANALYZING PATTERNS'
+    with pytest.raises(AttributeError):
+        book.status = 'changed'
+    with pytest.raises(TypeError):
+        book.response['status'] = 'changed'
+    assert not hasattr(book, '__dict__')
+
+
+def test_invalid_sets_are_rejected(tmp_path):
+    _write(tmp_path, 'cyber', keywords=['breach'])
+    with pytest.raises(ValueError, match='default'):
+        playbooks.Registry.load(tmp_path)
+    with open(tmp_path / 'broken.json', 'w') as f:
+        f.write('{"name": "broken"}')
+    with pytest.raises(ValueError, match='broken.json'):
+        playbooks.Registry.load(tmp_path)
+
+
+def _wait_for_reloads(store, count):
+    deadline = time.monotonic() + 5
+    while store.reloads < count and time.monotonic() < deadline:
+        store.registry()
+        time.sleep(0.01)
+    return store.reloads
+
+
+def test_hot_reload_on_mtime_change(tmp_path):
+    _write(tmp_path, 'generic', default=True)
+    path = _write(tmp_path, 'cyber', keywords=['breach'])
+    store = playbooks.PlaybookStore(str(tmp_path), check_interval=0, fallback=False)
+    assert store.route('phishing wave').name == 'generic'
+
+    _write(tmp_path, 'cyber', keywords=['breach', 'phishing'])
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert _wait_for_reloads(store, 1) == 1
+    assert store.route('phishing wave').name == 'cyber'
+
+    # A bad edit is logged and the previous playbooks keep serving
+    with open(path, 'w') as f:
+        f.write('{not json')
+    store.registry()
+    time.sleep(0.2)
+    assert store.reloads == 1
+    assert store.route('phishing wave').name == 'cyber'
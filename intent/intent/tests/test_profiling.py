@@ -0,0 +1,90 @@
+import threading
+import time
+
+from flask import Flask
+
+import profiling
+
+HEADERS = {'X-Admin-Token': 'secret'}
+
+
+def _make_app(tmp_path, token='secret', keep=2, max_seconds=None):
+    import app as app_module
+    app = Flask(__name__)
+    # The real /export view: a streamed PDF
+    app.add_url_rule('/export', view_func=app_module.export_pdf, methods=['POST'])
+
+    @app.route('/slow')
+    def slow():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return 'done'
+
+    store = profiling.install(app, token=token, directory=str(tmp_path), keep=keep, max_seconds=max_seconds)
+    return app, store
+
+
+def test_disabled_without_token(tmp_path, monkeypatch):
+    monkeypatch.delenv('INTENT_ADMIN_TOKEN', raising=False)
+    app, store = _make_app(tmp_path, token=None)
+    assert store is None
+    assert not app.before_request_funcs and not app.after_request_funcs
+    client = app.test_client()
+    res = client.get('/slow?profile=1', headers=HEADERS)
+    assert res.status_code == 200 and 'X-Profile-Id' not in res.headers
+    assert client.get('/admin/profiles', headers=HEADERS).status_code == 404
+
+
+def test_profile_saved_listed_and_trimmed(tmp_path):
+    app, store = _make_app(tmp_path)
+    client = app.test_client()
+    assert client.get('/slow?profile=1').status_code == 403
+    assert client.get('/slow?profile=1', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.get('/admin/profiles').status_code == 403
+
+    ids = []
+    for _ in range(3):
+        res = client.get('/slow', headers={**HEADERS, 'X-Intent-Profile': '1'})
+        res.close()
+        ids.append(res.headers['X-Profile-Id'])
+
+    listed = client.get('/admin/profiles', headers=HEADERS).get_json()['profiles']
+    # Ring buffer keeps the newest two, newest first
+    assert [p['id'] for p in listed] == ids[:0:-1]
+    assert listed[0]['samples'] > 0 and listed[0]['seconds'] >= 0.05
+
+    res = client.get(f'/admin/profiles/{ids[-1]}', headers=HEADERS)
+    assert res.status_code == 200
+    lines = res.get_data(as_text=True).splitlines()
+    assert any('slow (' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert client.get(f'/admin/profiles/{ids[0]}', headers=HEADERS).status_code == 404
+    assert client.get('/admin/profiles/..', headers=HEADERS).status_code == 404
+
+
+def _samplers():
+    return [t for t in threading.enumerate() if t.name == 'profile-sampler']
+
+
+EXPORT = {'summary': 'S', 'risk': 'Low', 'predictions': [], 'recommendations': ['Do X'] * 200}
+
+
+def test_streamed_export_profiled(tmp_path):
+    app, store = _make_app(tmp_path)
+    res = app.test_client().post('/export?profile=1', json=EXPORT, headers=HEADERS)
+    assert res.status_code == 200 and res.data.startswith(b'%PDF')
+    res.close()
+    assert [p['id'] for p in store.list()] == [res.headers['X-Profile-Id']]
+    assert not _samplers()
+
+
+def test_unclosed_response_stops_at_limit(tmp_path):
+    app, store = _make_app(tmp_path, max_seconds=0.05)
+    res = app.test_client().post('/export?profile=1', json=EXPORT, headers=HEADERS)
+    assert res.status_code == 200
+    time.sleep(0.2)  # never closed
+    assert not _samplers()
+    assert [p['id'] for p in store.list()] == [res.headers['X-Profile-Id']]
+    res.close()  # a late close saves nothing more
+    assert len(store.list()) == 1
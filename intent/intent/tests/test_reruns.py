@@ -0,0 +1,57 @@
+import csv_engine
+import datasets
+import reruns
+
+CSV = b'date,sales\n2024-01,100\n2024-02,120\n2024-03,150\n'
+
+
+def test_upload_id_hashes_each_file_once():
+    ids, reads = {}, []
+
+    def read():
+        reads.append(1)
+        return CSV
+    first = reruns.upload_id(ids, 'file-1', read)
+    assert reruns.upload_id(ids, 'file-1', read) == first
+    assert len(reads) == 1
+    # The same bytes under another upload share the dataset id, and so the cached table
+    assert reruns.upload_id(ids, 'file-2', lambda: CSV) == first == datasets.source_id(CSV)
+    assert reruns.upload_id(ids, 'file-3', lambda: CSV + b'2024-04,90\n') != first
+
+
+def test_keys_are_normalized():
+    assert reruns.analysis_key('abc', '') == reruns.analysis_key('abc', None) == ('abc', None)
+    assert reruns.analysis_key('abc', 'date') != reruns.analysis_key('abc', None)
+    assert reruns.text_key('  Churn is   RISING ', 'mock') == reruns.text_key('churn is rising', 'mock')
+    assert reruns.text_key('churn is rising', 'mock') != reruns.text_key('churn is rising', 'gpt-4o-mini')
+
+
+def test_load_table_parses_once(tmp_path, monkeypatch):
+    store = datasets.DatasetStore(str(tmp_path), ttl=60)
+    calls = []
+    read_table = csv_engine.read_table
+    monkeypatch.setattr(csv_engine, 'read_table', lambda *a, **kw: calls.append(1) or read_table(*a, **kw))
+    first = reruns.load_table(CSV, store=store)
+    second = reruns.load_table(CSV, store=store)
+    assert len(calls) == 1
+    assert first.column_names == second.column_names == ['date', 'sales']
+
+
+def test_demo_results_reports_missing_files(tmp_path):
+    (tmp_path / 'ok.csv').write_bytes(CSV)
+    results = reruns.demo_results(str(tmp_path), ['ok.csv', 'missing.csv'], max_points=10)
+    assert results['ok.csv']['status'] == 'success'
+    assert results['missing.csv']['status'] == 'error'
+
+
+def test_load_table_keys_on_x_column(tmp_path):
+    store = datasets.DatasetStore(str(tmp_path), ttl=60)
+    content = b'day,sales\n1,100\n2,120\n3,150\n'
+    assert reruns.table_id(content) == datasets.source_id(content)
+    assert reruns.table_id(content, 'day') != reruns.table_id(content)
+    numeric = reruns.load_table(content, store=store)
+    labelled = reruns.load_table(content, 'day', store=store)
+    # Parsed for its own X column, not handed the first caller's table
+    assert numeric.frame[0].dtype.kind == 'i'
+    assert labelled.frame[0].dtype.kind not in 'iuf'
+    assert reruns.load_table(content, store=store).frame[0].dtype.kind == 'i'
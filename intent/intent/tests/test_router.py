@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+import router
+from router import Router
+
+
+def _linear(rules, text):
+    q = text.lower()
+    for name, keywords in rules:
+        if any(k in q for k in keywords):
+            return name
+    return None
+
+
+def test_first_rule_wins_like_an_elif_chain():
+    rules = [('cyber', ['security', 'attack']), ('revenue', ['sales', 'q3']), ('supply', ['delay'])]
+    scenarios = Router(rules)
+    assert scenarios.match('Q3 sales after the ATTACK') == 'cyber'
+    assert scenarios.match('shipping delayed in q3') == 'revenue'
+    assert scenarios.match('shipments delayed') == 'supply'
+    assert scenarios.match('nothing relevant') is None
+    assert scenarios.match('') is None and scenarios.match(None) is None
+
+
+@pytest.mark.parametrize('linear_max', [0, router.LINEAR_MAX_KEYWORDS])
+def test_compiled_pattern_matches_substring_scan(monkeypatch, linear_max):
+    monkeypatch.setattr(router, 'LINEAR_MAX_KEYWORDS', linear_max)
+    rng = random.Random(0)
+    for _ in range(300):
+        rules = [(i, [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(3)])
+                 for i in range(8)]
+        scenarios = Router(rules)
+        for _ in range(20):
+            text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 12)))
+            assert scenarios.match(text) == _linear(rules, text), (rules, text)
+
+
+def test_overlapping_keywords(monkeypatch):
+    monkeypatch.setattr(router, 'LINEAR_MAX_KEYWORDS', 0)
+    scenarios = Router([('a', ['attack', 'loss']), ('b', ['cyberattack', 'lossy'])])
+    assert scenarios.match('cyberattack') == 'a'
+    assert scenarios.match('lossy') == 'a'
+
+
+def test_fallback_model():
+    pytest.importorskip('sklearn')
+    scenarios = Router([
+        ('cyber', ['breach', 'attack'], ['hackers got into our systems', 'ransomware on the servers']),
+        ('supply', ['shipping', 'inventory'], ['port congestion is holding containers', 'freight is late']),
+    ], fallback=True)
+    assert scenarios.classify('the hackers used ransomware') == 'cyber'
+    assert scenarios.classify('containers stuck at the port') == 'supply'
+    assert Router([('cyber', ['breach'])], fallback=True).classify('hello') is None
@@ -0,0 +1,32 @@
+import time
+
+import stages
+
+
+def test_production_mode_removes_demo_delays(monkeypatch):
+    monkeypatch.setenv('INTENT_DEMO_LATENCY', '2')
+    monkeypatch.setenv('INTENT_MODE', 'production')
+    assert stages.demo_latency() == 0.0
+    t0 = time.perf_counter()
+    stages.demo_pause(1)
+    assert time.perf_counter() - t0 < 0.1
+
+    monkeypatch.setenv('INTENT_MODE', 'demo')
+    assert stages.demo_latency() == 2.0
+    monkeypatch.setenv('INTENT_MODE', 'bogus')
+    assert stages.mode() == 'demo'
+
+
+def test_stage_timer_reports_progress_and_timings():
+    seen = []
+    timer = stages.StageTimer(('parse', 'analyze', 'render'),
+                              on_stage=lambda t, name, done: seen.append((name, done, t.progress())))
+    with timer.stage('parse'):
+        pass
+    with timer.stage('analyze'):
+        time.sleep(0.01)
+    assert seen == [('parse', False, 0.0), ('parse', True, 1 / 3),
+                    ('analyze', False, 1 / 3), ('analyze', True, 2 / 3)]
+    assert timer.timings['analyze'] >= 0.01
+    assert timer.server_timing().startswith('parse;dur=')
+    assert 'analyze;dur=' in timer.server_timing()
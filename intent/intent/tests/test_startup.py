@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import startup
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('entry_point', ['app', 'asgi'])
+def test_heavy_dependencies_are_not_imported_at_startup(entry_point):
+    code = (f"import sys, {entry_point}; "
+            f"print(','.join(m for m in {startup.LAZY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+def test_preload_imports_lazy_modules():
+    code = ("import gc, sys, startup; startup.preload(); "
+            "print(all(m in sys.modules for m in startup.LAZY_MODULES), gc.get_freeze_count() > 0)")
+    out = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ['True', 'True']
@@ -0,0 +1,56 @@
+import json
+
+import streaming
+
+
+def _collect(events):
+    out = {}
+    for name, data in events:
+        if name == 'field':
+            out[data['key']] = data['value']
+        elif name == 'item':
+            items = out.setdefault(data['key'], [])
+            assert data['index'] == len(items)
+            items.append(data['value'])
+    return out
+
+
+def test_fragment_parser_any_chunking():
+    doc = {
+        "risk_level": "Critical",
+        "summary": 'Tricky "quotes", {braces}] and \\ slashes',
+        "score": -3.5e2,
+        "flag": True,
+        "missing": None,
+        "predictions": [{"metric": "A", "trend": "+1%", "nested": [1, {"a": [2]}]}, {"metric": "B"}],
+        "recommendations": ["one", "t,w]o"],
+        "meta": {"k": [1, 2]},
+    }
+    text = "```json\n" + json.dumps(doc, indent=2) + "\n```"
+    for size in (1, 2, 5, 64, len(text)):
+        parser = streaming.FragmentParser()
+        events = []
+        for i in range(0, len(text), size):
+            events += parser.feed(text[i:i + size])
+        assert parser.done
+        assert _collect(events) == doc
+
+
+def test_fragment_parser_emits_as_soon_as_complete():
+    parser = streaming.FragmentParser()
+    assert parser.feed('{"summary": "Churn is ri') == []
+    assert parser.feed('sing", "predictions": [{"metric": "Churn"}') == [
+        ('field', {"key": "summary", "value": "Churn is rising"}),
+        ('item', {"key": "predictions", "index": 0, "value": {"metric": "Churn"}}),
+    ]
+    # a number is only complete once its delimiter arrives
+    assert parser.feed('], "score": 12') == []
+    assert parser.feed('}') == [('field', {"key": "score", "value": 12})]
+
+
+def test_result_events_round_trip():
+    result = {"status": "success", "predictions": [{"metric": "M"}], "recommendations": []}
+    events = list(streaming.result_events(result))
+    assert events[-1] == ('done', result)
+    assert _collect(events) == {"status": "success", "predictions": [{"metric": "M"}]}
+    assert streaming.sse('done', {"a": 1}) == 'event: done\ndata: {"a": 1}\n\n'
@@ -0,0 +1,151 @@
+"""Response bodies for CSV uploads, shared by ``/upload``, the dataset
+endpoints and Streamlit's ``process_csv_bytes``.
+
+A response carries the (optionally downsampled) series for the chart,
+the analytics computed over every point, and the ``predictions`` /
+``summary`` / ``recommendations`` fields the UIs render.
+
+The builders return per-point data as NumPy arrays (``rows``, ``labels``,
+``values`` / ``series`` and each ``rolling_mean``) so :mod:`wire` can send
+them as binary buffers; :func:`to_json` turns a response into plain JSON.
+"""
+import numpy as np
+
+import analytics
+import csv_engine
+import downsample
+
+UPLOAD_RECOMMENDATIONS = [
+    "Investigate root causes for rising metric.",
+    "Run targeted interventions and measure impact over next quarter."
+]
+
+
+def downsample_options(source):
+    """``(max_points, method)`` from form or JSON fields; raises ValueError with a user message."""
+    raw = source.get('max_points')
+    try:
+        max_points = int(raw) if raw not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError("max_points must be an integer")
+    if max_points is not None and max_points < 10:
+        raise ValueError("max_points must be at least 10")
+    method = source.get('downsample') or 'lttb'
+    if method not in downsample.METHODS:
+        raise ValueError(f"downsample must be one of: {', '.join(downsample.METHODS)}")
+    return max_points, method
+
+
+def _downsample_info(index, original, max_points, method):
+    if index is None:
+        return {"dropped_points": 0}
+    return {
+        "dropped_points": original - len(index),
+        "downsample": {"method": method, "max_points": max_points, "original_points": original},
+    }
+
+
+def _names(rows, labels):
+    # What predictions and summaries call a point: its X label, else its row number
+    return labels if labels is not None else rows
+
+
+def _take(rows, labels, index):
+    return rows[index], (labels[index] if labels is not None else None)
+
+
+def series_response(parsed, max_points=None, method='lttb'):
+    """Single-column response: one labelled series and its analytics.
+
+    With ``max_points``, longer series are downsampled for the chart; the
+    analytics still cover every point.
+    """
+    rows, labels, values = parsed['rows'], parsed['labels'], parsed['values']
+    stats = analytics.summarize(values)
+    index = None
+    if max_points and len(values) > max_points:
+        index = downsample.select(values, max_points, method, keep=analytics.key_positions(stats))
+    report = analytics.report("Uploaded metric", values, _names(rows, labels), stats, index)
+    # Keep the historical metric name the UI and exports already show
+    report['predictions'][0]['metric'] = "Uploaded Metric"
+    if index is not None:
+        rows, labels, values = _take(rows, labels, index) + (values[index],)
+    return {
+        "status": "success",
+        "headers": parsed['headers'] or [],
+        "rows": rows,
+        "labels": labels,
+        "values": values,
+        "analytics": report['stats'],
+        "predictions": report['predictions'],
+        "recommendations": UPLOAD_RECOMMENDATIONS,
+        "summary": report['summary'],
+        **_downsample_info(index, len(parsed['values']), max_points, method),
+    }
+
+
+def columns_response(parsed, selected_col=None, max_points=None, method='lttb'):
+    """Multi-column response: shared labels, one series and analytics per column."""
+    rows, labels, series = parsed['rows'], parsed['labels'], parsed['series']
+    names = list(series)
+    stats = {name: analytics.summarize(values) for name, values in series.items()}
+    index = None
+    if max_points and len(rows) > max_points:
+        keep = [p for column in stats.values() for p in analytics.key_positions(column)]
+        index = downsample.select_many(list(series.values()), max_points, method, keep)
+    point_names = _names(rows, labels)
+    reports = {name: analytics.report(name, series[name], point_names, stats[name], index) for name in names}
+    if index is not None:
+        rows, labels = _take(rows, labels, index)
+        series = {name: values[index] for name, values in series.items()}
+    # Default view matches single-column mode: the requested column, else the last one
+    default = selected_col if selected_col in reports else names[-1]
+    return {
+        "status": "success",
+        "headers": parsed['headers'] or [],
+        "rows": rows,
+        "labels": labels,
+        "columns": names,
+        "default_column": default,
+        "series": series,
+        "stats": {name: report['stats'] for name, report in reports.items()},
+        "column_predictions": {name: report['predictions'] for name, report in reports.items()},
+        "column_summaries": {name: report['summary'] for name, report in reports.items()},
+        # Detail for the default column, headline trend for the others
+        "predictions": reports[default]['predictions'] + [
+            reports[name]['predictions'][0] for name in names if name != default
+        ],
+        "recommendations": UPLOAD_RECOMMENDATIONS,
+        "summary": reports[default]['summary'],
+        **_downsample_info(index, len(parsed['rows']), max_points, method),
+    }
+
+
+def table_response(table, selected_col=None, selected_x=None, selected_columns=None,
+                    max_points=None, method='lttb'):
+    """Upload response for a parsed table; raises csv_engine.CSVError."""
+    if selected_columns:
+        parsed = csv_engine.columns_from_table(table, selected_columns, selected_x)
+        return columns_response(parsed, selected_col, max_points, method)
+    parsed = csv_engine.series_from_table(table, selected_col, selected_x)
+    return series_response(parsed, max_points, method)
+
+
+def _plain(value):
+    if isinstance(value, np.ndarray):
+        return csv_engine.json_values(value) if value.dtype.kind == 'f' else value.tolist()
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def to_json(response):
+    """Plain-JSON form of a builder response, as ``/upload`` has always sent it.
+
+    Arrays become lists (NaN as None), ``labels`` are always strings (row
+    numbers when no X column was selected) and ``rows`` is dropped.
+    """
+    out = _plain({key: value for key, value in response.items() if key != 'rows'})
+    if 'rows' in response:
+        out['labels'] = csv_engine.label_strings(response['rows'], response['labels']).tolist()
+    return out
@@ -0,0 +1,139 @@
+"""Content negotiation for series responses (``/upload`` and the dataset endpoints).
+
+Clients pick the body format with ``Accept``:
+
+* ``application/json`` (default) -- the plain JSON of ``uploads.to_json``.
+* ``application/vnd.intent.series`` -- the same document with every float
+  array moved into a binary section, so the browser can wrap it in a
+  ``Float64Array`` without parsing numbers or copying::
+
+      b'ISR1' | uint32 LE header length | JSON header, space-padded to 8 bytes
+      | float64 little-endian buffers, each starting on an 8-byte boundary
+
+  In the header, an array is replaced by ``{"$f64": [offset, length]}``
+  (offset in bytes from the start of the buffer section; NaN marks gaps).
+  ``labels`` is a list of strings when an X column was selected. Otherwise
+  the points are labelled by row number and ``labels`` is
+  ``{"range": [start, step, count]}`` for consecutive rows, or a ``$f64``
+  array of row numbers after downsampling.
+
+Either format is compressed with brotli (when the ``brotli`` package is
+installed) or gzip if ``Accept-Encoding`` allows it and the body is
+larger than :data:`MIN_COMPRESS_BYTES`.
+"""
+import gzip
+import json
+import struct
+
+import numpy as np
+from flask import current_app, request
+
+import uploads
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+JSON_MIME = 'application/json'
+BINARY_MIME = 'application/vnd.intent.series'
+MAGIC = b'ISR1'
+MIN_COMPRESS_BYTES = 1024
+
+
+def _range(rows):
+    # (start, step, count) when the row numbers are evenly spaced
+    if len(rows) < 2:
+        return [int(rows[0]) if len(rows) else 1, 1, int(len(rows))]
+    steps = np.diff(rows)
+    if (steps == steps[0]).all():
+        return [int(rows[0]), int(steps[0]), int(len(rows))]
+    return None
+
+
+def encode_binary(response):
+    """Serialize a builder response from :mod:`uploads` to the binary format."""
+    buffers = []
+    offset = 0
+
+    def pack(value):
+        nonlocal offset
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind in 'fiub':
+                data = np.ascontiguousarray(value, dtype='<f8')
+                ref = {"$f64": [offset, int(len(data))]}
+                buffers.append(data)
+                offset += data.nbytes
+                return ref
+            return value.tolist()
+        if isinstance(value, dict):
+            return {key: pack(item) for key, item in value.items()}
+        return value
+
+    header = pack({key: value for key, value in response.items() if key not in ('rows', 'labels')})
+    if 'rows' in response:
+        labels = response['labels']
+        if labels is not None:
+            header['labels'] = labels.tolist()
+        else:
+            span = _range(response['rows'])
+            header['labels'] = {"range": span} if span else pack(response['rows'])
+
+    text = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    text += b' ' * (-(len(text) + 8) % 8)
+    return b''.join([MAGIC, struct.pack('<I', len(text)), text] + [b.tobytes() for b in buffers])
+
+
+def decode_binary(body):
+    """Inverse of :func:`encode_binary`, for Python clients and tests.
+
+    Arrays come back as float64 arrays; a label range is expanded to strings.
+    """
+    if body[:4] != MAGIC:
+        raise ValueError("Not an intent series body")
+    (size,) = struct.unpack_from('<I', body, 4)
+    header = json.loads(body[8:8 + size])
+    base = 8 + size
+
+    def unpack(value):
+        if isinstance(value, dict):
+            if set(value) == {'$f64'}:
+                start, length = value['$f64']
+                return np.frombuffer(body, dtype='<f8', count=length, offset=base + start)
+            return {key: unpack(item) for key, item in value.items()}
+        return value
+
+    out = unpack(header)
+    labels = out.get('labels')
+    if isinstance(labels, dict) and 'range' in labels:
+        start, step, count = labels['range']
+        out['labels'] = [str(start + i * step) for i in range(count)]
+    elif isinstance(labels, np.ndarray):
+        out['labels'] = [str(int(v)) for v in labels]
+    return out
+
+
+def _compress(body):
+    # Returns (body, content-encoding or None)
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return brotli.compress(body, quality=5), 'br'
+    if accepted['gzip']:
+        return gzip.compress(body, compresslevel=5), 'gzip'
+    return body, None
+
+
+def respond(response, status=200):
+    """Flask response for a builder response, in the format the client accepts."""
+    if request.accept_mimetypes.best_match([JSON_MIME, BINARY_MIME], default=JSON_MIME) == BINARY_MIME:
+        body, mimetype = encode_binary(response), BINARY_MIME
+    else:
+        body, mimetype = current_app.json.dumps(uploads.to_json(response)).encode('utf-8'), JSON_MIME
+    body, encoding = _compress(body)
+    resp = current_app.response_class(body, status=status, mimetype=mimetype)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.update(('Accept', 'Accept-Encoding'))
+    return resp
@@ -1,55 +1,53 @@
 import streamlit as st
 import pandas as pd
-import io
-import csv
 import os
-import json
+import logging
+import sys
 import textwrap
 from datetime import datetime
 
+# Shared engine modules (response cache, CSV engine, dataset store, ...) live alongside the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent'))
+import cache
+import metrics
+import reruns
+import router
+import streaming
+
 try:
-    import openai
+    import analysis
+    import llm
 except Exception:
-    openai = None
+    analysis = llm = None
+
+logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="Intent AI", layout="wide", initial_sidebar_state="collapsed")
 
 st.title("🎯 Intent AI — Decision Intelligence")
 st.markdown("Predict risks and identify opportunities with an embedded analysis engine")
 
-def _call_openai_analyze(prompt_text: str):
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key or openai is None:
-        return None
-    try:
-        openai.api_key = api_key
-        system_msg = (
-            "You are an analyst that outputs a single JSON object describing "
-            "risk_level, summary, predictions (list of {metric,trend,status}), and recommendations (list of strings). Respond with JSON only."
-        )
-        resp = openai.ChatCompletion.create(
-            model=os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
-            messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": prompt_text}],
-            max_tokens=600,
-            temperature=0.2,
-        )
-        text = resp['choices'][0]['message']['content']
-        parsed = json.loads(text)
-        parsed['status'] = parsed.get('status', 'success')
-        return parsed
-    except Exception:
-        return None
+# Longer series are downsampled (LTTB) before charting
+MAX_CHART_POINTS = 2000
 
-def analyze_text_local(user_input: str):
-    # Try live OpenAI then fallback to deterministic mock
-    parsed = _call_openai_analyze(user_input)
-    if parsed:
-        return parsed
+# Streamlit reruns the script on every widget change. Parsed tables and analysis
+# results are cached per process, keyed by the file's hash and the parameters.
+CACHE_TTL_SECONDS = 3600
+TABLE_CACHE_ENTRIES = 8
+ANALYSIS_CACHE_ENTRIES = 64
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    # Fallback mock response
-    risk_level = "Medium"
-    if user_input and ("churn" in user_input.lower() or "loss" in user_input.lower()):
-        risk_level = "Critical"
+# Bump reruns.PROMPT_VERSION when this changes so cached answers are not reused
+SYSTEM_MSG = (
+    "You are an analyst that outputs a single JSON object describing "
+    "risk_level, summary, predictions (list of {metric,trend,status}), and recommendations (list of strings). Respond with JSON only."
+)
+
+RISK_ROUTER = router.Router([("Critical", ['churn', 'loss'])])
+
+def _mock_result(user_input: str):
+    risk_level = RISK_ROUTER.match(user_input) or "Medium"
 
     return {
         "status": "success",
@@ -65,125 +63,81 @@ def analyze_text_local(user_input: str):
         ],
     }
 
-def process_csv_bytes(content: bytes, selected_col=None, selected_x=None):
-    text = content.decode('utf-8', errors='ignore')
-    if not text.strip():
-        return {"status": "error", "message": "CSV file is empty"}
-
-    lines = text.splitlines()
-    if len(lines) > 10000:
-        return {"status": "error", "message": "CSV exceeds 10,000 rows limit"}
-
-    stream = io.StringIO(text)
-    sample = stream.getvalue().splitlines()
-    headers = None
-    if sample:
-        first_row = sample[0]
-        possible = [h.strip() for h in first_row.split(',')]
-        if any([not h.replace('.', '', 1).isdigit() for h in possible]):
-            headers = possible
-
-    labels = []
-    values = []
-
-    stream.seek(0)
-    if headers:
-        reader = csv.DictReader(stream)
-        col_name = None
-        if selected_col:
-            try:
-                idx = int(selected_col)
-                if 0 <= idx < len(headers):
-                    col_name = headers[idx]
-            except Exception:
-                if selected_col in headers:
-                    col_name = selected_col
-        if not col_name:
-            col_name = headers[-1]
-
-        col_name_x = None
-        if selected_x:
-            try:
-                idx = int(selected_x)
-                if 0 <= idx < len(headers):
-                    col_name_x = headers[idx]
-            except Exception:
-                if selected_x in headers:
-                    col_name_x = selected_x
-
-        row_index = 0
-        for row in reader:
-            row_index += 1
-            cell = row.get(col_name)
-            if cell is None:
-                continue
-            try:
-                num = float(cell)
-            except Exception:
-                continue
-            label_val = None
-            if col_name_x:
-                label_val = row.get(col_name_x)
-            labels.append(label_val if label_val is not None else str(row_index))
-            values.append(num)
-    else:
-        reader = csv.reader(stream)
-        row_index = 0
-        for row in reader:
-            row_index += 1
-            if not row:
-                continue
-            num = None
-            if selected_col:
-                try:
-                    idx = int(selected_col)
-                    if 0 <= idx < len(row):
-                        num = float(row[idx])
-                except Exception:
-                    num = None
-            if num is None:
-                for cell in row:
-                    try:
-                        num = float(cell)
-                        break
-                    except Exception:
-                        continue
-            if num is None:
-                continue
-            label_val = None
-            if selected_x:
-                try:
-                    idx_x = int(selected_x)
-                    if 0 <= idx_x < len(row):
-                        label_val = row[idx_x]
-                except Exception:
-                    label_val = None
-            labels.append(label_val if label_val is not None else str(row_index))
-            values.append(num)
-
-    if not values:
-        return {"status": "error", "message": "No numeric data found in CSV. Ensure at least one column contains numbers."}
-
-    first = values[0]
-    last = values[-1]
-    trend_pct = ((last - first) / abs(first) * 100) if first != 0 else 0
-    risk = "High Risk" if trend_pct > 10 else "Warning"
-
-    response = {
-        "status": "success",
-        "headers": headers or [],
-        "labels": labels,
-        "values": values,
-        "predictions": [
-            {"metric": "Uploaded Metric", "trend": f"{trend_pct:.1f}%", "status": risk}
-        ],
-        "recommendations": [
-            "Investigate root causes for rising metric.",
-            "Run targeted interventions and measure impact over next quarter."
-        ],
-        "summary": f"Uploaded metric changed by {trend_pct:.1f}% over the observed period."
-    }
-    return response
+def analyze_text_stream(user_input: str):
+    """Yield streaming.py ``(event, data)`` pairs; the last is ``('done', result)``."""
+    # Serve repeated (normalized) inputs from the shared response cache
+    live = llm is not None and llm.is_configured()
+    model = llm.model_name() if live else 'mock'
+    key = reruns.text_key(user_input, model)
+    response_cache = cache.default_cache()
+    if response_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield from streaming.result_events(cached)
+            return
+
+    # Try live OpenAI (streamed, so the tab fills in as the model writes) then fallback to deterministic mock
+    if live:
+        parser = streaming.FragmentParser()
+        reason = 'unparseable'
+        try:
+            messages = [{"role": "system", "content": SYSTEM_MSG}, {"role": "user", "content": user_input}]
+            for piece in llm.stream(messages):
+                yield from parser.feed(piece)
+            parsed = analysis.parse_completion(parser.text)
+            if parsed is not None:
+                if response_cache:
+                    response_cache.set(key, parsed)
+                yield 'done', parsed
+                return
+        except llm.CircuitOpen:
+            reason = 'circuit_open'
+            logger.warning("OpenAI circuit breaker open; using the local analysis")
+        except Exception as e:
+            reason = 'error'
+            logger.error(f"OpenAI error: {str(e)}", exc_info=True)
+        # Counted like analysis._fallback; the mock is not cached, so the next run retries live
+        metrics.LLM_FALLBACKS.inc(reason=reason)
+        yield 'done', _mock_result(user_input)
+        return
+
+    result = _mock_result(user_input)
+    if response_cache:
+        response_cache.set(key, result)
+    yield from streaming.result_events(result)
+
+def analyze_text_local(user_input: str):
+    for name, data in analyze_text_stream(user_input):
+        if name == 'done':
+            return data
+
+def upload_id(uploaded):
+    """Dataset id of an upload, hashed once per file rather than on every rerun."""
+    file_id = getattr(uploaded, 'file_id', None) or (uploaded.name, uploaded.size)
+    return reruns.upload_id(st.session_state.setdefault('upload_ids', {}), file_id, uploaded.getvalue)
+
+# Leading-underscore arguments are not hashed by Streamlit; the dataset id is the key.
+# cache_resource hands back the shared (read-only) table without copying it.
+@st.cache_resource(max_entries=TABLE_CACHE_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_table(dataset_id: str, _uploaded):
+    return reruns.load_table(_uploaded.getvalue())
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def cached_analysis(key, _table):
+    return reruns.table_analysis(_table, selected_x=key[1], columns='*', max_points=MAX_CHART_POINTS)
+
+DEMO_FILES = [
+    ("📈 Growth Trend", "demo_data/demo_growth.csv"),
+    ("📉 Decline Trend", "demo_data/demo_decline.csv"),
+    ("⚡ Volatile Data", "demo_data/demo_noise.csv"),
+]
+
+@st.cache_resource(show_spinner="Loading demo datasets...")
+def demo_results():
+    """Demo dataset results, computed once per process and shared by every session."""
+    return reruns.demo_results(APP_DIR, [path for _, path in DEMO_FILES], MAX_CHART_POINTS)
+
+demo_results()
 
 
 # Tabs
@@ -200,21 +154,56 @@ with analysis_tab:
 
     if analyze_btn:
         if text:
-            with st.spinner("Analyzing..."):
-                result = analyze_text_local(text)
-            risk = result.get('risk_level', 'Unknown')
-            risk_color = "🔴" if risk == "Critical" else "🟡" if risk == "Warning" else "🟢"
-            st.success(f"{risk_color} **Risk Level: {risk}**")
+            # Placeholders filled in as the analysis streams in
+            risk_box = st.empty()
+            risk_box.info("Analyzing...")
             st.markdown("**Summary:**")
-            st.write(result.get('summary', 'No summary available'))
+            summary_box = st.empty()
+            preds_slot = st.empty()
+            recs_slot = st.empty()
+            preds_box = recs_box = None
+
+            def show_risk(risk):
+                risk_color = "🔴" if risk == "Critical" else "🟡" if risk == "Warning" else "🟢"
+                risk_box.success(f"{risk_color} **Risk Level: {risk}**")
+
+            def show_prediction(box, pred):
+                box.metric(label=pred.get('metric', 'Metric'), value=pred.get('trend', 'N/A'), delta=pred.get('status', ''))
+
+            result = {}
+            for name, data in analyze_text_stream(text):
+                if name == 'field' and data['key'] == 'risk_level':
+                    show_risk(data['value'])
+                elif name == 'field' and data['key'] == 'summary':
+                    summary_box.write(data['value'])
+                elif name == 'item' and data['key'] == 'predictions':
+                    if preds_box is None:
+                        preds_box = preds_slot.container()
+                        preds_box.markdown("**Predictions:**")
+                    show_prediction(preds_box, data['value'])
+                elif name == 'item' and data['key'] == 'recommendations':
+                    if recs_box is None:
+                        recs_box = recs_slot.container()
+                        recs_box.markdown("**Recommendations:**")
+                    recs_box.write(f"{data['index'] + 1}. {data['value']}")
+                elif name == 'done':
+                    result = data
+
+            # The final result is authoritative (e.g. the fallback after a failed stream)
+            show_risk(result.get('risk_level', 'Unknown'))
+            summary_box.write(result.get('summary', 'No summary available'))
+            preds_slot.empty()
             if result.get('predictions'):
-                st.markdown("**Predictions:**")
+                preds_box = preds_slot.container()
+                preds_box.markdown("**Predictions:**")
                 for pred in result['predictions']:
-                    st.metric(label=pred.get('metric', 'Metric'), value=pred.get('trend', 'N/A'), delta=pred.get('status', ''))
+                    show_prediction(preds_box, pred)
+            recs_slot.empty()
             if result.get('recommendations'):
-                st.markdown("**Recommendations:**")
+                recs_box = recs_slot.container()
+                recs_box.markdown("**Recommendations:**")
                 for i, rec in enumerate(result['recommendations'], 1):
-                    st.write(f"{i}. {rec}")
+                    recs_box.write(f"{i}. {rec}")
         else:
             st.warning("Please enter business context first")
 
@@ -223,56 +212,65 @@ with upload_tab:
     uploaded = st.file_uploader("Upload CSV file", type=['csv'])
     if uploaded:
         try:
-            content = uploaded.read()
-            df = pd.read_csv(io.BytesIO(content))
-            st.success(f"✅ Loaded {len(df)} rows, {len(df.columns)} columns")
+            dataset_id = upload_id(uploaded)
+            table = cached_table(dataset_id, uploaded)
+            st.success(f"✅ Loaded {len(table)} rows, {len(table.column_names)} columns")
             col1, col2 = st.columns(2)
             with col1:
-                y_col = st.selectbox("Select Y Column (metric)", df.columns)
+                y_col = st.selectbox("Select Y Column (metric)", table.column_names)
             with col2:
-                x_col = st.selectbox("Select X Column (labels)", df.columns, index=0 if len(df.columns) > 1 else 0)
+                x_col = st.selectbox("Select X Column (labels)", table.column_names, index=0 if len(table.column_names) > 1 else 0)
 
+            analysis_key = reruns.analysis_key(dataset_id, x_col)
             if st.button("📈 Analyze CSV", key="upload", use_container_width=True):
                 with st.spinner("Processing CSV..."):
-                    result = process_csv_bytes(content, selected_col=y_col, selected_x=x_col)
-                if result.get('status') == 'success':
-                    chart_df = pd.DataFrame({'Label': result.get('labels', []), y_col: result.get('values', [])})
+                    cached_analysis(analysis_key, table)
+                    st.session_state['csv_source'] = analysis_key
+
+            # Analyzed once per file and X column; changing the Y column re-renders from the cache
+            result = None
+            if st.session_state.get('csv_source') == analysis_key:
+                result = cached_analysis(analysis_key, table)
+            if result:
+                if result.get('status') == 'success' and y_col in result['series']:
+                    stats = result['stats'][y_col]
+                    chart_df = pd.DataFrame({'Label': result['labels'], y_col: result['series'][y_col],
+                                             'Rolling mean': stats['rolling_mean']})
                     st.line_chart(chart_df.set_index('Label'))
-                    st.success(result.get('summary', ''))
-                    if result.get('predictions'):
+                    st.success(result['column_summaries'][y_col])
+                    predictions = result['column_predictions'][y_col] + [
+                        preds[0] for name, preds in result['column_predictions'].items() if name != y_col
+                    ]
+                    if predictions:
                         st.markdown("**Trend Predictions:**")
-                        for pred in result['predictions']:
+                        for pred in predictions:
                             status_icon = "🔴" if 'High Risk' in pred.get('status', '') else "🟡" if 'Warning' in pred.get('status', '') else "🟢"
                             st.write(f"{status_icon} **{pred.get('metric')}**: {pred.get('trend')} ({pred.get('status')})")
                     if result.get('recommendations'):
                         st.markdown("**Recommendations:**")
                         for i, rec in enumerate(result['recommendations'], 1):
                             st.write(f"{i}. {rec}")
+                elif result.get('status') == 'success':
+                    st.error(f"No numeric data found in column {y_col}")
                 else:
                     st.error(result.get('message', 'Upload failed'))
 
             with st.expander("📋 Preview Data"):
-                st.dataframe(df.head(10))
+                st.dataframe(table.frame.head(10).rename(columns=dict(enumerate(table.column_names))))
         except Exception as e:
             st.error(f"Error reading CSV: {str(e)}")
 
 with demo_tab:
     st.subheader("Sample Datasets")
     col1, col2, col3 = st.columns(3)
-    demo_files = [
-        ("📈 Growth Trend", "demo_data/demo_growth.csv"),
-        ("📉 Decline Trend", "demo_data/demo_decline.csv"),
-        ("⚡ Volatile Data", "demo_data/demo_noise.csv"),
-    ]
-    for (label, path), btn_col in zip(demo_files, (col1, col2, col3)):
+    for (label, path), btn_col in zip(DEMO_FILES, (col1, col2, col3)):
         with btn_col:
             if st.button(label, use_container_width=True):
                 try:
-                    with open(path, 'rb') as f:
-                        content = f.read()
-                    result = process_csv_bytes(content)
+                    result = demo_results()[path]
                     if result.get('status') == 'success':
-                        chart_df = pd.DataFrame({'Time': result['labels'], 'Value': result['values']})
+                        chart_df = pd.DataFrame({'Time': result['labels'], 'Value': result['values'],
+                                                 'Rolling mean': result['analytics']['rolling_mean']})
                         st.line_chart(chart_df.set_index('Time'))
                         st.json(result.get('predictions'))
                     else: